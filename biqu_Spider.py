@@ -1,20 +1,28 @@
 # biqu_Spider.py
-import csv
 import re
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
+from functools import partial
 from pathlib import Path
 from typing import Optional
 from urllib.parse import urljoin
 
-import pandas as pd
-from bs4 import BeautifulSoup
-
 from utils.BaseSpider import BaseSpider
+from utils.CrawlState import CrawlState
+from utils.ParsedPage import ParsedPage, compile_xpath, has_class
 from utils.TqdmLogHandler import logger
 from utils.WebUtils import WebUtils
 # 处理
 from utils.dealer_cn import dealer_cn
 
+# 预编译选择器（所有页面共用）
+KEYWORDS = compile_xpath('//meta[@name="keywords"]/@content')
+# 下一页按钮：a#pt_next.Readpage_up
+NEXT_LINK = compile_xpath(f'//a[@id="pt_next"][{has_class("Readpage_up")}]/@href')
+# 正文段落：#chaptercontent p（首页跳过各容器的第一个子元素，即p:not(:first-child)）
+CONTENT_PARAGRAPHS = compile_xpath('//*[@id="chaptercontent"]//p')
+CONTENT_PARAGRAPHS_REST = compile_xpath('//*[@id="chaptercontent"]//p[preceding-sibling::*]')
 
 class biquSpider(BaseSpider):
     """22笔趣小说章节爬虫
@@ -32,6 +40,10 @@ class biquSpider(BaseSpider):
 
     典型数据流：
     起始URL -> 解析内容 -> 获取下一页 -> 循环直至完结
+
+    流水线模式（config['pipeline']=True）：
+    主线程只负责串行的“抓取 -> 定位下一页”，正文解析、分词和保存交给线程池，
+    页面按抓取顺序标记为processed，保证断点续传状态与顺序模式一致。
     """
 
     def __init__(self, config=None):
@@ -43,21 +55,21 @@ class biquSpider(BaseSpider):
         self.base_dir = "22biqu"
         super().__init__(f"{self.base_dir}", config)  # 继承基类配置
         self.base_url = "https://m.22biqu.com/biqu5403/5419018.html"  # 初始章节URL
-        # self.visited_urls = set()  # 已访问URL集合
-        self.visited_urls = []  # 改用列表
 
         self.timeout = self.config.get("timeout", 10)
         self.current_url = self.base_url
         self.current_page = 1
+        # 流水线模式：抓取下一页的同时在其他线程处理当前页
+        self.pipeline = self.config.get("pipeline", False)
 
-        # 断点续传
-        #self.csv_file = Path(f"parsed/{self.base_dir}/biqi_crawl_records.csv")
-        self.csv_file = Path(f"parsed/biqi_crawl_records.csv")
-        self._init_csv()
-        self.load_processed_urls()
+        # 断点续传（SQLite状态库，首次运行时导入旧版CSV记录）
+        self.state = CrawlState(
+            Path("parsed/biqu_crawl_state.db"),
+            legacy_csv=Path("parsed/biqi_crawl_records.csv")
+        )
         self.sourcefile = None
 
-    def _extract_links(self, content, current_url):
+    def _extract_links(self, page: ParsedPage, current_url):
         """解析下一页链接
 
         定位策略：
@@ -65,7 +77,7 @@ class biquSpider(BaseSpider):
         - 使用urljoin处理相对路径
 
         Args:
-            content (str): 当前页面HTML内容
+            page (ParsedPage): 当前页面的解析结果
             current_url (str): 当前页面完整URL
 
         Returns:
@@ -75,9 +87,10 @@ class biquSpider(BaseSpider):
             Exception: 解析异常时记录错误日志
         """
         try:
-            soup = BeautifulSoup(content, 'lxml')
-            # 精准定位下一页按钮（复合选择器
-            raw_links = soup.select_one('a#pt_next.Readpage_up')['href']
+            # 精准定位下一页按钮（复合选择器）
+            raw_links = page.select_one(NEXT_LINK)
+            if raw_links is None:
+                raise ValueError("未找到下一页按钮")
             # 生成绝对URL（处理分页参数）
             # return [urljoin(current_url, link) for link in raw_links]
             return [urljoin(current_url, raw_links)]
@@ -85,81 +98,129 @@ class biquSpider(BaseSpider):
             logger.error(f"解析链接失败: {str(e)}")
             return None
 
-    def _extract_article(self, content, page = 0):
-        """解析单章小说内容
+    def _extract_article(self, parsed: ParsedPage, page = 0, chapter_url=None, source_file=None, commit=True):
+        """解析并处理单章小说内容（_parse_article + _process_article）
+
+        Args:
+            parsed (ParsedPage): 章节页面的解析结果
+            page (int): 章节内分页序号（0为第一页）
+            chapter_url (str): 页面URL（默认取self.current_url）
+            source_file (Path): 原始网页路径（默认取self.sourcefile）
+            commit (bool): 是否立即标记为processed/duplicate
+
+        Returns:
+            dict/None: 包含标题、内容等字段的字典（近重复页面含duplicate_of），解析失败返回None
+        """
+        result = self._parse_article(parsed, page, chapter_url or self.current_url)
+        if result is None:
+            return None
+        if result.get("duplicate_of"):
+            if commit:
+                # 与processed一样按写入队列顺序提交，避免越过前页未落盘的记录
+                self.commit_page(result["chapter_url"], 'duplicate', duplicate_of=result["duplicate_of"])
+            return result
+        return self._process_article(result, source_file or self.sourcefile, commit)
+
+    def _parse_article(self, parsed: ParsedPage, page, chapter_url):
+        """提取章节字段并做近重复检测
 
         提取规则：
         - 正文内容合并所有文本节点
         - 保留当前URL作为数据溯源
 
-        Args:
-            content (str): 章节页面HTML内容
+        流水线模式下也在主线程按抓取顺序调用，近重复时保留的总是先抓取的页面。
 
         Returns:
-            dict/None: 包含标题、内容等字段的字典，解析失败返回None
+            dict/None: 章节字段（近重复页面含duplicate_of），解析失败返回None
         """
         try:
-            soup = BeautifulSoup(content, 'lxml')
             # 获取章节名
-            # 定位到目标标签
-            meta_tag = soup.find('meta', attrs={'name': 'keywords'})
+            # 定位到目标标签的content属性
+            content_str = parsed.select_one(KEYWORDS)
             book_name = "《诡秘之主》"
             chapter_name = "Unknown Chapter"
-            if meta_tag:
-                # 获取content属性的值
-                content_str = meta_tag['content']
+            chapter_page = str(self.current_page)  # 与keywords中的章节序号统一为字符串
+            if content_str is not None:
                 # 分割并提取目标部分
                 # 取书名
                 book_name = content_str.split(',', 1)[0]
                 # 1. 按逗号分割，取第二部分
                 second_part = content_str.split(',', 1)[1]  # 1表示只分割一次
                 # 2. 按句号分割，取第二部分
-                self.current_page = second_part.split('.',1)[0].strip()
+                chapter_page = second_part.split('.',1)[0].strip()
                 chapter_name = second_part.split('.', 1)[1].strip()
 
             if not page:
                 # 其余P标签作为context
-                content_elems = soup.select('#chaptercontent p:not(:first-child)')
-                content_text = "\n".join([elem.get_text(strip=True) for elem in content_elems])
+                content_elems = parsed.select(CONTENT_PARAGRAPHS_REST)
+                content_text = "\n".join([parsed.text(elem) for elem in content_elems])
                 chapter_name = chapter_name + f"第{page + 1}页"
             else:
                 # 其余P标签作为context
-                content_elems = soup.select('#chaptercontent p')
-                content_text = "\n".join([elem.get_text(strip=True) for elem in content_elems])
+                content_elems = parsed.select(CONTENT_PARAGRAPHS)
+                content_text = "\n".join([parsed.text(elem) for elem in content_elems])
                 chapter_name = chapter_name + f"第{page + 1}页"
 
-            self._save_chapter_data(
-                book_name=book_name,
-                chapter_name=chapter_name,
-                chapter_url=self.current_url,
-                content=content_text
-            )
-
-            # 处理章节内容
-            # 单词字符化、删除特殊字符、大小写转换
-            text = self.dealer.clean_text(content_text)
-            self.dealer._save_chapter_data(
-                book_name=book_name,
-                chapter_name= chapter_name,
-                content= text)
-
-            return {
-                "chapter_page": self.current_page,
+            result = {
+                "chapter_page": chapter_page,
                 "book_name":book_name,
                 "chapter_name":chapter_name,
-                "chapter_url":self.current_url,
+                "chapter_url":chapter_url,
                 "content":content_text
             }
+
+            # 近重复页面（镜像、转载）不再保存和分词
+            if duplicate_of := self.find_duplicate(chapter_url, content_text):
+                result["duplicate_of"] = duplicate_of
+            return result
         except Exception as e:
             logger.error(f"解析失败: {str(e)}")
             return None
 
+    def _process_article(self, result, source_file, commit=True):
+        """保存章节并分词（流水线模式下在线程池中执行）
+
+        Args:
+            result (dict): _parse_article返回的章节字段
+            source_file (Path): 原始网页路径
+            commit (bool): 是否立即标记为processed；流水线模式下由主线程按顺序提交
+
+        Returns:
+            dict/None: 补充dealer_file后的result，处理失败返回None
+        """
+        try:
+            self._save_chapter_data(
+                book_name=result["book_name"],
+                chapter_name=result["chapter_name"],
+                chapter_url=result["chapter_url"],
+                content=result["content"],
+                source_file=source_file
+            )
+
+            # 处理章节内容
+            # 单词字符化、删除特殊字符、大小写转换（配置分词进程时在进程池中执行）
+            text = self.dealer.clean(result["content"])
+            result["dealer_file"] = self.dealer._save_chapter_data(
+                book_name=result["book_name"],
+                chapter_name=result["chapter_name"],
+                content=text,
+                key=result["chapter_url"])
+            self.save_record(result)
+
+            if commit:
+                self._commit_result(result)
+
+            return result
+        except Exception as e:
+            logger.error(f"处理失败: {str(e)}")
+            return None
+
     def crawl(self, max_articles=50):
         """链式章节抓取主流程
 
         执行逻辑：
         1. 从初始URL开始循环
-        2. 获取并解析当前章节
+        2. 获取并解析当前章节（流水线模式下提交到线程池）
         3. 定位下一页链接
         4. 满足终止条件时退出（达到最大数量或无后续章节）
 
@@ -167,15 +228,23 @@ class biquSpider(BaseSpider):
             max_articles (int): 最大抓取章节数，默认50章
         """
         current_num = 0
+        # 流水线模式：正文处理在线程池中执行，in_flight按抓取顺序保存未提交的任务
+        executor = ThreadPoolExecutor(max_workers=self.threads) if self.pipeline else None
+        in_flight = deque()
         try:
-            if not self.visited_urls:
+            last_url = self.state.last(*CrawlState.DONE_STATUSES)
+            if failed_url := self.state.first('failed'):
+                # 有文件写入失败的页面：从该页起重新抓取（链式抓取无法单独补抓中间页）
+                self.current_url = failed_url
+                self.state.delete_from(failed_url)
+                current_num = current_num + self.state.count(*CrawlState.DONE_STATUSES)
+            elif not last_url:
                 self.current_url = self.base_url
             else:
-                self.current_url = self.visited_urls[-1]
-                self.visited_urls.pop(-1)
-                # 删除csv文件最后一条数据
-                self.delete_row_by_url(self.current_url)
-                current_num = current_num + len(self.visited_urls)
+                # 从最后一条已完成记录重新抓取，以便取得其下一页链接
+                self.current_url = last_url
+                self.state.delete(last_url)
+                current_num = current_num + self.state.count(*CrawlState.DONE_STATUSES)
             while max_articles > current_num and self.current_url:
                 # 获取并缓存原始页面
                 page2 = current_num % 2
@@ -189,11 +258,26 @@ class biquSpider(BaseSpider):
                     # 获取下一个链接
                     current_num += 1
                     continue
+                # 每个页面只解析一次，正文与下一页链接共用解析结果
+                parsed = ParsedPage(content, self.current_url)
+                # 先取下一页链接（通常包含0-1个元素），之后解析树只交给正文处理使用
+                next_links = self._extract_links(parsed, self.current_url)
                 # 解析正文
-                self._extract_article(content,page= page2)
+                if executor:
+                    # 正文提取和近重复检测在主线程按抓取顺序进行，保留哪一页作为原页面是确定的；
+                    # 保存和分词交给线程池（固定本页的原始文件，避免被后续抓取覆盖）
+                    result = self._parse_article(parsed, page2, self.current_url)
+                    if result is None or result.get("duplicate_of"):
+                        future = Future()
+                        future.set_result(result)
+                    else:
+                        future = executor.submit(self._process_article, result, self.sourcefile, False)
+                    in_flight.append(future)
+                    # 控制在途任务数量，同时按顺序提交已完成的记录
+                    self._commit_in_order(in_flight, limit=self.threads * 2)
+                else:
+                    self._extract_article(parsed,page= page2)
                 current_num += 1
-                # 获取下一页链接（通常包含0-1个元素）
-                next_links = self._extract_links(content, self.current_url)
                 if not next_links:
                     logger.info("🛑 已到达最终章节")
                     break
@@ -205,48 +289,41 @@ class biquSpider(BaseSpider):
         except Exception as e:
             logger.error(f"爬取流程异常: {str(e)}", exc_info=True)
         finally:
+            if executor:
+                # 等待剩余页面处理完毕并按顺序提交
+                self._commit_in_order(in_flight, limit=0)
+                executor.shutdown()
+            self.flush_writes()
+            self.close_sink()
+            self.dealer.close()
             logger.info(f"🎉 完成处理 {int((current_num+1)/2)}/{int((max_articles+1)/2)} 章")
 
-    def _init_csv(self):
-        """初始化CSV文件并写入表头"""
-        # 创建父目录（自动递归创建）
-        self.csv_file.parent.mkdir(parents=True, exist_ok=True)
-        if not self.csv_file.exists():
-            with open(self.csv_file, 'w', newline='', encoding='utf-8-sig') as f:
-                writer = csv.DictWriter(f, fieldnames=[
-                    'timestamp',
-                    'url',
-                    'source_file',
-                    'parsed_file',
-                    'book_name',
-                    'chapter_name',
-                    'status'
-                    'dealer_file'
-                ])
-                writer.writeheader()
-
-    def load_processed_urls(self):
-        """加载已处理的URL"""
-        # self.processed_urls = set()
-        self.visited_urls = []
-        try:
-            with open(self.csv_file, 'r', encoding='utf-8-sig') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    if row['url'] and row['status'] == 'success':
-                        # self.processed_urls.add(row['url'])
-                        self.visited_urls.append(row['url'])
-        except FileNotFoundError:
-            pass
-
-    def _update_csv(self, record: dict):
-        """更新CSV记录"""
-        try:
-            with open(self.csv_file, 'a', newline='', encoding='utf-8-sig') as f:
-                writer = csv.DictWriter(f, fieldnames=record.keys())
-                writer.writerow(record)
-        except Exception as e:
-            logger.error(f"CSV记录更新失败: {str(e)}")
+    def _commit_in_order(self, in_flight, limit):
+        """按抓取顺序将流水线中已完成的页面标记为processed（近重复页面标记为duplicate）
+
+        队首任务完成才会提交，保证不会出现“后页已完成、前页未完成”的断点状态。
+
+        Args:
+            in_flight (deque): 按抓取顺序排列的Future队列
+            limit (int): 允许保留的在途任务数，超出时阻塞等待队首完成
+        """
+        while in_flight and (in_flight[0].done() or len(in_flight) > limit):
+            future = in_flight.popleft()
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.error(f"页面处理失败: {str(e)}")
+                continue
+            if result and result.get("duplicate_of"):
+                self.commit_page(result["chapter_url"], 'duplicate', duplicate_of=result["duplicate_of"])
+            elif result:
+                self._commit_result(result)
+
+    def _commit_result(self, result):
+        """章节文件全部写入后标记为processed（任一文件保存失败时标记为failed）"""
+        # dealer_file为None表示dealer保存失败
+        status = 'processed' if result.get("dealer_file") is not None else 'failed'
+        self.commit_page(result["chapter_url"], status, dealer_file=result.get("dealer_file"))
 
     def _get_source_file(self, url: str, direction: str, file_name = None):
         """记录原始文件信息"""
@@ -256,74 +333,52 @@ class biquSpider(BaseSpider):
 
     def fetch_content(self, url: str, direction: str, file_name: str = None) -> Optional[str]:
         """统一封装的内容获取方法"""
-        if url in self.visited_urls:
+        # 原子领取：已完成或本轮已领取的URL直接跳过
+        if not self.state.claim(url):
             logger.warning(f"⏩ 跳过已保存URL: {url}")
             return None
 
-        # self.visited_urls.add(url)
-        self.visited_urls.append(url)  # 按顺序记录
-        self.random_delay()
-        logger.info(f"📖 访问URL: {url}")
-        content = self.fetcher.fetch_and_save(
-            url=url,
-            direction=direction,
-            file_name=file_name,
-            save_origin=True
-        )
+        # 按主机限流（仅在该站点需要等待时才等待）
+        with self.throttle(url):
+            logger.info(f"📖 访问URL: {url}")
+            content = self.fetcher.fetch_and_save(
+                url=url,
+                direction=direction,
+                file_name=file_name,
+                save_origin=True
+            )
         if content:
             self._get_source_file(url, direction, file_name)
+            self.state.transition(url, 'fetched', source_file=self.sourcefile)
         if not content:
             logger.error(f"🛑 获取内容失败: {url}")
         return content
 
     def _save_chapter_data(self, book_name: str, chapter_name: str,
-                           chapter_url: str, content: str) -> None:
-        """统一的章节保存方法"""
+                           chapter_url: str, content: str, source_file=None) -> None:
+        """统一的章节保存方法（文件写入完成后将页面标记为parsed）"""
         try:
             # 生成安全文件名
             safe_book_name = re.sub(r'[\\/*?:"<>|]', '', book_name)[:50]
             safe_chapter_name = re.sub(r'[\\/*?:"<>|]', '', chapter_name)[:50]
 
-            # 创建存储路径
-            save_dir = Path("parsed") / safe_book_name
-            save_dir.mkdir(parents=True, exist_ok=True)
-
-            # 预处理后的章节目录
-            dealer_dir = save_dir / chapter_name
-            dealer_dir.mkdir(parents=True, exist_ok=True)
-            dealer_path = dealer_dir / f"{safe_book_name}-{safe_chapter_name}.txt"
-
-            # 写入文件内容
-            file_path = save_dir / f"{safe_chapter_name}.txt"
-            with file_path.open("w", encoding="utf-8-sig") as f:
-                f.write(f"Book: {book_name}\n")
-                f.write(f"Chapter: {chapter_name}\n")
-                f.write(f"URL: {chapter_url}\n\n")
-                f.write(content)
-
-            # 记录解析文件信息
-            self._update_csv({
-                'timestamp': datetime.now().isoformat(),
-                'url': chapter_url,
-                'source_file': str(self.sourcefile),
-                'parsed_file': str(file_path),
-                'book_name': book_name,
-                'chapter_name': chapter_name,
-                'status': "success",
-                'dealer_file': str(dealer_path)
-            })
-
-            logger.info(f"✅ 成功保存章节: {file_path}")
+            # 写入文件内容（后台写入器负责创建目录）
+            file_path = Path("parsed") / safe_book_name / f"{safe_chapter_name}.txt"
+            self.write_file(
+                file_path,
+                f"Book: {book_name}\nChapter: {chapter_name}\nURL: {chapter_url}\n\n{content}",
+                # 记录解析文件信息
+                key=chapter_url,
+                callback=partial(
+                    self.state.transition, chapter_url, 'parsed',
+                    timestamp=datetime.now().isoformat(),
+                    source_file=source_file or self.sourcefile,
+                    parsed_file=file_path,
+                    book_name=book_name,
+                    chapter_name=chapter_name
+                )
+            )
+
+            logger.info(f"✅ 章节已提交保存: {file_path}")
         except Exception as e:
             logger.error(f"🛑 文件保存失败: {str(e)}", exc_info=True)
-
-    def delete_row_by_url(self, current_url):
-        # 读取CSV文件
-        df = pd.read_csv(self.csv_file, encoding='utf-8-sig')
-
-        # 过滤掉url列等于current_url的行
-        df = df[df['url'] != current_url]
-
-        # 保存结果（覆盖原文件或保存为新文件）
-        df.to_csv(self.csv_file, encoding='utf-8-sig', index=False)  # 覆盖原文件
-        # df.to_csv('new_file.csv', index=False)  # 保存为新文件（保留原文件）
\ No newline at end of file
@@ -0,0 +1,30 @@
+# build_index.py
+import argparse
+
+from utils.InvertedIndex import InvertedIndex
+from utils.TqdmLogHandler import logger
+
+
+def main():
+    parser = argparse.ArgumentParser(description="根据dealer/输出目录增量构建章节倒排索引")
+    parser.add_argument("--source", default="dealer", help="dealer输出目录")
+    parser.add_argument("--index", default="index", help="索引目录")
+    parser.add_argument("--batch-size", type=int, default=5000, help="每个新段最多包含的文档数")
+    parser.add_argument("--merge", action="store_true", help="更新后将所有段合并为一个")
+    parser.add_argument("--dry-run", action="store_true", help="只统计需要新增/更新和删除的文档数，不修改索引")
+    args = parser.parse_args()
+
+    index = InvertedIndex(args.index)
+    try:
+        index.update(args.source, batch_size=args.batch_size, dry_run=args.dry_run)
+        if args.dry_run:
+            return
+        if args.merge:
+            index.merge()
+    finally:
+        index.close()
+    logger.info(f"🎉 索引构建完成：{args.index}")
+
+
+if __name__ == "__main__":
+    main()
@@ -20,11 +20,13 @@ class CNNSpider(BaseSpider):
 
     设计特点：
     - 继承BaseSpider基类实现定制逻辑
-    - 支持随机延迟防封禁
+    - 按主机调度请求间隔防封禁
     - 自动编码处理与内容缓存
     - 进度可视化与异常捕获
     """
 
+    ASYNC_BACKEND = True  # 提供协程版worker，支持backend='async'
+
     def __init__(self, config=None):
         """初始化爬虫实例
 
@@ -52,23 +54,35 @@ class CNNSpider(BaseSpider):
         1. 并行爬取各板块获取文章链接
         2. 链接去重与数量控制
         3. 并行爬取文章详情内容
-        4. 结果持久化存储
+        4. 结果持久化存储（开启parquet时每篇文章解析后立即追加，否则结束时统一保存CSV/Excel）
 
         Args:
             max_articles (int): 最大抓取数量，默认50篇
         """
+        # 根据配置选择线程或asyncio后端
+        use_async = self.backend == 'async'
+        section_worker = self._crawl_section_async if use_async else self._crawl_section
+        article_worker = self._crawl_article_async if use_async else self._crawl_article
+
         # 第一阶段：分布式收集文章链接
-        article_urls = self.parallel_execute(self.base_urls, self._crawl_section)
+        article_urls = self.parallel_execute(self.base_urls, section_worker)
         article_urls = list(set(article_urls))[:max_articles]  # 去重+数量控制
         logger.info(f"🔗 总共 {len(article_urls)} 篇新闻")
 
         # 第二阶段：并行获取文章内容
-        articles = self.parallel_execute(article_urls, self._crawl_article)
+        if self.sink is not None and not use_async:
+            # 文章解析后已逐条写入Parquet，流式执行不在内存中保留全文
+            saved = sum(1 for _ in self.iter_execute(article_urls, article_worker, key=lambda url: url))
+        else:
+            articles = self.parallel_execute(article_urls, article_worker, key=lambda url: url)
+            if articles and self.sink is None:
+                self._save_results(articles)
+            saved = len(articles)
 
         # 数据持久化
-        if articles:
-            self._save_results(articles)
-            logger.info(f"✅ 成功保存 {len(articles)} 篇CNN新闻")
+        self.close_sink()
+        if saved:
+            logger.info(f"✅ 成功保存 {saved} 篇CNN新闻")
         else:
             logger.info("⚠️ 未获取到有效新闻")
 
@@ -98,6 +112,17 @@ class CNNSpider(BaseSpider):
         logger.info(f"🔗 发现 {len(links)} 篇新闻")
         return links
 
+    async def _crawl_section_async(self, url):
+        """_crawl_section的协程版本（async后端使用）"""
+        logger.info(f"⏳ 开始爬取板块: {url}")
+        content = await self.async_fetcher.fetch_and_save(url, direction="CNN")
+        if not content:
+            return []
+
+        links = self._extract_links(content)
+        logger.info(f"🔗 发现 {len(links)} 篇新闻")
+        return links
+
     def _extract_links(self, content):
         """从HTML中精准提取文章链接
 
@@ -134,7 +159,7 @@ class CNNSpider(BaseSpider):
         """爬取单篇文章详情
 
         执行步骤：
-        - 随机延迟（反爬策略）
+        - 按主机限流（反爬策略）
         - 获取并缓存原始页面
         - 解析结构化数据
 
@@ -144,11 +169,26 @@ class CNNSpider(BaseSpider):
         Returns:
             dict/None: 解析成功的文章数据，失败返回None
         """
-        self.random_delay()  # 随机延迟（继承自BaseSpider）
-        logger.info(f"⏳ 开始爬取文章: {url}")
-
-        content = self.fetcher.fetch_and_save(url, direction="CNN", save_origin=True)
-        return self._parse_article(content, url) if content else None
+        with self.throttle(url):  # 按主机限流（继承自BaseSpider）
+            logger.info(f"⏳ 开始爬取文章: {url}")
+            content = self.fetcher.fetch_and_save(url, direction="CNN", save_origin=True)
+        return self._parse_and_record(content, url) if content else None
+
+    async def _crawl_article_async(self, url):
+        """_crawl_article的协程版本（延迟与请求均不阻塞线程）"""
+        await self.throttle_async(url)
+        try:
+            logger.info(f"⏳ 开始爬取文章: {url}")
+            content = await self.async_fetcher.fetch_and_save(url, direction="CNN", save_origin=True)
+        finally:
+            self.release_async(url)
+        return self._parse_and_record(content, url) if content else None
+
+    def _parse_and_record(self, content, url):
+        """解析文章并追加到Parquet结果"""
+        article = self._parse_article(content, url)
+        self.save_record(article)
+        return article
 
     def _parse_article(self, content, url):
         """解析文章内容（结构化优先，降级解析）
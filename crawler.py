@@ -12,7 +12,9 @@ def main():
         "retries": 3,
         "timeout": 30,
         "delay_range": (1, 2),
-        "threads": 5
+        "threads": 5,
+        "backend": "thread",  # 'async'时支持的爬虫改用asyncio并发
+        # "archive": "origin/archive",  # 原始网页写入分段压缩归档（代替逐页保存.html文件）
     }
 
     # 启动小说爬虫
@@ -30,18 +32,24 @@ def main():
 
     biqunovel_spider = biquSpider({
         **common_config,
-        "dealer": dealer_cn(),
-        "delay_range": (1, 2)  # 小说站需要更保守的爬取间隔
+        "dealer": dealer_cn(processes=2),  # 分词放到独立进程，避免与抓取线程争抢GIL
+        "delay_range": (1, 2),  # 小说站需要更保守的爬取间隔
+        "pipeline": True,  # 抓取下一页的同时处理当前页
+        "dedup": True  # 跳过镜像/转载造成的近重复页面
     })
     biqunovel_spider.crawl(2000)
 
     Englishnovel_spider = yinyuSpider({
         **common_config,
-        "dealer": dealer_en(),
+        "dealer": dealer_en(stem_cache_file="sources/stem_cache.json"),  # 词干缓存跨运行复用
         "delay_range": (1, 2)  # 小说站需要更保守的爬取间隔
     })
     Englishnovel_spider.crawl(25)
     logger.info("🎉 所有任务已完成！")
+    for spider in (biqunovel_spider, Englishnovel_spider):
+        stats = spider.fetcher.transfer_stats()
+        logger.info(f"📦 {spider.name} 传输 {stats['wire_bytes']} 字节，"
+                    f"解压后 {stats['raw_bytes']} 字节（压缩比 {stats['ratio']:.1f}x）")
     # 显示最终统计
     # logger.info("\n📊 最终统计:")
     # logger.info(f"  小说章节: {novel_spider.completed} 成功 / {novel_spider.failed} 失败")
@@ -24,6 +24,8 @@ class kuaishuSpider(BaseSpider):
     - 支持断点续爬
     """
 
+    ASYNC_BACKEND = True  # 提供协程版worker，支持backend='async'
+
     def __init__(self, config=None):
         """初始化爬虫实例
 
@@ -52,10 +54,12 @@ class kuaishuSpider(BaseSpider):
         # 生成连续页码任务列表
         tasks = list(range(start_page, end_page + 1))
 
-        # 并行执行页面采集（使用父类线程池）
-        results = self.parallel_execute(tasks, self._crawl_page)
+        # 并行执行页面采集（使用父类线程池或asyncio后端）
+        worker = self._crawl_page_async if self.backend == 'async' else self._crawl_page
+        results = self.parallel_execute(tasks, worker, key=self.base_url.format)
 
-        # 数据持久化（当前保存功能被注释）
+        # 数据持久化（开启parquet时已逐条追加，Excel保存功能被注释）
+        self.close_sink()
         if results:
             # self._save_results(results)
             logger.info(f"💾 成功保存 {len(results)} 章小说内容")
@@ -66,7 +70,7 @@ class kuaishuSpider(BaseSpider):
         """单章节抓取流程
 
         执行步骤：
-        - 随机延迟（反爬）
+        - 按主机限流（反爬）
         - 生成动态URL
         - 下载并缓存页面
         - 解析有效内容
@@ -77,13 +81,29 @@ class kuaishuSpider(BaseSpider):
         Returns:
             dict/None: 解析后的章节数据，失败返回None
         """
-        self.random_delay()  # 继承自BaseSpider的随机延迟
         url = self.base_url.format(page_num)
-        logger.info(f"🕸️ 正在爬取第 {page_num} 页: {url}")
-
-        # 带自动缓存的请求（原始HTML保存至data/novel/raw目录）
-        content = self.fetcher.fetch_and_save(url, direction="Novel")
-        return self._parse_page(content, url) if content else None
+        with self.throttle(url):  # 继承自BaseSpider的按主机限流
+            logger.info(f"🕸️ 正在爬取第 {page_num} 页: {url}")
+            # 带自动缓存的请求（原始HTML保存至data/novel/raw目录）
+            content = self.fetcher.fetch_and_save(url, direction="Novel")
+        return self._parse_and_record(content, url) if content else None
+
+    async def _crawl_page_async(self, page_num):
+        """_crawl_page的协程版本（async后端使用）"""
+        url = self.base_url.format(page_num)
+        await self.throttle_async(url)
+        try:
+            logger.info(f"🕸️ 正在爬取第 {page_num} 页: {url}")
+            content = await self.async_fetcher.fetch_and_save(url, direction="Novel")
+        finally:
+            self.release_async(url)
+        return self._parse_and_record(content, url) if content else None
+
+    def _parse_and_record(self, content, url):
+        """解析页面并追加到Parquet结果"""
+        data = self._parse_page(content, url)
+        self.save_record(data)
+        return data
 
     def _parse_page(self, content, url):
         """页面解析逻辑（待实现模板）
@@ -0,0 +1,286 @@
+# reprocess.py
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from utils.PageArchive import PageArchive
+from utils.ParsedPage import ParsedPage, compile_xpath, has_class
+from utils.ReprocessManifest import ReprocessManifest
+from utils.TqdmLogHandler import logger
+
+ARCHIVE_DIR = "origin/archive"  # 爬虫配置了archive时原始网页所在的归档目录
+MANIFEST_FILE = "origin/reprocess_manifest.db"
+SOURCES = {  # 语言 -> (原始网页目录, 归档中的存档路径前缀)
+    "cn": ("origin/22biqu", "origin/22biqu/"),
+    "en": ("origin/yinyu", "origin/yinyu/"),
+}
+PROGRESS_EVERY = 1000  # 每处理多少篇输出一次吞吐量
+
+# 笔趣阁章节页：meta keywords为"书名,章节序号.章节名"，正文为#chaptercontent下除最后一段外的p
+CN_KEYWORDS = compile_xpath('//meta[@name="keywords"]/@content')
+CN_PARAGRAPHS = compile_xpath('//*[@id="chaptercontent"]//p[following-sibling::p]')
+# 英语小说章节页：h2.text-danger.text-center.text-lg.font-bold.mt-2 与 div.c-en
+EN_TITLE = compile_xpath(f'//h2[{has_class("text-danger", "text-center", "text-lg", "font-bold", "mt-2")}]')
+EN_PARAGRAPHS = compile_xpath(f'//div[{has_class("c-en")}]')
+
+
+def extract_cn(content, source):
+    """解析笔趣阁章节页，返回(书名, 章节名, 正文)"""
+    page = ParsedPage(content, source)
+    book_name = "《诡秘之主》"
+    chapter_name = "Unknown Chapter"
+    keywords = page.select_one(CN_KEYWORDS)
+    if keywords:
+        book_name, _, second_part = keywords.partition(',')
+        book_name = book_name.strip()
+        number, dot, title = second_part.strip().partition('.')
+        chapter_name = (title if dot else number).strip()
+    text = "\n".join(page.text(p) for p in page.select(CN_PARAGRAPHS))
+    return book_name, chapter_name, text
+
+
+def extract_en(content, source):
+    """解析英语小说章节页，返回(书名, 章节名, 正文)，没有正文返回None
+
+    书名取自存档路径的父目录，页面缺少标题时章节名取文件名。
+    """
+    page = ParsedPage(content, source)
+    text = "\n".join(page.text(div) for div in page.select(EN_PARAGRAPHS))
+    if not text:
+        return None
+    path = Path(source)
+    return path.parent.name, page.first_text(EN_TITLE) or path.stem, text
+
+
+EXTRACTORS = {"cn": extract_cn, "en": extract_en}
+
+WORKER_LOG_LEVEL = "WARNING"  # 逐篇的分词结果日志会拖慢批量处理
+
+_clean_en = None  # 英文工作进程内的清洗函数（由_init_en_worker设置）
+
+
+def _init_en_worker():
+    """英文工作进程初始化：每个进程只加载一次停用词表"""
+    global _clean_en
+    logger.setLevel(WORKER_LOG_LEVEL)
+    from utils.dealer_en import dealer_en
+    dealer = dealer_en()
+    _clean_en = lambda text: dealer.clean_text(text, uppercase=False)
+
+
+def _create_pool(lang, processes):
+    """创建工作进程池：中文复用dealer_cn.create_pool（与爬虫分词进程相同的初始化）"""
+    if lang == "cn":
+        from utils.dealer_cn import dealer_cn
+        return dealer_cn.create_pool(processes, log_level=WORKER_LOG_LEVEL)
+    return ProcessPoolExecutor(max_workers=processes, initializer=_init_en_worker)
+
+
+def _clean(lang, text):
+    if lang == "cn":
+        from utils.dealer_cn import dealer_cn
+        return dealer_cn.clean_text(text)
+    return _clean_en(text)
+
+
+def _process_page(lang, source, content):
+    """工作进程中执行：读取（文件输入时）、解析、清洗分词
+
+    Returns:
+        tuple: (内容哈希, 处理结果)。内容哈希只在由本函数读取文件时计算，否则为None；
+               处理结果为(书名, 章节名, 分词结果)，页面没有正文时为None
+    """
+    digest = None
+    if content is None:
+        raw = Path(source).read_bytes()
+        digest = ReprocessManifest.content_hash(raw)
+        content = raw.decode("utf-8")
+    extracted = EXTRACTORS[lang](content, source)
+    if extracted is None:
+        return digest, None
+    book_name, chapter_name, text = extracted
+    return digest, (book_name, chapter_name, _clean(lang, text))
+
+
+def iter_files(folder):
+    """递归遍历目录下的HTML文件，产出(路径, 修改时间, 大小, None, None)（哈希与内容按需读取）"""
+    for path in Path(folder).rglob("*.html"):
+        stat = path.stat()
+        yield str(path), stat.st_mtime, stat.st_size, None, None
+
+
+def iter_archive(archive_dir=ARCHIVE_DIR, prefix=None):
+    """顺序流式读取归档，产出(存档路径, 归档时间戳, 大小, 内容哈希, 内容)
+
+    大小为UTF-8字节数，与iter_files的文件大小、统计中的bytes口径一致。
+    """
+    archive = PageArchive(archive_dir)
+    try:
+        for record in archive.iter_records(prefix):
+            content = record["content"]
+            mtime = datetime.fromisoformat(record["date"]).timestamp()
+            yield record["path"], mtime, len(content.encode("utf-8")), record["digest"], content
+    finally:
+        archive.close()
+
+
+def reprocess(lang, inputs, processes=None, max_pending=None, manifest=None, force=False, dry_run=False):
+    """流式重处理：原始页面 -> 进程池解析与分词 -> 主进程写入dealer/
+
+    提交的任务数不超过max_pending（有界队列），内存占用与语料规模无关；
+    结果按提交顺序写入。提供manifest时只处理内容或dealer配置变化（或输出丢失）的页面。
+
+    Args:
+        lang (str): 'cn'或'en'
+        inputs (iterable): (来源, 修改时间, 大小, 内容哈希或None, 内容或None)，来自iter_files/iter_archive
+        processes (int): 工作进程数（默认CPU核数）
+        max_pending (int): 最多同时提交的页面数（默认进程数的4倍）
+        manifest (ReprocessManifest): 处理清单
+        force (bool): 忽略清单，全部重新处理
+        dry_run (bool): 只统计需要处理的页面（按原因分类），不解析也不写入
+
+    Returns:
+        dict: 处理时为processed/skipped/empty/failed/bytes/seconds；
+              dry_run时为各原因（new/content/config/output）及skipped/bytes的计数
+    """
+    if lang == "cn":
+        from utils.dealer_cn import dealer_cn
+        dealer = dealer_cn()
+    else:
+        from utils.dealer_en import dealer_en
+        dealer = dealer_en()
+    config_hash = dealer.config_hash(uppercase=False)
+    if dry_run:
+        return _dry_run(inputs, manifest, config_hash, force)
+
+    processes = processes or os.cpu_count()
+    max_pending = max_pending or processes * 4
+    stats = dict.fromkeys(("processed", "skipped", "empty", "failed", "bytes"), 0)
+    start = time.perf_counter()
+
+    def report(final=False):
+        elapsed = time.perf_counter() - start
+        rate = stats["processed"] / elapsed if elapsed else 0.0
+        mb_rate = stats["bytes"] / elapsed / 1024 / 1024 if elapsed else 0.0
+        logger.info(
+            f"{'🎉 重处理完成' if final else '⏳ 重处理中'}：处理{stats['processed']}篇，"
+            f"跳过{stats['skipped']}篇，无正文{stats['empty']}篇，失败{stats['failed']}篇，"
+            f"用时{elapsed:.1f}s，{rate:.1f}篇/s，{mb_rate:.2f}MB/s"
+        )
+
+    def finish(item):
+        source, mtime, size, digest, future = item
+        try:
+            read_digest, result = future.result()
+        except Exception as e:
+            stats["failed"] += 1
+            logger.error(f"🛑 处理 {source} 失败: {str(e)}")
+            return
+        output = None
+        if result is None:
+            stats["empty"] += 1
+        else:
+            output = dealer._save_chapter_data(*result)
+            if output is None:
+                stats["failed"] += 1
+                return
+            stats["processed"] += 1
+            stats["bytes"] += size
+            if stats["processed"] % PROGRESS_EVERY == 0:
+                report()
+        if manifest is not None:
+            manifest.record(source, digest or read_digest, config_hash, output, mtime, size)
+
+    pending = deque()
+    executor = _create_pool(lang, processes)
+    try:
+        for source, mtime, size, digest, content in inputs:
+            if manifest is not None and not force:
+                loaded = []  # 需要计算哈希时读取的文件内容，随任务一起提交，避免工作进程再读一次
+
+                def load(path=source):
+                    loaded.append(Path(path).read_bytes())
+                    return loaded[0]
+
+                reason, digest = manifest.check(source, config_hash, mtime, size, digest, load=load)
+                if reason is None:
+                    if loaded:
+                        manifest.touch(source, mtime, size)  # 只是修改时间变化
+                    stats["skipped"] += 1
+                    continue
+                if loaded:
+                    content = loaded[0].decode("utf-8")
+            pending.append((source, mtime, size, digest,
+                            executor.submit(_process_page, lang, source, content)))
+            # 队列已满时先写出最早的结果，限制内存占用
+            if len(pending) >= max_pending:
+                finish(pending.popleft())
+        while pending:
+            finish(pending.popleft())
+    finally:
+        executor.shutdown(cancel_futures=True)
+    stats["seconds"] = time.perf_counter() - start
+    report(final=True)
+    return stats
+
+
+def _dry_run(inputs, manifest, config_hash, force):
+    """统计需要处理的页面数量与字节数（按原因分类），不修改清单"""
+    reasons = (ReprocessManifest.NEW, ReprocessManifest.CONTENT, ReprocessManifest.CONFIG, ReprocessManifest.OUTPUT)
+    stats = dict.fromkeys(reasons + ("skipped", "bytes"), 0)
+    for source, mtime, size, digest, _ in inputs:
+        if force or manifest is None:
+            reason = ReprocessManifest.NEW
+        else:
+            reason, _ = manifest.check(source, config_hash, mtime, size, digest,
+                                       load=lambda: Path(source).read_bytes())
+        if reason is None:
+            stats["skipped"] += 1
+            continue
+        stats[reason] += 1
+        stats["bytes"] += size
+    total = sum(stats[reason] for reason in reasons)
+    logger.info(
+        f"🔍 重处理预览：需处理{total}篇（新增{stats['new']}，内容变化{stats['content']}，"
+        f"配置变化{stats['config']}，输出缺失{stats['output']}），共{stats['bytes'] / 1024 / 1024:.2f}MB；"
+        f"无需处理{stats['skipped']}篇"
+    )
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="离线重处理原始网页：解析、分词并写入dealer/（只处理内容或dealer配置变化的页面）")
+    parser.add_argument("lang", choices=sorted(SOURCES), help="cn：笔趣阁中文章节；en：英语小说章节")
+    parser.add_argument("--source", help="原始网页目录（默认origin/22biqu或origin/yinyu）")
+    parser.add_argument("--archive", help="从归档目录读取（默认存在origin/archive/index.db时使用归档）")
+    parser.add_argument("--prefix", help="归档中的存档路径前缀（默认origin/22biqu/或origin/yinyu/）")
+    parser.add_argument("--processes", type=int, help="工作进程数（默认CPU核数）")
+    parser.add_argument("--max-pending", type=int, help="最多同时提交的页面数（默认进程数的4倍）")
+    parser.add_argument("--manifest", default=MANIFEST_FILE, help="处理清单路径")
+    parser.add_argument("--force", action="store_true", help="忽略清单，全部重新处理")
+    parser.add_argument("--dry-run", action="store_true", help="只报告需要处理的页面数量及原因，不做任何修改")
+    args = parser.parse_args(argv)
+
+    source_dir, prefix = SOURCES[args.lang]
+    archive_dir = args.archive
+    if archive_dir is None and args.source is None and (Path(ARCHIVE_DIR) / "index.db").exists():
+        archive_dir = ARCHIVE_DIR  # 存在归档时顺序读取归档，无需遍历大量小文件
+    if archive_dir:
+        inputs = iter_archive(archive_dir, args.prefix or prefix)
+    else:
+        inputs = iter_files(args.source or source_dir)
+
+    manifest = ReprocessManifest(args.manifest)
+    try:
+        reprocess(args.lang, inputs, processes=args.processes, max_pending=args.max_pending,
+                  manifest=manifest, force=args.force, dry_run=args.dry_run)
+    finally:
+        manifest.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+# search.py
+import argparse
+import time
+
+from utils.QueryEngine import QueryEngine
+
+
+def main():
+    parser = argparse.ArgumentParser(description="在章节倒排索引上执行BM25检索")
+    parser.add_argument("query", help="查询语句（中文走jieba分词，英文走词干提取；\"短语\"要求相邻，\"短语\"~N允许多出N个词的间隔且不计顺序）")
+    parser.add_argument("-k", type=int, default=10, help="返回结果数")
+    parser.add_argument("--index", default="index", help="索引目录（由build_index.py生成）")
+    args = parser.parse_args()
+
+    engine = QueryEngine(args.index)
+    start = time.perf_counter()
+    hits = engine.search(args.query, k=args.k)
+    elapsed = (time.perf_counter() - start) * 1000
+
+    for rank, hit in enumerate(hits, 1):
+        print(f"{rank:>3}. {hit['score']:.4f}  {hit['book']} - {hit['chapter']}  ({hit['path']})")
+    print(f"共 {len(hits)} 条结果，用时 {elapsed:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+# conftest.py
+import sys
+from pathlib import Path
+
+# 测试直接以仓库根目录为导入起点（与各入口脚本的 from utils.xxx import 一致）
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
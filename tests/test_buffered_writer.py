@@ -0,0 +1,36 @@
+# test_buffered_writer.py
+from utils.BufferedWriter import BufferedWriter
+
+
+def test_writes_then_callbacks_in_order(tmp_path):
+    writer = BufferedWriter()
+    calls = []
+    writer.write(tmp_path / "a" / "1.txt", "一", callback=lambda: calls.append("parsed"))
+    writer.call(calls.append, "processed")
+    assert writer.flush() == []
+    assert calls == ["parsed", "processed"]
+    assert (tmp_path / "a" / "1.txt").read_text(encoding="utf-8-sig") == "一"
+    writer.close()
+
+
+def test_failed_write_fails_dependent_call(tmp_path):
+    writer = BufferedWriter()
+    calls = []
+    blocker = tmp_path / "blocker"
+    blocker.write_text("x")  # 同名文件占位，目录无法创建
+    writer.write(blocker / "1.txt", "正文", key="u1", callback=lambda: calls.append("parsed"))
+    writer.write(tmp_path / "2.txt", "\ud800", encoding="utf-8", key="u2")  # 非IO异常（无法编码）
+    writer.write(tmp_path / "3.txt", "正文", key="u3")
+    for url in ("u1", "u2", "u3"):
+        writer.call_for(url, calls.append, f"{url} processed", on_failure=lambda url=url: calls.append(f"{url} failed"))
+
+    errors = writer.flush()
+    assert [path for path, _ in errors] == [blocker / "1.txt", tmp_path / "2.txt"]
+    assert calls == ["u1 failed", "u2 failed", "u3 processed"]
+
+    # 失败记录已被消费，后台线程仍在运行
+    writer.write(tmp_path / "4.txt", "正文", key="u1")
+    writer.call_for("u1", calls.append, "u1 processed", on_failure=lambda: calls.append("u1 failed"))
+    assert writer.flush() == []
+    assert calls[-1] == "u1 processed"
+    writer.close()
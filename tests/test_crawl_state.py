@@ -0,0 +1,126 @@
+# test_crawl_state.py
+import pytest
+
+from utils.CrawlState import CrawlState
+
+
+@pytest.fixture
+def state(tmp_path):
+    state = CrawlState(tmp_path / "state.db")
+    yield state
+    state.close()
+
+
+def test_claim_and_transitions(state):
+    assert state.claim("u1")
+    assert not state.claim("u1")  # 本轮已领取
+    assert state.status("u1") == "queued"
+    state.transition("u1", "fetched", source_file="origin/a.html")
+    state.transition("u1", "processed", dealer_file="dealer/a.txt")
+    assert state.status("u1") == "processed"
+    assert state.seen("u1")
+    with pytest.raises(ValueError):
+        state.transition("u1", "unknown")
+
+
+def test_resume_skips_done_pages(tmp_path):
+    state = CrawlState(tmp_path / "state.db")
+    for url in ("u1", "u2", "u3"):
+        state.claim(url)
+    state.transition("u1", "processed")
+    state.transition("u2", "duplicate", duplicate_of="u1")
+    state.transition("u3", "fetched")
+    state.close()
+
+    # 重启后：已完成（processed/duplicate）的页面不再领取，未完成的页面重新领取
+    reopened = CrawlState(tmp_path / "state.db")
+    assert not reopened.claim("u1")
+    assert not reopened.claim("u2")
+    assert reopened.claim("u3")
+    assert reopened.count(*CrawlState.DONE_STATUSES) == 2
+    assert reopened.count() == 3
+    reopened.close()
+
+
+def test_last_follows_claim_order(state):
+    for url in ("u1", "u2", "u3"):
+        state.claim(url)
+    # 完成顺序与领取顺序不同：last()仍按领取顺序返回
+    state.transition("u2", "processed")
+    state.transition("u1", "processed")
+    assert state.last() == "u2"
+    assert state.last("queued") == "u3"
+    state.transition("u3", "duplicate", duplicate_of="u1")
+    assert state.last() == "u3"
+    assert state.last("processed") == "u2"
+
+    # 链式爬虫续爬：删除最后一条后重新抓取，记录排到最后
+    state.delete("u3")
+    assert state.last() == "u2"
+    state.transition("u3", "processed")
+    assert state.last() == "u3"
+
+
+def test_fields_are_kept_across_transitions(state):
+    state.transition("u1", "parsed", parsed_file="parsed/a.txt", book_name="书")
+    state.transition("u1", "processed", dealer_file="dealer/a.txt")
+    row = state._conn.execute(
+        "SELECT parsed_file, book_name, dealer_file FROM pages WHERE url = 'u1'"
+    ).fetchone()
+    assert row == ("parsed/a.txt", "书", "dealer/a.txt")
+
+
+def test_fingerprints_round_trip(state):
+    state.save_fingerprint("u1", 2 ** 64 - 1)
+    state.save_fingerprint("u2", 12345)
+    assert sorted(state.fingerprints()) == [("u1", 2 ** 64 - 1), ("u2", 12345)]
+
+
+def test_import_legacy_csv(tmp_path):
+    legacy = tmp_path / "record.csv"
+    legacy.write_text(
+        "timestamp,url,source_file,parsed_file,book_name,chapter_name,status,dealer_file\n"
+        "2024-01-01T00:00:00,u1,origin/1.html,parsed/1.txt,书,第1章,success,dealer/1.txt\n"
+        "2024-01-01T00:00:01,u2,origin/2.html,,书,第2章,failed\n"
+        "2024-01-01T00:00:02,u3,origin/3.html,parsed/3.txt,书,第3章,success\n",
+        encoding="utf-8-sig",
+    )
+    state = CrawlState(tmp_path / "state.db", legacy_csv=legacy)
+    assert state.status("u1") == "processed"
+    assert state.status("u2") is None  # 失败记录不导入
+    assert state.status("u3") == "processed"
+    assert state.last() == "u3"
+    state.close()
+
+    # 状态库已有记录时不再导入
+    other = tmp_path / "other.csv"
+    other.write_text(
+        "timestamp,url,source_file,parsed_file,book_name,chapter_name,status\n"
+        "2024-01-01T00:00:03,u4,origin/4.html,parsed/4.txt,书,第4章,success\n",
+        encoding="utf-8-sig",
+    )
+    reopened = CrawlState(tmp_path / "state.db", legacy_csv=other)
+    assert reopened.status("u4") is None
+    reopened.close()
+
+
+def test_failed_pages_are_reclaimed(tmp_path):
+    state = CrawlState(tmp_path / "state.db")
+    for url in ("u1", "u2", "u3", "u4"):
+        state.claim(url)
+    state.transition("u1", "processed")
+    state.transition("u2", "failed")
+    state.transition("u3", "processed")
+    state.transition("u4", "failed")
+    state.close()
+
+    reopened = CrawlState(tmp_path / "state.db")
+    assert reopened.first("failed") == "u2"
+    assert not reopened.claim("u1")
+    assert reopened.claim("u4")  # 写入失败的页面下次运行重新抓取
+    # 链式爬虫从第一个失败页起重新抓取
+    reopened.delete_from("u2")
+    assert reopened.count() == 1
+    assert reopened.last() == "u1"
+    assert reopened.claim("u3")
+    reopened.close()
@@ -0,0 +1,68 @@
+# test_fetcher.py
+from email.message import Message
+
+import pytest
+
+from utils.Fetcher import Fetcher
+from utils.PageArchive import PageArchive
+
+
+class Response:
+    def __init__(self, status, etag=None):
+        self.status = status
+        self.headers = Message()
+        if etag:
+            self.headers['ETag'] = etag
+        self.wire_bytes = self.raw_bytes = 0
+
+
+class Pool:
+    """按URL返回固定内容的连接池，记录每次请求头；服务端对匹配的ETag返回304"""
+
+    def __init__(self, pages):
+        self.pages = pages  # url -> (etag, html)
+        self.requests = []
+
+    def request(self, url, headers=None):
+        self.requests.append((url, dict(headers or {})))
+        etag, html = self.pages[url]
+        if headers and headers.get('If-None-Match') == etag:
+            return Response(304), b""
+        return Response(200, etag), html.encode('utf-8')
+
+
+@pytest.fixture(params=["files", "archive"])
+def fetcher(request, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    archive = PageArchive(tmp_path / "archive") if request.param == "archive" else None
+    fetcher = Fetcher(retries=1, archive=archive)
+    # 两个URL的ETag相同（如按内容哈希生成），共用同一个自定义文件名
+    fetcher.pool = Pool({"http://a.com/1": ('"v1"', "<p>一</p>"), "http://a.com/2": ('"v1"', "<p>二</p>")})
+    yield fetcher
+    if archive is not None:
+        archive.close()
+
+
+def test_revalidates_own_copy(fetcher):
+    assert fetcher.fetch_and_save("http://a.com/1", file_name="page.html", direction="t") == "<p>一</p>"
+    assert fetcher.fetch_and_save("http://a.com/1", file_name="page.html", direction="t") == "<p>一</p>"
+    assert fetcher.pool.requests[-1][1]['If-None-Match'] == '"v1"'
+
+
+def test_shared_path_does_not_reuse_other_url(fetcher):
+    assert fetcher.fetch_and_save("http://a.com/1", file_name="page.html", direction="t") == "<p>一</p>"
+    # 存档路径相同但URL不同：不发送条件头，不返回另一页面的内容
+    assert fetcher.fetch_and_save("http://a.com/2", file_name="page.html", direction="t") == "<p>二</p>"
+    assert 'If-None-Match' not in fetcher.pool.requests[-1][1]
+
+    fetcher.offline = True
+    assert fetcher.fetch_and_save("http://a.com/1", file_name="page.html", direction="t") is None
+    assert fetcher.fetch_and_save("http://a.com/2", file_name="page.html", direction="t") == "<p>二</p>"
+
+
+def test_blank_response_is_a_failed_fetch(fetcher, monkeypatch):
+    monkeypatch.setattr("utils.Fetcher.time.sleep", lambda seconds: None)
+    fetcher.pool.pages["http://a.com/3"] = (None, " \n ")
+    assert fetcher.fetch_and_save("http://a.com/3", file_name="blank.html", direction="t") is None
+    fetcher.offline = True
+    assert fetcher.fetch_and_save("http://a.com/3", file_name="blank.html", direction="t") is None
@@ -0,0 +1,19 @@
+# test_host_scheduler.py
+import pytest
+
+from utils.HostScheduler import HostScheduler
+
+
+def test_full_delay_between_requests_to_same_host():
+    scheduler = HostScheduler(delay_range=(10, 10), max_per_host=4)
+    assert scheduler.try_acquire("http://example.com/1") == 0
+    # 并发名额未满，但同一主机的下一次请求仍需等待完整间隔
+    assert scheduler.try_acquire("http://example.com/2") == pytest.approx(10, abs=0.5)
+    # 其他主机不受影响
+    assert scheduler.try_acquire("http://other.com/1") == 0
+
+
+def test_spread_delay_divides_by_host_concurrency():
+    scheduler = HostScheduler(delay_range=(10, 10), max_per_host=4, spread_delay=True)
+    assert scheduler.try_acquire("http://example.com/1") == 0
+    assert scheduler.try_acquire("http://example.com/2") == pytest.approx(2.5, abs=0.5)
@@ -0,0 +1,235 @@
+# test_inverted_index.py
+import random
+from collections import defaultdict
+
+import pytest
+
+from utils.InvertedIndex import InvertedIndex, PostingCursor, Segment, SegmentWriter, decode_varints, encode_varint
+
+VOCABULARY = [f"w{i}" for i in range(40)] + ["诡秘", "之主", "克莱恩"]
+
+
+def make_docs(count, seed=0):
+    """生成随机文档（词频呈长尾分布，部分词只在少数文档中出现）"""
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(len(VOCABULARY))]
+    return [" ".join(rng.choices(VOCABULARY, weights, k=rng.randint(1, 60))) for _ in range(count)]
+
+
+def brute_postings(docs, deleted=()):
+    """逐篇扫描得到的倒排表：term -> [(doc_id, [位置])]"""
+    postings = defaultdict(list)
+    for doc_id, text in docs.items():
+        if doc_id in deleted:
+            continue
+        positions = defaultdict(list)
+        for position, token in enumerate(text.split()):
+            positions[token].append(position)
+        for term, term_positions in positions.items():
+            postings[term].append((doc_id, term_positions))
+    return postings
+
+
+def assert_matches(index, docs, deleted=()):
+    expected = brute_postings(docs, deleted)
+    for term in VOCABULARY + ["不存在的词"]:
+        want = expected.get(term, [])
+        assert index.positional_postings(term) == want
+        doc_ids, tfs = index.postings(term)
+        assert list(doc_ids) == [doc_id for doc_id, _ in want]
+        assert list(tfs) == [len(positions) for _, positions in want]
+    live = {doc_id: text for doc_id, text in docs.items() if doc_id not in deleted}
+    assert index.num_docs == len(live)
+    for doc_id, text in docs.items():
+        if doc_id in deleted:
+            assert index.doc(doc_id) is None
+        else:
+            assert index.doc_length(doc_id) == len(text.split())
+            assert index.doc(doc_id)["path"] == f"p{doc_id}"
+
+
+@pytest.mark.parametrize("value", [0, 1, 127, 128, 300, 16383, 16384, 2 ** 32 - 1, 2 ** 63])
+def test_varint_round_trip(value):
+    buf = bytearray()
+    encode_varint(value, buf)
+    encode_varint(5, buf)
+    assert list(decode_varints(buf)) == [value, 5]
+
+
+def test_commit_and_reopen(tmp_path):
+    docs = {}
+    index = InvertedIndex(tmp_path)
+    for text in make_docs(50):
+        docs[index.add_text(text, path=f"p{len(docs)}")] = text
+    index.commit()
+    assert_matches(index, docs)
+    index.close()
+
+    # 重新打开后只通过mmap读取，结果不变
+    reopened = InvertedIndex(tmp_path)
+    assert_matches(reopened, docs)
+    reopened.close()
+
+
+def test_segments_delete_and_merge(tmp_path):
+    docs = {}
+    index = InvertedIndex(tmp_path)
+    for batch in range(3):
+        for text in make_docs(20, seed=batch):
+            docs[index.add_text(text, path=f"p{len(docs)}")] = text
+        index.commit()
+    assert len(index.segments) == 3
+
+    deleted = {0, 7, 21, 59}
+    for doc_id in deleted:
+        index.delete(doc_id)
+    index.commit()
+    assert_matches(index, docs, deleted)
+
+    index.merge()
+    assert len(index.segments) == 1
+    assert_matches(index, docs, deleted)
+    # 合并后的词表统计不再包含已删除文档
+    expected = brute_postings(docs, deleted)
+    for term, want in expected.items():
+        df, cf, max_tf = index.term_stats(term)
+        assert (df, cf, max_tf) == (len(want), sum(len(p) for _, p in want), max(len(p) for _, p in want))
+    index.close()
+
+    reopened = InvertedIndex(tmp_path)
+    assert_matches(reopened, docs, deleted)
+    reopened.close()
+
+
+def test_update_skips_unchanged_content(tmp_path):
+    source = tmp_path / "dealer" / "书"
+    source.mkdir(parents=True)
+    (source / "书-第1章.txt").write_text("诡秘 之主 克莱恩", encoding="utf-8-sig")
+    (source / "书-第2章.txt").write_text("之主 w1 w2", encoding="utf-8-sig")
+
+    index = InvertedIndex(tmp_path / "index")
+    assert index.update(tmp_path / "dealer") == (2, 0)
+    assert index.doc(0)["chapter"] == "第1章"
+
+    # 内容不变只是重新写入：不重新索引
+    (source / "书-第1章.txt").write_text("诡秘 之主 克莱恩", encoding="utf-8-sig")
+    assert index.update(tmp_path / "dealer", dry_run=True) == (0, 0)
+    assert index.update(tmp_path / "dealer") == (0, 0)
+
+    # 内容变化替换旧文档，删除的文件从索引中移除
+    (source / "书-第1章.txt").write_text("克莱恩 w3", encoding="utf-8-sig")
+    (source / "书-第2章.txt").unlink()
+    assert index.update(tmp_path / "dealer") == (1, 1)
+    assert index.num_docs == 1
+    assert list(index.postings("之主")[0]) == []
+    assert list(index.postings("克莱恩")[0]) == [2]
+    index.close()
+
+
+def test_term_table_lookup(tmp_path):
+    docs = {}
+    index = InvertedIndex(tmp_path)
+    for text in make_docs(30, seed=3):
+        docs[index.add_text(text, path=f"p{len(docs)}")] = text
+    index.commit()
+    segment = index.segments[0]
+
+    # 词表按UTF-8字节排序（w1 < w10 < w2 < 中文），二分查找命中每个词
+    terms = [term for term, _, _ in segment.terms()]
+    assert terms == sorted(terms, key=lambda term: term.encode('utf-8'))
+    assert terms == sorted(brute_postings(docs))
+    for term in terms:
+        assert segment.lookup(term) is not None
+    for missing in ("", "a", "w", "w100", "w39x", "诡", "龥"):
+        assert segment.lookup(missing) is None
+    index.close()
+
+
+def test_positions_of_subset(tmp_path):
+    docs = {}
+    index = InvertedIndex(tmp_path)
+    for text in make_docs(40, seed=4):
+        docs[index.add_text(text, path=f"p{len(docs)}")] = text
+    index.commit()
+
+    # 只解码部分文档的位置，结果与完整解码一致
+    for term in ("w0", "w5", "克莱恩"):
+        full = dict(index.positional_postings(term))
+        subset = sorted(full)[::3] + [10 ** 6]
+        assert index.positions(term, subset) == {doc_id: full[doc_id] for doc_id in subset if doc_id in full}
+    index.close()
+
+
+def test_auto_merge(tmp_path, monkeypatch):
+    monkeypatch.setattr(InvertedIndex, "MAX_SEGMENTS", 2)
+    docs = {}
+    index = InvertedIndex(tmp_path)
+    for batch in range(3):
+        for text in make_docs(5, seed=10 + batch):
+            docs[index.add_text(text, path=f"p{len(docs)}")] = text
+        index.commit()
+    # 第三次提交超过段数上限，自动合并为一段
+    assert len(index.segments) == 1
+    assert_matches(index, docs)
+    index.close()
+
+
+def test_cursor_matches_postings(tmp_path, monkeypatch):
+    monkeypatch.setattr(SegmentWriter, "BLOCK_SIZE", 4)
+    index = InvertedIndex(tmp_path)
+    for batch in range(3):
+        for text in make_docs(40, seed=20 + batch):
+            index.add_text(text, path="p")
+        index.commit()
+    for doc_id in (0, 1, 2, 3, 50, 119):
+        index.delete(doc_id)
+    index.commit()
+
+    rng = random.Random(5)
+    for term in VOCABULARY + ["不存在的词"]:
+        doc_ids, tfs = index.postings(term)
+        expected = dict(zip(doc_ids, tfs))
+
+        # 逐篇前进
+        cursor = index.cursor(term)
+        walked = {}
+        while cursor.doc != PostingCursor.END:
+            walked[cursor.doc] = cursor.tf
+            cursor.advance()
+        assert walked == expected
+
+        # 随机递增的seek目标（跨小块、跨段、落在已删除文档上）
+        cursor = index.cursor(term)
+        target = 0
+        while True:
+            target += rng.randint(0, 12)
+            cursor.seek(target)
+            want = next((doc_id for doc_id in doc_ids if doc_id >= target), PostingCursor.END)
+            assert cursor.doc == want
+            if want == PostingCursor.END:
+                break
+            assert cursor.tf == expected[want]
+    index.close()
+
+
+def test_seek_skips_blocks_without_decoding(tmp_path, monkeypatch):
+    monkeypatch.setattr(SegmentWriter, "BLOCK_SIZE", 8)
+    index = InvertedIndex(tmp_path)
+    for _ in range(800):
+        index.add_text("常见词", path="p")
+    index.commit()
+
+    decoded = []
+    original = Segment.decode_block
+
+    def counting_decode(self, entry, start, end, base):
+        decoded.append(start)
+        return original(self, entry, start, end, base)
+
+    monkeypatch.setattr(Segment, "decode_block", counting_decode)
+    cursor = index.cursor("常见词")
+    cursor.seek(700)
+    assert cursor.doc == 700
+    # 只解码第一个小块和目标所在的小块
+    assert len(decoded) == 2
+    index.close()
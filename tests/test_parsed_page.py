@@ -0,0 +1,14 @@
+# test_parsed_page.py
+from utils.ParsedPage import ParsedPage, compile_xpath
+
+CONTENT = compile_xpath('//div[@id="content"]')
+
+
+def test_text_skips_script_and_style():
+    page = ParsedPage(
+        "<div id='content'> 第一段 <script>var ad = 1;</script><style>p{}</style>"
+        "<!-- 注释 --><p> 第二段 <script>track()</script></p>结尾 </div>"
+    )
+    assert page.first_text(CONTENT) == "第一段第二段结尾"
+    assert page.first_text(compile_xpath('//script')) == ""
+    assert page.text(" 属性值 ") == "属性值"
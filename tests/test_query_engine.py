@@ -0,0 +1,142 @@
+# test_query_engine.py
+import random
+from collections import Counter
+
+import pytest
+
+from utils.InvertedIndex import InvertedIndex, SegmentWriter
+from utils.QueryEngine import QueryEngine, gallop, intersect
+
+VOCABULARY = [f"w{i}" for i in range(30)]
+
+
+@pytest.fixture(params=[128, 4], ids=["one-block", "skips"])
+def corpus(request, tmp_path, monkeypatch):
+    """两段随机文档（含一篇已删除文档）组成的索引，返回(engine, {doc_id: 词列表})
+
+    小块长度为4时高频词带跳表，WAND的seek会整块跳过。
+    """
+    monkeypatch.setattr(SegmentWriter, "BLOCK_SIZE", request.param)
+    rng = random.Random(42)
+    weights = [1 / (rank + 1) for rank in range(len(VOCABULARY))]
+    index = InvertedIndex(tmp_path)
+    docs = {}
+    for _ in range(2):
+        for _ in range(60):
+            tokens = rng.choices(VOCABULARY, weights, k=rng.randint(3, 80))
+            docs[index.add_text(" ".join(tokens), path="p")] = tokens
+        index.commit()
+    index.delete(5)
+    index.commit()
+    index.merge()
+    del docs[5]
+    engine = QueryEngine(index)
+    yield engine, docs
+    index.close()
+
+
+def brute_scores(engine, docs, terms):
+    """对每篇文档逐词计算BM25（不做任何剪枝）"""
+    scores = {}
+    for term, weight in Counter(terms).items():
+        df = sum(1 for tokens in docs.values() if term in tokens)
+        if not df:
+            continue
+        idf = engine.idf(df) * weight
+        for doc_id, tokens in docs.items():
+            tf = tokens.count(term)
+            if tf:
+                scores[doc_id] = scores.get(doc_id, 0.0) + engine.term_score(idf, tf, len(tokens))
+    return scores
+
+
+def test_gallop_and_intersect():
+    seq = [1, 3, 5, 7, 9, 11]
+    for target in range(13):
+        for lo in range(len(seq) + 1):
+            want = next((i for i in range(lo, len(seq)) if seq[i] >= target), len(seq))
+            assert gallop(seq, target, lo) == want
+    assert intersect([[1, 2, 3, 8], [2, 3, 4, 8, 9], [0, 2, 8]]) == [2, 8]
+    assert intersect([[1, 2], []]) == []
+
+
+@pytest.mark.parametrize("terms", [
+    ["w0"],
+    ["w3", "w7"],
+    ["w1", "w2", "w15", "w29"],
+    ["w4", "w4", "w20"],  # 重复词按次数加权
+    ["w25", "w26", "w27", "w28"],  # 低频词
+    ["不存在", "w9"],
+])
+@pytest.mark.parametrize("k", [1, 5, 200])
+def test_wand_matches_brute_force(corpus, terms, k):
+    engine, docs = corpus
+    scores = brute_scores(engine, docs, terms)
+    hits = engine.search_terms(terms, k)
+
+    expected = sorted(scores.values(), reverse=True)[:k]
+    assert [hit["score"] for hit in hits] == pytest.approx(expected)
+    for hit in hits:
+        assert hit["score"] == pytest.approx(scores[hit["doc_id"]])
+
+
+def test_score_docs_matches_brute_force(corpus):
+    engine, docs = corpus
+    terms = ["w2", "w6", "w11"]
+    candidates = sorted(docs)[::4]
+    # 只对候选文档打分，idf仍按全部文档计算
+    scores = brute_scores(engine, docs, terms)
+    hits = engine.score_docs(candidates, terms, k=len(candidates))
+    assert {hit["doc_id"] for hit in hits} == set(candidates)
+    for hit in hits:
+        assert hit["score"] == pytest.approx(scores.get(hit["doc_id"], 0.0))
+
+
+def brute_phrase(tokens, terms):
+    """短语出现次数：逐个起点比较"""
+    n = len(terms)
+    return sum(1 for i in range(len(tokens) - n + 1) if tokens[i:i + n] == terms)
+
+
+def brute_proximity(tokens, terms, span):
+    """邻近出现次数：两端都不能再收缩的覆盖窗口中，长度不超过span的个数"""
+    need = set(terms)
+    matches = 0
+    for start, token in enumerate(tokens):
+        if token not in need:
+            continue
+        seen = set()
+        for end in range(start, len(tokens)):
+            if tokens[end] in need:
+                seen.add(tokens[end])
+            if seen == need:
+                if token not in tokens[start + 1:end + 1] and end - start < span:
+                    matches += 1
+                break
+    return matches
+
+
+@pytest.mark.parametrize("terms", [["w0", "w1"], ["w1", "w0"], ["w0", "w0"], ["w2", "w0", "w1"], ["w0"]])
+def test_phrase_matches_brute_force(corpus, terms):
+    engine, docs = corpus
+    expected = {doc_id: brute_phrase(tokens, terms) for doc_id, tokens in docs.items()}
+    assert engine.match_phrase(terms) == sorted((d, c) for d, c in expected.items() if c)
+
+
+@pytest.mark.parametrize("terms,slop", [(["w0", "w1"], 0), (["w0", "w3"], 3), (["w1", "w2", "w5"], 5)])
+def test_proximity_matches_brute_force(corpus, terms, slop):
+    engine, docs = corpus
+    expected = {doc_id: brute_proximity(tokens, terms, len(terms) + slop) for doc_id, tokens in docs.items()}
+    assert engine.match_phrase(terms, slop) == sorted((d, c) for d, c in expected.items() if c)
+
+
+def test_search_with_phrase_filter(corpus, monkeypatch):
+    engine, docs = corpus
+    monkeypatch.setattr(engine, "tokenize", str.split)  # 测试语料已是分好的词
+    hits = engine.search('w7 "w0 w1"', k=200)
+    matched = {doc_id for doc_id, tokens in docs.items() if brute_phrase(tokens, ["w0", "w1"])}
+    assert {hit["doc_id"] for hit in hits} == matched
+    scores = brute_scores(engine, docs, ["w7", "w0", "w1"])
+    for hit in hits:
+        assert hit["score"] == pytest.approx(scores[hit["doc_id"]])
+    assert engine.search('"w29 w28 w27 w26"', k=10) == []
@@ -0,0 +1,105 @@
+# test_reprocess_manifest.py
+import sqlite3
+
+import pytest
+
+from utils.ReprocessManifest import ReprocessManifest
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    manifest = ReprocessManifest(tmp_path / "manifest.db")
+    yield manifest
+    manifest.close()
+
+
+def fail_load():
+    raise AssertionError("修改时间和大小未变时不应读取文件")
+
+
+def test_content_hash_matches_for_str_and_bytes():
+    text = "诡秘之主"
+    assert ReprocessManifest.content_hash(text) == ReprocessManifest.content_hash(text.encode("utf-8"))
+    assert ReprocessManifest.content_hash("a") != ReprocessManifest.content_hash("b")
+
+
+def test_check_reasons(manifest, tmp_path):
+    output = tmp_path / "dealer.txt"
+    output.write_text("x")
+    digest = ReprocessManifest.content_hash(b"page")
+
+    assert manifest.check("origin/a.html", "cfg", 1.0, 4) == (ReprocessManifest.NEW, None)
+    manifest.record("origin/a.html", digest, "cfg", output, 1.0, 4)
+
+    # 未修改：走快速路径，不读取文件
+    assert manifest.check("origin/a.html", "cfg", 1.0, 4, load=fail_load) == (None, digest)
+    # 只是修改时间变化：读取后哈希相同，无需处理
+    assert manifest.check("origin/a.html", "cfg", 2.0, 4, load=lambda: b"page") == (None, digest)
+    # 内容变化
+    changed = ReprocessManifest.content_hash(b"page2")
+    assert manifest.check("origin/a.html", "cfg", 2.0, 5, load=lambda: b"page2") == (ReprocessManifest.CONTENT, changed)
+    # 归档记录自带摘要
+    assert manifest.check("origin/a.html", "cfg", 9.0, 9, digest=digest, load=fail_load) == (None, digest)
+    # dealer配置变化
+    assert manifest.check("origin/a.html", "cfg2", 1.0, 4) == (ReprocessManifest.CONFIG, digest)
+    # 输出文件丢失
+    output.unlink()
+    assert manifest.check("origin/a.html", "cfg", 1.0, 4) == (ReprocessManifest.OUTPUT, digest)
+
+
+def test_touch_enables_fast_path(manifest):
+    digest = ReprocessManifest.content_hash(b"page")
+    manifest.record("origin/a.html", digest, "cfg", None, 1.0, 4)
+    manifest.touch("origin/a.html", 2.0, 4)
+    assert manifest.check("origin/a.html", "cfg", 2.0, 4, load=fail_load) == (None, digest)
+
+
+def test_records_survive_reopen(tmp_path):
+    manifest = ReprocessManifest(tmp_path / "manifest.db")
+    manifest.record("origin/a.html", "h", "cfg", None, 1.0, 4)
+    manifest.close()  # 未满COMMIT_EVERY条的记录在关闭时提交
+    reopened = ReprocessManifest(tmp_path / "manifest.db")
+    assert reopened.check("origin/a.html", "cfg", 1.0, 4) == (None, "h")
+    reopened.close()
+
+
+def test_migrates_old_schema(tmp_path):
+    db_file = tmp_path / "manifest.db"
+    conn = sqlite3.connect(str(db_file))
+    conn.execute("CREATE TABLE sources (source TEXT PRIMARY KEY, output TEXT, mtime REAL, size INTEGER)")
+    conn.execute("INSERT INTO sources VALUES ('origin/a.html', NULL, 1.0, 4)")
+    conn.commit()
+    conn.close()
+
+    manifest = ReprocessManifest(db_file)
+    # 旧记录没有内容哈希：重新处理一次
+    assert manifest.check("origin/a.html", "cfg", 1.0, 4)[0] == ReprocessManifest.NEW
+    manifest.record("origin/a.html", "h", "cfg", None, 1.0, 4)
+    assert manifest.check("origin/a.html", "cfg", 1.0, 4) == (None, "h")
+    manifest.close()
+
+
+def test_config_hash_tracks_stopwords(monkeypatch):
+    from utils.Stopwords import Stopwords
+    from utils.dealer_cn import dealer_cn
+
+    monkeypatch.setattr(dealer_cn, "stopwords", Stopwords(["的"]))
+    before = dealer_cn.config_hash()
+    assert dealer_cn.config_hash() == before
+    dealer_cn.add_stopword("了")
+    assert dealer_cn.config_hash() != before
+    assert dealer_cn.config_hash(uppercase=True) != dealer_cn.config_hash()
+    monkeypatch.setattr(dealer_cn, "DEALER_VERSION", dealer_cn.DEALER_VERSION + 1)
+    assert dealer_cn.config_hash() != before
+
+
+def test_iter_archive_reports_utf8_size(tmp_path):
+    from reprocess import iter_archive
+    from utils.PageArchive import PageArchive
+
+    archive = PageArchive(tmp_path / "archive")
+    archive.put("origin/t/a.html", "http://a.com/1", "<p>诡秘之主</p>")
+    archive.close()
+    [(path, _, size, _, content)] = list(iter_archive(tmp_path / "archive"))
+    assert content == "<p>诡秘之主</p>"
+    assert size == len(content.encode("utf-8")) == 19
@@ -0,0 +1,33 @@
+# test_web_utils.py
+import pytest
+
+from utils.WebUtils import WebUtils
+
+
+class Response:
+    """没有声明charset的响应"""
+    headers = None
+
+
+@pytest.mark.parametrize("declared", ["iso-8859-1", "gbk"])
+def test_undeclared_page_ignores_previous_page_on_host(declared):
+    page = f"<html><head><meta charset='{declared}'></head><body>abc</body></html>".encode(declared)
+    assert WebUtils.decode_content(page, Response(), "http://example.com/1").endswith("abc</body></html>")
+
+    # 同一主机的下一个页面没有声明编码：按utf-8 > gbk > latin-1自动检测
+    undeclared = "<p>你好</p>".encode("utf-8")
+    assert WebUtils.decode_content(undeclared, Response(), "http://example.com/2") == "<p>你好</p>"
+
+
+def test_meta_charset_beyond_sniff_window():
+    body = b"<html>" + b" " * (WebUtils.SNIFF_BYTES + 100) + b"<meta charset='gbk'>" + "中文".encode("gbk")
+    assert WebUtils.decode_content(body, Response(), "http://example.com/3").endswith("中文")
+
+
+def test_sniff_charset_priority():
+    assert WebUtils.sniff_charset(b"\xef\xbb\xbf<meta charset='gbk'>") == "utf-8"
+    assert WebUtils.sniff_charset(
+        b'<meta http-equiv="Content-Type" content="text/html; charset=gb2312"><meta charset="utf-8">'
+    ) == "utf-8"
+    assert WebUtils.sniff_charset(b'<meta http-equiv="Content-Type" content="text/html; charset=gb2312">') == "gb2312"
+    assert WebUtils.sniff_charset(b"<p>no declaration</p>") is None
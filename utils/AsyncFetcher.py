@@ -0,0 +1,127 @@
+# AsyncFetcher.py
+import asyncio
+
+import aiohttp
+
+from utils.Fetcher import Fetcher
+from utils.HttpPool import ACCEPT_ENCODING, ContentDecoder, HttpConnectionPool
+from utils.TqdmLogHandler import logger
+from utils.WebUtils import WebUtils
+
+
+class AsyncFetcher(Fetcher):
+    """异步HTTP请求处理器（asyncio + aiohttp）
+
+    与Fetcher保持相同的语义：
+    - 随机请求头
+    - 指数退避重试（asyncio.sleep，不阻塞事件循环）
+    - 内容解码与原始网页存档（文件写入放到线程中执行）
+    - 压缩传输与字节统计（关闭aiohttp自动解压，改用ContentDecoder流式解压）
+
+    区别在于单线程即可维持数百个并发请求，适合等待时间远大于处理时间的场景。
+    session必须在事件循环内创建，因此需在协程中使用并在结束时调用aclose()。
+    """
+
+    def __init__(self, retries=3, timeout=10, pool_size=5, concurrency=100, revalidate=True, offline=False,
+                 archive=None):
+        """初始化异步请求器
+
+        Args:
+            retries (int): 失败请求重试次数
+            timeout (int): 请求超时时间（秒）
+            pool_size (int): 每个主机的最大连接数
+            concurrency (int): 全局最大连接数
+            revalidate (bool): 是否对已存档页面发送条件请求
+            offline (bool): 离线模式，只返回本地存档
+            archive (PageArchive): 原始网页归档（可与同步Fetcher共用）
+        """
+        super().__init__(retries=retries, timeout=timeout, pool_size=pool_size,
+                         revalidate=revalidate, offline=offline, archive=archive)
+        self.concurrency = concurrency
+        self._session = None
+
+    def _create_pool(self, pool_size, timeout):
+        """连接由aiohttp会话管理，不创建同步连接池"""
+        return None
+
+    def _get_session(self):
+        """惰性创建aiohttp会话（连接池按主机限流）"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.pool_size)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                auto_decompress=False,  # 由ContentDecoder解压以便统计传输字节
+            )
+        return self._session
+
+    async def fetch_and_save(self, url, file_name=None, direction=True, save_origin=True):
+        """异步执行请求并保存网页内容（参数与返回值同Fetcher.fetch_and_save）"""
+        save_path = self._origin_path(url, direction, file_name)
+
+        # 离线模式：只读本地存档
+        if self.offline:
+            cached = await asyncio.to_thread(self._load_cached, save_path, url)
+            if cached is None:
+                logger.info(f"📴 离线模式下无本地存档: {url}")
+            return cached
+
+        session = self._get_session()
+        for attempt in range(self.retries):
+            try:
+                headers = {**self.get_random_headers(), 'Accept-Encoding': ACCEPT_ENCODING}
+                if save_origin:
+                    headers.update(self._conditional_headers(save_path, url))
+                response, content = await self._get(session, url, headers)
+
+                # 服务端确认未修改：直接使用本地存档
+                if response.status == 304:
+                    cached = await asyncio.to_thread(self._load_cached, save_path, url)
+                    if cached is not None:
+                        logger.info(f"♻️ 页面未修改，使用本地存档: {save_path}")
+                        return cached
+                    # 存档已被删除（或归档中缺少该记录）：不带条件头重新请求完整页面
+                    logger.info(f"⚠️ 页面未修改但本地存档缺失，重新请求完整页面: {url}")
+                    headers = {**self.get_random_headers(), 'Accept-Encoding': ACCEPT_ENCODING}
+                    response, content = await self._get(session, url, headers)
+                    if response.status == 304:
+                        raise ValueError("无条件请求仍返回304，没有可用的页面内容")
+
+                # 智能解码内容（自动检测编码）
+                decoded = WebUtils.decode_content(content, response, url)
+                if not decoded.strip():
+                    # 空白页面无法解析，按请求失败重试，且不覆盖本地存档
+                    raise ValueError("响应内容为空")
+
+                # 文件写入为阻塞操作，交给线程执行
+                if save_origin:
+                    await asyncio.to_thread(self._store_origin, url, decoded, direction, file_name, response.headers)
+
+                return decoded
+
+            except aiohttp.ClientResponseError as e:
+                logger.info(f"⛔ HTTP错误 {e.status}: {e.message} (尝试 {attempt + 1}/{self.retries})")
+            except Exception as e:
+                logger.info(f"⚠️ 请求失败: {str(e)} (尝试 {attempt + 1}/{self.retries})")
+
+            # 指数退避策略（2^attempt秒）
+            await asyncio.sleep(2 ** attempt)
+
+        return None
+
+    async def _get(self, session, url, headers):
+        """发送一次GET请求并读取完整响应体，返回(response, 解压后的内容)"""
+        async with session.get(url, headers=headers) as response:
+            response.raise_for_status()
+            decoder = ContentDecoder(response.headers.get('Content-Encoding'))
+            async for chunk in response.content.iter_chunked(HttpConnectionPool.CHUNK_SIZE):
+                decoder.feed(chunk)
+            content = decoder.finish()
+        self._record_transfer(url, decoder.wire_bytes, decoder.raw_bytes)
+        return response, content
+
+    async def aclose(self):
+        """关闭aiohttp会话"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
@@ -1,23 +1,35 @@
 # BaseSpider.py
+import asyncio
 import time
 from abc import ABC, abstractmethod
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from threading import Lock
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from functools import partial
+from pathlib import Path
+from threading import Lock, local
 
 from numpy import random
 from tqdm import tqdm
 
+from utils.BufferedWriter import BufferedWriter
 from utils.Fetcher import Fetcher
+from utils.HostScheduler import HostScheduler
+from utils.PageArchive import PageArchive
+from utils.Saver import Saver
+from utils.SimHash import SimHashIndex, simhash
 from utils.TqdmLogHandler import logger
 
+_NO_TASK = object()  # 任务迭代器耗尽的标记
+
 
 class BaseSpider(ABC):
     """爬虫基类，定义通用接口和基础功能
 
     特性：
-    - 多线程并发执行
+    - 多线程并发执行（或asyncio单线程并发）
     - 自动重试机制
-    - 随机请求延迟
+    - 按主机的礼貌性调度（最小间隔 + 并发上限 + 可选令牌桶）
     - 线程安全日志
     - 可扩展的配置参数
 
@@ -26,8 +38,27 @@ class BaseSpider(ABC):
     - timeout: 请求超时时间（默认10秒，建议10-30）
     - delay_range: 随机延迟范围（默认1-3秒，高频率请求建议3-5秒）
     - threads: 并发线程数（默认5，根据目标网站承受能力调整）
+    - pool_size: 每个主机的长连接池大小（默认与threads一致）
+    - revalidate: 对已存档页面发送条件请求，304时复用本地副本（默认True）
+    - offline: 只读本地存档、不访问网络（默认False）
+    - archive: 原始网页归档目录（如'origin/archive'），设置后代替逐页保存的.html文件（默认None）
+    - archive_compression: 归档压缩格式，'gzip'（默认）或'zstd'
+    - backend: 并发后端，'thread'（默认，线程池）或'async'（asyncio事件循环）
+    - concurrency: async后端的最大在途请求数（默认100）
+    - host_concurrency: 同一主机的最大并发请求数（未设置时同一主机的请求之间间隔完整的delay_range；
+      设置后间隔按该并发数均摊）
+    - host_rate/host_burst: 可选的单主机令牌桶限速（每秒令牌数/桶容量）
+    - dedup: 按正文SimHash跳过近重复页面（默认False）
+    - buffered_writes: parsed/与dealer/的章节文件交给后台线程批量写入（默认True）
+    - fsync: 后台写入的每个文件是否fsync（默认False）
+    - parquet: 抓取结果逐条追加到parsed/<name>/results/下的Parquet文件（需安装pyarrow，默认False）
     """
 
+    DEDUP_MIN_LENGTH = 50  # 正文过短（如空页）时不做近重复检测
+    DISPATCH_LOOKAHEAD = 4  # 按主机派发时预取的任务数（在途上限的倍数），供调度器挑选就绪主机
+    BACKENDS = ('thread', 'async')
+    ASYNC_BACKEND = False  # 子类提供协程版worker（使用async_fetcher与throttle_async）时设为True
+
     def __init__(self, name, config=None):
         """初始化爬虫实例
 
@@ -38,24 +69,84 @@ class BaseSpider(ABC):
                 - timeout: 请求超时时间(秒)
                 - delay_range: (min, max)随机延迟范围
                 - threads: 最大并发线程数
+                - pool_size: 每个主机保留的keep-alive连接数
+                - revalidate: 是否发送条件请求
+                - offline: 是否启用离线模式
+                - archive: 原始网页归档目录
+                - archive_compression: 归档压缩格式
+                - backend: 'thread'或'async'
+                - concurrency: async后端的最大在途请求数
+                - host_concurrency: 同一主机的最大并发请求数（设置后请求间隔按其均摊）
+                - host_rate: 单主机令牌桶速率（每秒请求数，可选）
+                - host_burst: 单主机令牌桶容量
+                - dedup: 是否启用近重复检测
+                - buffered_writes: 是否启用后台批量写入
+                - fsync: 后台写入是否fsync
+                - parquet: 是否流式保存Parquet结果
         """
         self.name = name
         self.config = config or {}
 
         # 设置默认配置参数
-        self.dealer = None  # 文本处理器
+        self.dealer = self.config.get('dealer')  # 文本处理器（由config传入）
+
+        # 并发执行配置（根据目标网站承受能力调整）
+        self.threads = self.config.get('threads', 5)  # 默认5线程并发
 
-        # 初始化请求器（配置重试和超时）
+        # 初始化请求器（配置重试、超时和连接池）
         self.fetcher = Fetcher(
             retries=self.config.get('retries', 3),  # 默认3次重试
             timeout=self.config.get('timeout', 10),  # 默认10秒超时
+            pool_size=self.config.get('pool_size', self.threads),  # 每个线程最多占用一个长连接
+            revalidate=self.config.get('revalidate', True),  # 已存档页面发送条件请求
+            offline=self.config.get('offline', False),  # 离线模式只读本地存档
+            archive=PageArchive.shared(
+                self.config['archive'],
+                compression=self.config.get('archive_compression', 'gzip')
+            ) if self.config.get('archive') else None,  # 原始网页写入分段归档
         )
 
         # 请求延迟配置（防止IP封锁）
         self.delay_range = self.config.get('delay_range', (1, 3))  # 默认1-3秒随机延迟
 
-        # 并发执行配置（根据目标网站承受能力调整）
-        self.threads = self.config.get('threads', 5)  # 默认5线程并发
+        # 按主机的礼貌性调度器（只在目标主机需要限流时等待）
+        # 未显式设置host_concurrency时，单站点的请求间隔不因线程数增加而缩短
+        host_concurrency = self.config.get('host_concurrency')
+        self.scheduler = HostScheduler(
+            delay_range=self.delay_range,
+            max_per_host=host_concurrency or self.threads,
+            rate=self.config.get('host_rate'),
+            burst=self.config.get('host_burst', 1),
+            spread_delay=host_concurrency is not None,
+        )
+        self._held = local()  # 记录当前线程已由调度器预占的URL
+
+        # 并发后端配置（async后端的请求器在事件循环内按需创建）
+        self.backend = self.config.get('backend', 'thread')
+        if self.backend not in self.BACKENDS:
+            raise ValueError(f"不支持的并发后端: {self.backend}（可选: {', '.join(self.BACKENDS)}）")
+        if self.backend == 'async' and not self.ASYNC_BACKEND:
+            logger.warning(f"⚠️ {self.name} 未实现async后端，改用线程后端")
+            self.backend = 'thread'
+        self.concurrency = self.config.get('concurrency', 100)
+        self.async_fetcher = None
+        self._slot_released = None  # async后端：有主机名额被归还时置位的事件
+
+        # 近重复检测（指纹随self.state持久化，索引在首次检测时重建）
+        self.dedup = self.config.get('dedup', False)
+        self._simhash_index = None
+        self._dedup_lock = Lock()
+
+        # 后台写入器：章节文件排队写入，依赖文件的状态流转在写入完成后执行
+        self.writer = BufferedWriter(
+            fsync=self.config.get('fsync', False)
+        ) if self.config.get('buffered_writes', True) else None
+        if self.dealer is not None and getattr(self.dealer, 'writer', False) is None:
+            self.dealer.writer = self.writer  # dealer的输出共用同一写入器
+        self._failed_writes = set()  # 同步写入模式下有文件写入失败的页面URL
+
+        # 结果记录流式写入Parquet（每次运行一个文件，parsed/<name>/results/组成数据集目录）
+        self.sink = Saver(Saver.run_path(Path("parsed") / self.name)) if self.config.get('parquet') else None
 
         # 线程安全日志锁（防止多线程日志输出混乱）
         self.log_lock = Lock()
@@ -76,41 +167,303 @@ class BaseSpider(ABC):
 
         使用numpy生成均匀分布的随机延迟，比标准random更高效
         建议根据目标网站robots.txt要求调整延迟范围
+        注意：爬虫内部已改用throttle按主机调度，此方法仅为兼容保留
         """
         time.sleep(random.uniform(*self.delay_range))
 
-    def parallel_execute(self, tasks, worker):
+    @contextmanager
+    def throttle(self, url):
+        """按主机限流的请求上下文（替代random_delay）
+
+        进入时等待目标主机就绪并占用名额，退出时归还。
+        若任务已由parallel_execute的调度器预占名额，则直接放行。
+
+        用法：
+            with self.throttle(url):
+                content = self.fetcher.fetch_and_save(url)
+        """
+        if getattr(self._held, 'url', None) == url:
+            yield
+            return
+        with self.scheduler.slot(url):
+            yield
+
+    async def throttle_async(self, url):
+        """throttle的协程版本：等待主机就绪并占用名额（结束后需调用release_async）"""
+        while (wait := self.scheduler.try_acquire(url)) != 0:
+            if wait is None:
+                # 并发已满：等到有名额被归还后再判断
+                if self._slot_released is None:
+                    self._slot_released = asyncio.Event()
+                await self._slot_released.wait()
+            else:
+                # 睡到调度器计算的就绪时间
+                await asyncio.sleep(wait)
+
+    def release_async(self, url):
+        """归还throttle_async占用的主机名额，并唤醒等待名额的协程"""
+        self.scheduler.release(url)
+        released, self._slot_released = self._slot_released, None
+        if released is not None:
+            released.set()
+
+    def parallel_execute(self, tasks, worker, key=None):
         """通用并行执行方法（生产者-消费者模式）
 
         参数：
         - tasks (iterable): 任务列表（如URL列表）
         - worker (callable): 任务处理函数，接收单个task作为参数
+        - key (callable): 可选，从任务中提取URL；提供时按主机就绪顺序派发任务
 
         返回：
         list: 所有worker返回结果的集合（自动展开列表型结果）
 
         设计特点：
-        - 使用ThreadPoolExecutor管理线程池
-        - 支持动态任务提交和结果收集
+        - 基于iter_execute：有界在途任务、按完成顺序收集结果
         - 自动处理任务异常并记录错误日志
+        - backend为'async'且worker是协程函数时，转交async_parallel_execute执行
+        - 提供key时由调度器挑选主机已就绪的任务交给空闲线程，线程不再空等
+        - 需要边执行边处理结果（不在内存中保留全部结果）时直接使用iter_execute
         """
+        if self.backend == 'async' and asyncio.iscoroutinefunction(worker):
+            return asyncio.run(self._run_async(tasks, worker))
+
         results = []
-        with ThreadPoolExecutor(max_workers=self.threads) as executor:
-            # 提交初始任务集合（future->task映射用于错误追踪）
-            futures = {executor.submit(worker, task): task for task in tasks}
-
-            # 使用tqdm进度条（需配合适当的total参数）
-            for future in as_completed(futures):
-                try:
-                    result = future.result()
+        for result in self.iter_execute(tasks, worker, key=key):
+            # 自动展开列表型结果（支持多维结果收集）
+            results.extend(result if isinstance(result, list) else [result])
+        return results
+
+    def iter_execute(self, tasks, worker, key=None, max_in_flight=None, cancel=None):
+        """流式并行执行（生成器，线程后端）
+
+        任务按需从tasks中取出，同时在途的任务不超过max_in_flight，
+        结果按完成顺序产出；消费方处理不过来时不再提交新任务（背压），内存占用与任务总数无关。
+
+        参数：
+        - tasks (iterable): 任务（可为惰性生成器，只遍历一次）
+        - worker (callable): 任务处理函数，接收单个task作为参数
+        - key (callable): 可选，从任务中提取URL；提供时从预取窗口中挑选主机已就绪的任务派发
+        - max_in_flight (int): 最多在途任务数（默认线程数的2倍；提供key时不超过线程数，
+          避免排队中的任务占用主机名额）
+        - cancel (threading.Event): 置位后不再提交新任务，取消尚未开始的任务，只等待正在执行的任务
+
+        产出：
+        worker的返回值（空结果跳过；失败的任务记录日志后跳过）
+
+        提前结束迭代（break或close()）同样会取消尚未开始的任务并等待正在执行的任务结束。
+        """
+        tasks = iter(tasks)
+        limit = max_in_flight or self.threads * 2
+        if key is not None:
+            limit = min(limit, self.threads)
+        window = deque()  # 已取出、等待主机就绪的任务（仅提供key时使用）
+        in_flight = {}  # future -> task
+        executor = ThreadPoolExecutor(max_workers=self.threads)
+
+        def run(task, url):
+            # 名额已由调度器预占，throttle(url)直接放行
+            self._held.url = url
+            try:
+                return worker(task)
+            finally:
+                self._held.url = None
+                self.scheduler.release(url)
+
+        def cancel_pending():
+            for future, task in list(in_flight.items()):
+                if future.cancel():
+                    del in_flight[future]
+                    if key is not None:
+                        self.scheduler.release(key(task))  # 未执行的任务归还预占的名额
+
+        try:
+            while True:
+                if cancel is not None and cancel.is_set():
+                    cancel_pending()
+                else:
+                    # 补充在途任务
+                    while len(in_flight) < limit:
+                        if key is None:
+                            task = next(tasks, _NO_TASK)
+                            if task is _NO_TASK:
+                                break
+                            in_flight[executor.submit(worker, task)] = task
+                            continue
+                        while len(window) < limit * self.DISPATCH_LOOKAHEAD:
+                            task = next(tasks, _NO_TASK)
+                            if task is _NO_TASK:
+                                break
+                            window.append(task)
+                        if not window:
+                            break
+                        task = self.scheduler.next_ready(window, key)
+                        in_flight[executor.submit(run, task, key(task))] = task
+                if not in_flight:
+                    break
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = in_flight.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.error(f"⚠️ 任务执行失败: {task} - {str(e)}")
+                        continue
+                    if result:
+                        yield result
+        finally:
+            cancel_pending()
+            executor.shutdown(wait=True)
+
+    async def _run_async(self, tasks, worker):
+        """在新事件循环中创建异步请求器并执行任务，结束后关闭会话"""
+        # 延迟导入：仅在启用async后端时才需要aiohttp
+        from utils.AsyncFetcher import AsyncFetcher
+
+        self.async_fetcher = AsyncFetcher(
+            retries=self.fetcher.retries,
+            timeout=self.fetcher.timeout,
+            pool_size=self.fetcher.pool_size,
+            concurrency=self.concurrency,
+            revalidate=self.fetcher.revalidate,
+            offline=self.fetcher.offline,
+            archive=self.fetcher.archive,
+        )
+        try:
+            return await self.async_parallel_execute(tasks, worker)
+        finally:
+            await self.async_fetcher.aclose()
+            self.async_fetcher = None
+            self._slot_released = None
+
+    async def async_parallel_execute(self, tasks, worker):
+        """异步并行执行方法（单线程事件循环）
+
+        参数：
+        - tasks (iterable): 任务列表
+        - worker (coroutine function): 异步任务处理函数，接收单个task作为参数
+
+        返回：
+        list: 所有worker返回结果的集合（与parallel_execute相同的展开规则）
+
+        设计特点：
+        - 任务按需从tasks中取出，同时在途的协程不超过concurrency（与iter_execute相同的有界窗口）
+        - 等待延迟和网络IO时不占用线程
+        """
+        tasks = iter(tasks)
+        in_flight = {}  # asyncio.Task -> task
+        results = []
+        try:
+            while True:
+                # 补充在途任务
+                while len(in_flight) < self.concurrency:
+                    task = next(tasks, _NO_TASK)
+                    if task is _NO_TASK:
+                        break
+                    in_flight[asyncio.ensure_future(worker(task))] = task
+                if not in_flight:
+                    break
+
+                done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    task = in_flight.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.error(f"⚠️ 任务执行失败: {task} - {str(e)}")
+                        continue
                     if result:
-                        # 自动展开列表型结果（支持多维结果收集）
                         results.extend(result if isinstance(result, list) else [result])
-                except Exception as e:
-                    task = futures[future]
-                    logger.error(f"⚠️ 任务执行失败: {task} - {str(e)}")
+        finally:
+            for future in in_flight:
+                future.cancel()
         return results
 
+    def find_duplicate(self, url, text):
+        """近重复检测（config['dedup']开启时生效）
+
+        在分词和写文件之前调用：正文与已处理页面近似时返回原页面URL，
+        否则记录该页面指纹并返回None。子类有self.state时指纹会持久化，下次运行继续比较。
+
+        Args:
+            url (str): 页面URL
+            text (str): 解析出的正文
+
+        Returns:
+            str/None: 原页面URL
+        """
+        if not self.dedup or len(text) < self.DEDUP_MIN_LENGTH:
+            return None
+        state = getattr(self, 'state', None)
+        with self._dedup_lock:
+            if self._simhash_index is None:
+                self._simhash_index = SimHashIndex()
+                for known_url, fingerprint in (state.fingerprints() if state else []):
+                    self._simhash_index.add(fingerprint, known_url)
+        fingerprint = simhash(text)
+        original = self._simhash_index.find_or_add(fingerprint, url)
+        if original == url:
+            return None  # 上次运行中断前已记录过该页面
+        if original is None:
+            if state:
+                state.save_fingerprint(url, fingerprint)
+            return None
+        logger.info(f"♊ 近重复页面，跳过处理: {url} ≈ {original}")
+        return original
+
+    def write_file(self, path, content, callback=None, key=None):
+        """保存输出文件（utf-8-sig编码）
+
+        启用buffered_writes时只排队，由后台线程写入；callback在文件写入完成后调用，
+        写入失败时不调用（未启用时同步写入后立即调用）。
+        key为所属页面URL时，写入失败会让commit_page将该页面标记为failed。
+        """
+        if self.writer is not None:
+            self.writer.write(path, content, callback=callback, key=key)
+            return
+        try:
+            path = Path(path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with path.open("w", encoding="utf-8-sig") as f:
+                f.write(content)
+        except Exception:
+            if key is not None:
+                self._failed_writes.add(key)
+            raise
+        if callback is not None:
+            callback()
+
+    def commit_page(self, url, status, **fields):
+        """页面的输出文件全部写入后将其标记为status（processed/duplicate）
+
+        url的任一文件（write_file或dealer保存时以url为key）写入失败时不标记为完成，
+        改为标记failed，下次运行重新抓取。未启用后台写入时立即执行。
+        """
+        failed = partial(self.state.transition, url, 'failed')
+        if self.writer is not None:
+            self.writer.call_for(url, self.state.transition, url, status, on_failure=failed, **fields)
+        elif url in self._failed_writes:
+            self._failed_writes.discard(url)
+            failed()
+        else:
+            self.state.transition(url, status, **fields)
+
+    def flush_writes(self):
+        """等待后台写入和排队的状态流转全部完成（爬取结束时调用），汇总写入失败"""
+        if self.writer is not None and (errors := self.writer.flush()):
+            logger.error(f"🛑 本次共 {len(errors)} 个文件写入失败，对应页面已标记为failed，下次运行重新抓取")
+
+    def save_record(self, record):
+        """追加一条结果记录（章节/文章dict）到Parquet结果（未开启parquet或解析失败返回None时忽略）"""
+        if self.sink is not None and record:
+            self.sink.append(record)
+
+    def close_sink(self):
+        """写出剩余结果记录并关闭Parquet文件（爬取结束时调用）"""
+        if self.sink is not None:
+            self.sink.close()
+
     def log(self, message, prefix="⏳"):
         """线程安全的日志输出方法
 
@@ -0,0 +1,194 @@
+# BufferedWriter.py
+import atexit
+import os
+from pathlib import Path
+from queue import Empty, Queue
+from threading import Event, Lock, Thread
+from time import monotonic
+
+from utils.TqdmLogHandler import logger
+
+_STOP = object()  # 关闭后台线程的队列标记
+
+
+class BufferedWriter:
+    """后台批量写入器（parsed/与dealer/的章节文件）
+
+    核心功能：
+    - 抓取/处理线程只负责排队，文件写入在单个后台线程中完成，不再阻塞在小文件IO上
+    - 同一批写入的目录只创建一次，已创建的目录在进程内缓存，不再逐页mkdir
+    - 依赖文件已落盘的操作（如状态库标记parsed/processed）通过callback/call排队，
+      在之前的写入完成后才执行；进程中断时未写出的页面不会被标记为完成
+    - 写入可带key（如页面URL）：该key有写入失败时，call_for排队的操作改为执行on_failure，
+      不会把写入失败的页面标记为完成；失败记录由flush()返回
+    - fsync=True时每个文件写入后fsync，回调只在落盘后执行
+    - 队列有界，后台写入跟不上时调用方阻塞（背压），内存占用可控
+
+    线程安全：write/call/flush可在任意线程调用，执行顺序与排队顺序一致。
+
+    用法：
+        writer = BufferedWriter()
+        writer.write("parsed/书名/章节.txt", text, callback=lambda: state.transition(url, 'parsed'))
+        writer.call_for(url, state.transition, url, 'processed', on_failure=lambda: state.transition(url, 'failed'))
+        errors = writer.flush()  # 等待已排队的写入全部完成，返回期间的写入失败
+    """
+
+    def __init__(self, batch_size=64, flush_interval=0.2, max_pending=1024, fsync=False):
+        """初始化写入器（后台线程在首次写入时启动）
+
+        Args:
+            batch_size (int): 每批最多处理的排队项数
+            flush_interval (float): 凑批的最长等待时间（秒）
+            max_pending (int): 队列上限，超出时调用方阻塞
+            fsync (bool): 每个文件写入后是否fsync（网络存储上较慢，默认关闭）
+        """
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self._queue = Queue(maxsize=max_pending)
+        self._dirs = set()  # 已确认存在的目录
+        self._thread = None
+        self._start_lock = Lock()
+        self._failed = set()  # 有写入失败、尚未被call_for处理的key（仅后台线程访问）
+        self._errors = []  # 上次flush以来的写入失败[(path, 错误信息)]
+        self._errors_lock = Lock()
+        self.written = 0  # 已写入的文件数
+
+    def _put(self, item):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = Thread(target=self._run, name="BufferedWriter", daemon=True)
+                    self._thread.start()
+                    atexit.register(self.close)  # 进程退出前写出剩余内容
+        self._queue.put(item)
+
+    def write(self, path, content, encoding="utf-8-sig", callback=None, key=None):
+        """排队写入文本文件（覆盖已有文件，父目录自动创建）
+
+        Args:
+            path (str/Path): 目标文件
+            content (str): 文件内容
+            encoding (str): 文件编码（默认与现有输出一致的utf-8-sig）
+            callback (callable): 写入成功后在后台线程调用的无参函数，写入失败时不调用
+            key (hashable): 写入所属的页面等标识，写入失败时记录，供call_for判断
+        """
+        self._put(("write", Path(path), content, encoding, callback, key))
+
+    def call(self, func, *args, **kwargs):
+        """排队执行func(*args, **kwargs)：在此之前排队的写入全部完成后才执行"""
+        self._put(("call", func, args, kwargs))
+
+    def call_for(self, key, func, *args, on_failure=None, **kwargs):
+        """排队执行依赖key对应写入的操作
+
+        此前排队的、带同一key的写入全部成功时执行func(*args, **kwargs)，
+        任一失败时不执行func，改为调用on_failure()（如将页面标记为failed）。
+        执行后清除该key的失败记录。
+        """
+        self._put(("call_for", key, func, args, kwargs, on_failure))
+
+    def flush(self):
+        """阻塞直到此前排队的写入和回调全部完成
+
+        Returns:
+            list: 上次flush以来写入失败的[(path, 错误信息)]
+        """
+        if self._thread is None:
+            return self._take_errors()
+        done = Event()
+        self._put(("flush", done))
+        done.wait()
+        return self._take_errors()
+
+    def _take_errors(self):
+        with self._errors_lock:
+            errors, self._errors = self._errors, []
+        return errors
+
+    def close(self):
+        """写出剩余内容并停止后台线程（可重复调用）"""
+        with self._start_lock:
+            thread, self._thread = self._thread, None
+        if thread is None or not thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        thread.join()
+        logger.info(f"💾 后台写入完成，共写入 {self.written} 个文件")
+        if errors := self._take_errors():
+            logger.error(f"🛑 {len(errors)} 个文件写入失败，首个: {errors[0][0]} - {errors[0][1]}")
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = monotonic() + self.flush_interval
+            # 凑批：等待更多写入，遇到flush/关闭标记立即处理
+            while len(batch) < self.batch_size and batch[-1] is not _STOP and batch[-1][0] != "flush":
+                try:
+                    batch.append(self._queue.get(timeout=max(deadline - monotonic(), 0)))
+                except Empty:
+                    break
+            if not self._process(batch):
+                return
+
+    def _process(self, batch):
+        """处理一批排队项，收到关闭标记时返回False"""
+        # 批量创建本批涉及的新目录
+        for directory in {item[1].parent for item in batch if item is not _STOP and item[0] == "write"}:
+            if directory not in self._dirs:
+                try:
+                    directory.mkdir(parents=True, exist_ok=True)
+                    self._dirs.add(directory)
+                except Exception as e:
+                    logger.error(f"🛑 目录创建失败: {directory} - {str(e)}")
+
+        pending = []  # 本批待执行的回调（写入全部完成后按排队顺序执行）
+        running = True
+        for item in batch:
+            if item is _STOP:
+                running = False
+                break
+            kind = item[0]
+            if kind == "write":
+                _, path, content, encoding, callback, key = item
+                try:
+                    with path.open("w", encoding=encoding) as f:
+                        f.write(content)
+                        if self.fsync:
+                            f.flush()
+                            os.fsync(f.fileno())
+                except Exception as e:
+                    # 编码错误等非IO异常同样只影响本文件，后台线程继续运行
+                    logger.error(f"🛑 文件保存失败: {path} - {str(e)}")
+                    if key is not None:
+                        self._failed.add(key)
+                    with self._errors_lock:
+                        self._errors.append((path, str(e)))
+                    continue
+                self.written += 1
+                if callback is not None:
+                    pending.append((callback, (), {}))
+            elif kind == "call":
+                pending.append(item[1:])
+            elif kind == "call_for":
+                _, key, func, args, kwargs, on_failure = item
+                if key in self._failed:
+                    self._failed.discard(key)
+                    if on_failure is not None:
+                        pending.append((on_failure, (), {}))
+                else:
+                    pending.append((func, args, kwargs))
+            elif kind == "flush":
+                self._run_callbacks(pending)
+                pending = []
+                item[1].set()
+        self._run_callbacks(pending)
+        return running
+
+    @staticmethod
+    def _run_callbacks(callbacks):
+        for func, args, kwargs in callbacks:
+            try:
+                func(*args, **kwargs)
+            except Exception as e:
+                logger.error(f"🛑 写入后回调执行失败: {str(e)}", exc_info=True)
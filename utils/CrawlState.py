@@ -0,0 +1,209 @@
+# CrawlState.py
+import csv
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from threading import RLock
+
+from utils.TqdmLogHandler import logger
+
+
+class CrawlState:
+    """爬取状态存储（SQLite + 内存哈希索引，替代CSV断点记录）
+
+    核心功能：
+    - O(1)判断URL是否已处理/本轮已领取
+    - 原子状态流转：queued -> fetched -> parsed -> processed（近重复页面为duplicate，
+      输出文件写入失败为failed，重启后重新抓取）
+    - 按领取顺序查询最后一条记录（链式爬虫断点续传）
+    - 单条删除无需重写整个文件
+    - 首次使用时自动导入旧版CSV记录
+    - 保存正文SimHash指纹，供下次运行重建近重复索引
+
+    线程安全：所有读写持有同一把锁，连接允许跨线程使用。
+    """
+
+    STATUSES = ('queued', 'fetched', 'parsed', 'processed', 'duplicate', 'failed')
+    DONE_STATUSES = ('processed', 'duplicate')  # 视为已完成、重启后无需再抓取的状态
+    FIELDS = ('source_file', 'parsed_file', 'book_name', 'chapter_name', 'dealer_file', 'duplicate_of')
+
+    def __init__(self, db_file, legacy_csv=None):
+        """打开（或创建）状态库
+
+        Args:
+            db_file (str/Path): SQLite数据库路径
+            legacy_csv (str/Path): 旧版断点CSV，状态库为空时导入其中的成功记录
+        """
+        self.db_file = Path(db_file)
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = RLock()
+        self._conn = sqlite3.connect(str(self.db_file), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " url TEXT UNIQUE NOT NULL,"
+            " status TEXT NOT NULL,"
+            " timestamp TEXT,"
+            + ",".join(f" {field} TEXT" for field in self.FIELDS) +
+            ")"
+        )
+        # 旧版状态库缺少的字段直接补列
+        existing = {row[1] for row in self._conn.execute("PRAGMA table_info(pages)")}
+        for field in self.FIELDS:
+            if field not in existing:
+                self._conn.execute(f"ALTER TABLE pages ADD COLUMN {field} TEXT")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS fingerprints ("
+            " url TEXT PRIMARY KEY,"
+            " simhash INTEGER NOT NULL"
+            ")"
+        )
+        self._conn.commit()
+
+        self._status = dict(self._conn.execute("SELECT url, status FROM pages"))  # url -> status
+        self._claimed = set()  # 本轮运行已领取的URL
+
+        if legacy_csv and not self._status:
+            self._import_csv(Path(legacy_csv))
+
+    def _import_csv(self, csv_file):
+        """导入旧版CSV中状态为success的记录（按列位置读取，兼容表头缺逗号的旧文件）"""
+        try:
+            with open(csv_file, 'r', encoding='utf-8-sig') as f:
+                rows = list(csv.reader(f))[1:]
+        except FileNotFoundError:
+            return
+        count = 0
+        for row in rows:
+            if len(row) > 6 and row[1] and row[6] == 'success':
+                self.transition(
+                    row[1], 'processed',
+                    timestamp=row[0],
+                    source_file=row[2],
+                    parsed_file=row[3],
+                    book_name=row[4],
+                    chapter_name=row[5],
+                    dealer_file=row[7] if len(row) > 7 else None,
+                )
+                count += 1
+        logger.info(f"📥 已从 {csv_file} 导入 {count} 条断点记录")
+
+    def seen(self, url):
+        """URL是否已完成或已在本轮被领取"""
+        with self._lock:
+            return url in self._claimed or self._status.get(url) in self.DONE_STATUSES
+
+    def claim(self, url):
+        """原子地领取URL（未完成且本轮未领取时标记为queued）
+
+        Returns:
+            bool: 领取成功返回True，已处理或已被领取返回False
+        """
+        with self._lock:
+            if self.seen(url):
+                return False
+            self._claimed.add(url)
+            self.transition(url, 'queued')
+            return True
+
+    def transition(self, url, status, timestamp=None, **fields):
+        """更新URL状态及附带字段（不存在时插入）
+
+        Args:
+            url (str): 页面URL
+            status (str): 目标状态，取值见STATUSES
+            timestamp (str): 记录时间（默认当前时间）
+            **fields: 需要同时写入的字段，取值见FIELDS
+        """
+        if status not in self.STATUSES:
+            raise ValueError(f"未知状态: {status}")
+        columns = ['url', 'status', 'timestamp', *fields]
+        values = [url, status, timestamp or datetime.now().isoformat(), *(
+            None if value is None else str(value) for value in fields.values()
+        )]
+        updates = ", ".join(f"{col}=COALESCE(excluded.{col}, {col})" for col in columns[1:])
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    f"INSERT INTO pages ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+                    f"ON CONFLICT(url) DO UPDATE SET {updates}",
+                    values
+                )
+            self._status[url] = status
+
+    def status(self, url):
+        """查询URL当前状态（不存在返回None）"""
+        with self._lock:
+            return self._status.get(url)
+
+    def delete(self, url):
+        """删除单条记录"""
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM pages WHERE url = ?", (url,))
+            self._status.pop(url, None)
+            self._claimed.discard(url)
+
+    def delete_from(self, url):
+        """删除url及其之后领取的全部记录（链式爬虫从该页重新抓取）"""
+        with self._lock:
+            with self._conn:
+                urls = [row[0] for row in self._conn.execute(
+                    "SELECT url FROM pages WHERE seq >= (SELECT seq FROM pages WHERE url = ?)", (url,)
+                )]
+                self._conn.executemany("DELETE FROM pages WHERE url = ?", [(u,) for u in urls])
+            for u in urls:
+                self._status.pop(u, None)
+                self._claimed.discard(u)
+
+    def count(self, *statuses):
+        """统计指定状态的记录数（不传则统计全部）"""
+        with self._lock:
+            if not statuses:
+                return len(self._status)
+            return sum(1 for status in self._status.values() if status in statuses)
+
+    def last(self, *statuses):
+        """返回指定状态中最后领取的URL（按领取顺序），没有则返回None"""
+        statuses = statuses or self.DONE_STATUSES
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT url FROM pages WHERE status IN ({', '.join('?' * len(statuses))}) "
+                f"ORDER BY seq DESC LIMIT 1",
+                statuses
+            ).fetchone()
+        return row[0] if row else None
+
+    def first(self, *statuses):
+        """返回指定状态中最先领取的URL（按领取顺序），没有则返回None"""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT url FROM pages WHERE status IN ({', '.join('?' * len(statuses))}) "
+                f"ORDER BY seq LIMIT 1",
+                statuses
+            ).fetchone()
+        return row[0] if row else None
+
+    def save_fingerprint(self, url, fingerprint):
+        """保存正文指纹（64位无符号整数，按有符号存入SQLite）"""
+        if fingerprint >= 1 << 63:
+            fingerprint -= 1 << 64
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO fingerprints (url, simhash) VALUES (?, ?)",
+                    (url, fingerprint)
+                )
+
+    def fingerprints(self):
+        """返回全部已保存的(URL, 指纹)"""
+        with self._lock:
+            rows = self._conn.execute("SELECT url, simhash FROM fingerprints").fetchall()
+        return [(url, fingerprint % (1 << 64)) for url, fingerprint in rows]
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
@@ -1,13 +1,15 @@
 # Fetcher.py
+import json
 import time
 from pathlib import Path
+from threading import Lock
 
 from fake_useragent import UserAgent
-import urllib.request
 import urllib.error
 
 from numpy import random
 
+from utils.HttpPool import HttpConnectionPool
 from utils.TqdmLogHandler import logger
 from utils.WebUtils import WebUtils
 
@@ -18,24 +20,52 @@ class Fetcher:
     核心功能：
     - 自动生成随机请求头
     - 带指数退避的重试机制
+    - 按主机复用keep-alive长连接
+    - 协商gzip/deflate/br压缩传输，统计压缩前后字节数
     - 内容解码自动处理
     - 原始网页存档
+    - 基于ETag/Last-Modified的条件请求（304时直接使用本地存档）
+    - 离线模式（只读本地存档，不访问网络）
+    - 可选归档后端（PageArchive），代替origin/下每页一个文件
 
     典型配置参数：
     - retries: 失败请求重试次数（默认3次）
     - timeout: 请求超时时间（默认10秒）
+    - pool_size: 每个主机保留的空闲连接数（默认5，建议与线程数一致）
+    - revalidate: 存在本地存档时是否发送条件请求（默认开启）
+    - offline: 仅使用本地存档，不访问网络（默认关闭）
+    - archive: PageArchive实例，提供时原始网页与校验信息写入归档（默认None，逐页保存文件）
     """
 
-    def __init__(self, retries=3, timeout=10):
+    META_SUFFIX = '.meta.json'  # 缓存校验信息（ETag/Last-Modified）的附属文件后缀
+
+    def __init__(self, retries=3, timeout=10, pool_size=5, revalidate=True, offline=False, archive=None):
         """初始化请求器
 
         Args:
             retries (int): 失败请求重试次数（建议3-5次）
             timeout (int): 连接超时时间（秒，建议10-30秒）
+            pool_size (int): 每个主机的连接池大小
+            revalidate (bool): 是否对已存档页面发送If-None-Match/If-Modified-Since
+            offline (bool): 离线模式，只返回本地存档
+            archive (PageArchive): 原始网页归档（None时逐页保存到origin/）
         """
         self.ua = UserAgent()  # 随机UA生成器
         self.retries = retries
         self.timeout = timeout
+        self.revalidate = revalidate
+        self.offline = offline
+        self.archive = archive
+        # 传输统计（多线程累加，读写需持有锁）
+        self._stats_lock = Lock()
+        self._stats = {'responses': 0, 'wire_bytes': 0, 'raw_bytes': 0}
+        # 按主机划分的长连接池（线程安全，避免每次请求重新握手）
+        self.pool_size = pool_size
+        self.pool = self._create_pool(pool_size, timeout)
+
+    def _create_pool(self, pool_size, timeout):
+        """创建同步请求使用的连接池（子类可改用其他连接管理）"""
+        return HttpConnectionPool(pool_size=pool_size, timeout=timeout)
 
     def get_random_headers(self):
         """生成随机请求头（反反爬虫基础措施）
@@ -49,10 +79,11 @@ class Fetcher:
         """执行请求并保存网页内容（核心方法）
 
         流程：
-        1. 生成随机请求头
-        2. 执行HTTP请求（支持重试）
-        3. 解码响应内容
-        4. 选择性保存原始文件
+        1. 离线模式直接返回本地存档
+        2. 生成随机请求头（有存档时附带条件请求头）
+        3. 通过连接池执行HTTP请求（支持重试），304时返回本地存档（存档缺失时重新请求完整页面）
+        4. 解码响应内容
+        5. 选择性保存原始文件及校验信息
 
         Args:
             url (str): 目标URL
@@ -63,23 +94,48 @@ class Fetcher:
         Returns:
             str: 解码后的网页内容，失败返回None
         """
+        save_path = self._origin_path(url, direction, file_name)
+
+        # 离线模式：只读本地存档
+        if self.offline:
+            cached = self._load_cached(save_path, url)
+            if cached is None:
+                logger.info(f"📴 离线模式下无本地存档: {url}")
+            return cached
+
         for attempt in range(self.retries):
             try:
-                # 构造请求对象（使用随机UA）
-                req = urllib.request.Request(url, headers=self.get_random_headers())
+                # 发送请求（复用池化连接，使用随机UA）
+                headers = self.get_random_headers()
+                if save_origin:
+                    headers.update(self._conditional_headers(save_path, url))
+                response, content = self.pool.request(url, headers=headers)
+                self._record_transfer(url, response.wire_bytes, response.raw_bytes)
 
-                # 发送请求（带超时控制）
-                with urllib.request.urlopen(req, timeout=self.timeout) as response:
-                    content = response.read()
+                # 服务端确认未修改：直接使用本地存档
+                if response.status == 304:
+                    cached = self._load_cached(save_path, url)
+                    if cached is not None:
+                        logger.info(f"♻️ 页面未修改，使用本地存档: {save_path}")
+                        return cached
+                    # 存档已被删除（或归档中缺少该记录）：不带条件头重新请求完整页面
+                    logger.info(f"⚠️ 页面未修改但本地存档缺失，重新请求完整页面: {url}")
+                    response, content = self.pool.request(url, headers=self.get_random_headers())
+                    self._record_transfer(url, response.wire_bytes, response.raw_bytes)
+                    if response.status == 304:
+                        raise ValueError("无条件请求仍返回304，没有可用的页面内容")
 
-                    # 智能解码内容（自动检测编码）
-                    decoded = WebUtils.decode_content(content, response)
+                # 智能解码内容（自动检测编码）
+                decoded = WebUtils.decode_content(content, response, url)
+                if not decoded.strip():
+                    # 空白页面无法解析，按请求失败重试，且不覆盖本地存档
+                    raise ValueError("响应内容为空")
 
-                    # 保存原始文件（需开启save_origin）
-                    if save_origin:
-                        self._save_origin_file(url, decoded, direction, file_name)
+                # 保存原始文件（需开启save_origin）
+                if save_origin:
+                    self._store_origin(url, decoded, direction, file_name, response.headers)
 
-                    return decoded
+                return decoded
 
             except urllib.error.HTTPError as e:
                 logger.info(f"⛔ HTTP错误 {e.code}: {e.reason} (尝试 {attempt + 1}/{self.retries})")
@@ -91,6 +147,37 @@ class Fetcher:
 
         return None
 
+    def _record_transfer(self, url, wire_bytes, raw_bytes):
+        """记录单个响应的传输字节数（压缩后/解压后）"""
+        with self._stats_lock:
+            self._stats['responses'] += 1
+            self._stats['wire_bytes'] += wire_bytes
+            self._stats['raw_bytes'] += raw_bytes
+        logger.debug(f"📦 {url} 传输 {wire_bytes} 字节，解压后 {raw_bytes} 字节")
+
+    def transfer_stats(self):
+        """返回累计传输统计
+
+        Returns:
+            dict: responses/wire_bytes/raw_bytes，以及压缩比ratio（解压后/传输）
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['ratio'] = stats['raw_bytes'] / stats['wire_bytes'] if stats['wire_bytes'] else 1.0
+        return stats
+
+    def _store_origin(self, url, content, direction, file_name, response_headers):
+        """保存原始网页及校验信息（配置了归档时写入归档，否则逐页保存文件）"""
+        if self.archive is not None:
+            self.archive.put(
+                self._origin_path(url, direction, file_name), url, content,
+                etag=response_headers.get('ETag'),
+                last_modified=response_headers.get('Last-Modified'),
+            )
+            return
+        self._save_origin_file(url, content, direction, file_name)
+        self._save_meta(self._origin_path(url, direction, file_name), url, response_headers)
+
     def _save_origin_file(self, url, content, direction,file_name=None):
         """保存原始网页到本地（内部方法）
 
@@ -102,6 +189,20 @@ class Fetcher:
             content (str): 要保存的内容
             direction (str): 分类目录名
         """
+        save_path = self._origin_path(url, direction, file_name)
+
+        # 创建目录（递归创建缺失目录）
+        save_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # 写入文件（UTF-8编码）
+        with save_path.open('w', encoding='utf-8') as f:
+            f.write(content)
+
+        logger.info(f"✅ 原始网页保存至: {save_path}")
+
+    @staticmethod
+    def _origin_path(url, direction, file_name=None):
+        """计算原始网页的存档路径：origin/{language}/文件名"""
         if file_name is None:
             # 生成安全文件名（去除特殊字符）
             filename = WebUtils.generate_filename(url)
@@ -110,16 +211,79 @@ class Fetcher:
 
         # 构建存储路径
         lang_dir = direction if isinstance(direction, str) else "common"
-        save_path = Path("origin") / lang_dir / filename
+        return Path("origin") / lang_dir / filename
 
-        # 创建目录（递归创建缺失目录）
-        save_path.parent.mkdir(parents=True, exist_ok=True)
+    def _meta_path(self, save_path):
+        """存档对应的校验信息文件路径"""
+        return save_path.with_name(save_path.name + self.META_SUFFIX)
 
-        # 写入文件（UTF-8编码）
-        with save_path.open('w', encoding='utf-8') as f:
-            f.write(content)
+    def _load_meta(self, save_path):
+        """读取存档的校验信息{'url', 'etag', 'last_modified'}（不存在返回None）"""
+        if self.archive is not None:
+            return self.archive.meta(save_path)
+        try:
+            with self._meta_path(save_path).open('r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, OSError, ValueError):
+            return None
 
-        logger.info(f"✅ 原始网页保存至: {save_path}")
+    def _load_cached(self, save_path, url):
+        """读取url的本地存档（不存在，或该存档路径保存的是其他URL的页面时返回None）
+
+        自定义文件名可能让不同URL共用同一存档路径，只有记录的URL一致时才复用。
+        没有校验信息的旧版存档文件无法核对URL，按原样读取；空白存档视为不存在。
+        """
+        meta = self._load_meta(save_path)
+        if meta is not None and meta.get('url') != url:
+            logger.info(f"⚠️ 存档属于其他URL，不复用: {save_path} ({meta.get('url')})")
+            return None
+        if self.archive is not None:
+            cached = self.archive.get(save_path)
+        else:
+            try:
+                with save_path.open('r', encoding='utf-8') as f:
+                    cached = f.read()
+            except (FileNotFoundError, OSError):
+                return None
+        return cached if cached and cached.strip() else None
+
+    def _conditional_headers(self, save_path, url):
+        """根据存档的ETag/Last-Modified生成条件请求头（存档属于其他URL时不发送）"""
+        if not self.revalidate:
+            return {}
+        if self.archive is None and not save_path.exists():
+            return {}
+        meta = self._load_meta(save_path)
+        if meta is None or meta.get('url') != url:
+            return {}
+
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+    def _save_meta(self, save_path, url, response_headers):
+        """保存存档对应的URL及响应的ETag/Last-Modified，供下次核对存档和条件请求使用
+
+        服务端不支持校验时也写入（etag/last_modified为空），覆盖旧信息，
+        避免携带过期的条件头，同时保留URL用于核对存档归属。
+        """
+        with self._meta_path(save_path).open('w', encoding='utf-8') as f:
+            json.dump({
+                'url': url,
+                'etag': response_headers.get('ETag'),
+                'last_modified': response_headers.get('Last-Modified'),
+            }, f, ensure_ascii=False)
+
+    def close(self):
+        """释放连接池中的所有长连接
+
+        归档由调用方传入（通常是多个爬虫共用的PageArchive.shared()实例），由创建方负责关闭。
+        """
+        if self.pool is not None:
+            self.pool.close()
 
     # def get_save_path(self,direction,file_name=None):
     #     save_path = Path("origin") / direction / file_name
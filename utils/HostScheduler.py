@@ -0,0 +1,153 @@
+# HostScheduler.py
+import time
+from contextlib import contextmanager
+from threading import Condition
+from urllib.parse import urlsplit
+
+from numpy import random
+
+
+class HostScheduler:
+    """按主机的礼貌性调度器（替代每个线程各自的随机睡眠）
+
+    核心功能：
+    - 同一主机两次请求之间保持最小间隔（从delay_range中随机取值；
+      spread_delay=True时按max_per_host均摊，允许该主机更高的整体请求频率）
+    - 限制同一主机的最大并发请求数
+    - 可选令牌桶限速（rate/burst）
+    - 从待处理任务中挑出当前可立即执行的任务交给空闲线程
+
+    与random_delay的区别：
+    只有目标主机确实需要限流时才等待，不同主机的请求互不影响，
+    而单个站点看到的请求频率与原先保持一致。
+    """
+
+    def __init__(self, delay_range=(1, 3), max_per_host=1, rate=None, burst=1, spread_delay=False):
+        """初始化调度器
+
+        Args:
+            delay_range (tuple): 同一主机的请求间隔范围（秒）
+            max_per_host (int): 同一主机的最大并发请求数
+            rate (float): 令牌桶每秒补充的令牌数（None表示不启用）
+            burst (int): 令牌桶容量
+            spread_delay (bool): 是否将请求间隔按max_per_host均摊（默认否，
+                同一主机相邻两次请求之间始终间隔完整的delay_range）
+        """
+        self.delay_range = delay_range
+        self.max_per_host = max(1, max_per_host)
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.spread_delay = spread_delay
+        self._hosts = {}  # host -> 状态字典
+        self._cond = Condition()
+
+    @staticmethod
+    def host_of(url):
+        """提取URL的主机名（作为限流维度）"""
+        return urlsplit(url).netloc.lower()
+
+    def _state(self, host, now):
+        """获取主机状态（首次访问时初始化）"""
+        if host not in self._hosts:
+            self._hosts[host] = {'active': 0, 'next_at': 0.0, 'tokens': float(self.burst), 'updated': now}
+        state = self._hosts[host]
+        if self.rate:
+            # 按经过时间补充令牌
+            state['tokens'] = min(self.burst, state['tokens'] + (now - state['updated']) * self.rate)
+            state['updated'] = now
+        return state
+
+    def _ready_in(self, state, now):
+        """计算主机距离可请求的剩余秒数（并发已满时返回None）"""
+        if state['active'] >= self.max_per_host:
+            return None
+        wait = max(0.0, state['next_at'] - now)
+        if self.rate and state['tokens'] < 1:
+            wait = max(wait, (1 - state['tokens']) / self.rate)
+        return wait
+
+    def _reserve(self, state, now):
+        """占用一个请求名额并安排下一次可请求时间"""
+        state['active'] += 1
+        delay = random.uniform(*self.delay_range)
+        if self.spread_delay:
+            # 显式放宽单主机并发时，间隔按并发数均摊
+            delay /= self.max_per_host
+        state['next_at'] = now + delay
+        if self.rate:
+            state['tokens'] -= 1
+
+    def try_acquire(self, url):
+        """非阻塞地尝试占用主机名额
+
+        Returns:
+            float/None: 0表示已占用；正数为建议等待秒数；None表示并发已满
+        """
+        with self._cond:
+            now = time.monotonic()
+            state = self._state(self.host_of(url), now)
+            wait = self._ready_in(state, now)
+            if wait == 0:
+                self._reserve(state, now)
+            return wait
+
+    def acquire(self, url):
+        """阻塞直到可以向该主机发起请求，并占用一个名额"""
+        host = self.host_of(url)
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                state = self._state(host, now)
+                wait = self._ready_in(state, now)
+                if wait == 0:
+                    self._reserve(state, now)
+                    return
+                self._cond.wait(timeout=wait)
+
+    def release(self, url):
+        """请求结束后归还主机名额"""
+        with self._cond:
+            state = self._hosts.get(self.host_of(url))
+            if state and state['active'] > 0:
+                state['active'] -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, url):
+        """上下文管理器形式的acquire/release"""
+        self.acquire(url)
+        try:
+            yield
+        finally:
+            self.release(url)
+
+    def next_ready(self, pending, key=lambda task: task):
+        """从待处理队列中取出第一个主机已就绪的任务，并为其占用名额
+
+        Args:
+            pending (collections.deque): 待处理任务队列（会被原地修改）
+            key (callable): 从任务中提取URL的函数
+
+        Returns:
+            任务对象（调用方负责在任务结束后release对应URL）
+        """
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                shortest = None
+                checked = set()  # 同一主机只需判断一次
+                for index, task in enumerate(pending):
+                    host = self.host_of(key(task))
+                    if host in checked:
+                        continue
+                    checked.add(host)
+                    state = self._state(host, now)
+                    wait = self._ready_in(state, now)
+                    if wait == 0:
+                        self._reserve(state, now)
+                        del pending[index]
+                        return task
+                    if wait is not None and (shortest is None or wait < shortest):
+                        shortest = wait
+                # 没有就绪任务：等到最近的主机就绪或有名额被释放
+                self._cond.wait(timeout=shortest)
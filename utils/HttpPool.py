@@ -0,0 +1,209 @@
+# HttpPool.py
+import http.client
+import queue
+import urllib.error
+import zlib
+from threading import Lock
+from urllib.parse import urlsplit, urljoin
+
+try:
+    import brotli  # 可选依赖：安装后支持br压缩
+except ImportError:
+    brotli = None
+
+# 协商的压缩格式（未安装brotli时不声明br）
+ACCEPT_ENCODING = 'gzip, deflate, br' if brotli else 'gzip, deflate'
+
+
+class ContentDecoder:
+    """流式解压响应体（gzip/deflate/br），同时统计压缩前后字节数
+
+    用法：
+        decoder = ContentDecoder(response.getheader('Content-Encoding'))
+        for chunk in chunks:
+            decoder.feed(chunk)
+        body = decoder.finish()
+    """
+
+    def __init__(self, encoding=None):
+        """Args:
+            encoding (str): Content-Encoding响应头（None或identity表示未压缩）
+        """
+        self.encoding = (encoding or 'identity').strip().lower()
+        self.wire_bytes = 0  # 网络传输字节数（压缩后）
+        self.raw_bytes = 0  # 解压后字节数
+        self._parts = []
+        if self.encoding in ('gzip', 'x-gzip'):
+            self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif self.encoding == 'deflate':
+            self._decompressor = zlib.decompressobj()
+        elif self.encoding == 'br':
+            if brotli is None:
+                raise urllib.error.URLError("响应使用br压缩，但未安装brotli")
+            self._decompressor = brotli.Decompressor()
+        else:
+            self._decompressor = None
+
+    def feed(self, chunk):
+        """送入一段网络数据并解压"""
+        first_chunk = self.wire_bytes == 0
+        self.wire_bytes += len(chunk)
+        if self._decompressor is None:
+            data = chunk
+        elif self.encoding == 'br':
+            data = self._decompressor.process(chunk)
+        elif self.encoding == 'deflate' and first_chunk:
+            # 部分服务端发送不带zlib头的原始deflate流，首段解压失败时切换模式
+            try:
+                data = self._decompressor.decompress(chunk)
+            except zlib.error:
+                self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+                data = self._decompressor.decompress(chunk)
+        else:
+            data = self._decompressor.decompress(chunk)
+        self.raw_bytes += len(data)
+        self._parts.append(data)
+
+    def finish(self):
+        """结束解压并返回完整响应体"""
+        if self._decompressor is not None and self.encoding != 'br':
+            tail = self._decompressor.flush()
+            self.raw_bytes += len(tail)
+            self._parts.append(tail)
+        return b''.join(self._parts)
+
+
+class HttpConnectionPool:
+    """按主机划分的HTTP长连接池（keep-alive复用）
+
+    核心功能：
+    - 每个(协议, 主机, 端口)维护独立的空闲连接队列
+    - 请求结束后归还连接，后续请求直接复用，省去TCP+TLS握手
+    - 自动跟随重定向（与urlopen行为保持一致）
+    - 协商压缩传输并流式解压（响应对象附带wire_bytes/raw_bytes统计）
+    - 线程安全，可被多个爬虫线程共享
+
+    典型配置参数：
+    - pool_size: 每个主机最多保留的空闲连接数（建议与线程数一致）
+    - timeout: 连接/读取超时时间（秒）
+    """
+
+    REDIRECT_CODES = (301, 302, 303, 307, 308)
+    CHUNK_SIZE = 64 * 1024  # 流式读取的分块大小
+
+    def __init__(self, pool_size=5, timeout=10, max_redirects=5):
+        """初始化连接池
+
+        Args:
+            pool_size (int): 每个主机保留的空闲连接上限
+            timeout (int): 连接超时时间（秒）
+            max_redirects (int): 最大重定向次数
+        """
+        self.pool_size = max(1, pool_size)
+        self.timeout = timeout
+        self.max_redirects = max_redirects
+        self._pools = {}  # (scheme, host, port) -> LifoQueue[连接]
+        self._lock = Lock()
+
+    def _get_pool(self, key):
+        """获取（或创建）指定主机的空闲连接队列"""
+        with self._lock:
+            if key not in self._pools:
+                self._pools[key] = queue.LifoQueue(maxsize=self.pool_size)
+            return self._pools[key]
+
+    def _acquire(self, key):
+        """取出一个空闲连接，没有则新建"""
+        try:
+            return self._get_pool(key).get_nowait()
+        except queue.Empty:
+            scheme, host, port = key
+            conn_cls = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+            return conn_cls(host, port, timeout=self.timeout)
+
+    def _release(self, key, conn):
+        """归还连接，队列已满时直接关闭"""
+        try:
+            self._get_pool(key).put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def request(self, url, headers=None):
+        """发送GET请求并读取完整响应体
+
+        Args:
+            url (str): 目标URL
+            headers (dict): 请求头
+
+        Returns:
+            tuple: (response, body) —— body为解压后的内容，response.headers可用于编码检测，
+                   response.wire_bytes/raw_bytes为压缩前后的字节数
+
+        Raises:
+            urllib.error.HTTPError: 状态码>=400时抛出（与urlopen一致）
+        """
+        for _ in range(self.max_redirects + 1):
+            response, body = self._request_once(url, headers or {})
+            location = response.getheader('Location')
+            if response.status in self.REDIRECT_CODES and location:
+                url = urljoin(url, location)
+                continue
+            if response.status >= 400:
+                raise urllib.error.HTTPError(url, response.status, response.reason, response.headers, None)
+            response.url = url
+            return response, body
+        raise urllib.error.URLError(f"重定向次数过多: {url}")
+
+    def _request_once(self, url, headers):
+        """在池化连接上执行单次请求（连接失效时重连一次）"""
+        parts = urlsplit(url)
+        scheme = parts.scheme or 'http'
+        port = parts.port or (443 if scheme == 'https' else 80)
+        key = (scheme, parts.hostname, port)
+        path = parts.path or '/'
+        if parts.query:
+            path = f"{path}?{parts.query}"
+
+        headers = {'Accept-Encoding': ACCEPT_ENCODING, **headers, 'Connection': 'keep-alive'}
+        for attempt in range(2):
+            conn = self._acquire(key)
+            try:
+                conn.request('GET', path, headers=headers)
+                response = conn.getresponse()
+                body = self._read_body(response)
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # 复用的连接可能已被服务端关闭，丢弃后重试一次
+                conn.close()
+                if attempt:
+                    raise
+                continue
+            except Exception:
+                conn.close()
+                raise
+
+            if response.will_close:
+                conn.close()
+            else:
+                self._release(key, conn)
+            return response, body
+
+    def _read_body(self, response):
+        """分块读取并流式解压响应体，统计结果记录在response上"""
+        decoder = ContentDecoder(response.getheader('Content-Encoding'))
+        while chunk := response.read(self.CHUNK_SIZE):
+            decoder.feed(chunk)
+        body = decoder.finish()
+        response.wire_bytes = decoder.wire_bytes
+        response.raw_bytes = decoder.raw_bytes
+        return body
+
+    def close(self):
+        """关闭所有空闲连接"""
+        with self._lock:
+            pools, self._pools = self._pools, {}
+        for pool in pools.values():
+            while True:
+                try:
+                    pool.get_nowait().close()
+                except queue.Empty:
+                    break
@@ -0,0 +1,752 @@
+# InvertedIndex.py
+import hashlib
+import heapq
+import json
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from itertools import islice
+from pathlib import Path
+
+from utils.TqdmLogHandler import logger
+
+# 词表项：词在terms.str中的偏移和长度、df、cf、max_tf、倒排块偏移和长度、位置块偏移和长度、跳表偏移和长度
+TERM_ENTRY = struct.Struct('<QIIQIQQQQQI')
+# 跳表项：倒排块中每BLOCK_SIZE篇文档一个，记录该小块最后的doc_id及其在倒排块内的结束偏移
+SKIP_ENTRY = struct.Struct('<II')
+# 文档项（按doc_id定长存放）：词数、docs.jsonl中的行偏移
+DOC_ENTRY = struct.Struct('<IQ')
+NO_DOC = 2 ** 64 - 1  # 已被合并清除的文档的行偏移
+
+
+def encode_varint(value, out):
+    """将非负整数按varint编码追加到out（bytearray），每字节7位，最高位为延续标志"""
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def decode_varints(buf, start=0, end=None):
+    """依次解码buf[start:end]中的varint整数"""
+    end = len(buf) if end is None else end
+    value = shift = 0
+    for pos in range(start, end):
+        byte = buf[pos]
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            yield value
+            value = shift = 0
+
+
+def map_file(path):
+    """只读映射文件（空文件返回空bytes，mmap不支持长度为0的映射）"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def unmap(buf):
+    if isinstance(buf, mmap.mmap):
+        buf.close()
+
+
+class SegmentWriter:
+    """按词典序逐词写出一个不可变段
+
+    段目录结构：
+    - terms.bin: 定长词表项数组（TERM_ENTRY），按词排序，查询时二分查找
+    - terms.str: 词的UTF-8字节，按词表顺序连续存放
+    - postings.bin: 每个词的倒排块，每篇文档依次为varint(文档ID差值)、varint(tf)
+    - positions.bin: 每个词的位置块，每篇文档tf个varint(位置差值)，只有短语查询才会读取
+    - skips.bin: df超过BLOCK_SIZE的词的跳表（SKIP_ENTRY），游标seek时整块跳过而不解码
+    """
+
+    BLOCK_SIZE = 128  # 跳表间隔（每个小块的文档数）
+
+    def __init__(self, seg_dir):
+        seg_dir.mkdir(parents=True, exist_ok=True)
+        self._terms = (seg_dir / 'terms.bin').open('wb')
+        self._strings = (seg_dir / 'terms.str').open('wb')
+        self._postings = (seg_dir / 'postings.bin').open('wb')
+        self._positions = (seg_dir / 'positions.bin').open('wb')
+        self._skips = (seg_dir / 'skips.bin').open('wb')
+        self._offsets = [0, 0, 0, 0]  # terms.str / postings.bin / positions.bin / skips.bin 当前写入位置
+        self.term_count = 0
+
+    def add_term(self, term, postings):
+        """写入一个词的倒排表（term必须大于之前写入的所有词）
+
+        Args:
+            term (str): 词
+            postings (list): [(doc_id, [位置])]，doc_id递增
+        """
+        doc_block = bytearray()
+        pos_block = bytearray()
+        skip_block = bytearray()
+        prev_doc = cf = max_tf = 0
+        for count, (doc_id, positions) in enumerate(postings, 1):
+            encode_varint(doc_id - prev_doc, doc_block)
+            encode_varint(len(positions), doc_block)
+            prev_pos = 0
+            for position in positions:
+                encode_varint(position - prev_pos, pos_block)
+                prev_pos = position
+            prev_doc = doc_id
+            cf += len(positions)
+            max_tf = max(max_tf, len(positions))
+            # 差值编码跨小块连续，小块的起始文档ID即上一小块的最后一个doc_id
+            if len(postings) > self.BLOCK_SIZE and (count % self.BLOCK_SIZE == 0 or count == len(postings)):
+                skip_block += SKIP_ENTRY.pack(doc_id, len(doc_block))
+
+        term_bytes = term.encode('utf-8')
+        str_offset, post_offset, pos_offset, skip_offset = self._offsets
+        self._terms.write(TERM_ENTRY.pack(
+            str_offset, len(term_bytes), len(postings), cf, max_tf,
+            post_offset, len(doc_block), pos_offset, len(pos_block), skip_offset, len(skip_block)
+        ))
+        self._strings.write(term_bytes)
+        self._postings.write(doc_block)
+        self._positions.write(pos_block)
+        self._skips.write(skip_block)
+        self._offsets = [str_offset + len(term_bytes), post_offset + len(doc_block),
+                         pos_offset + len(pos_block), skip_offset + len(skip_block)]
+        self.term_count += 1
+
+    def close(self):
+        for f in (self._terms, self._strings, self._postings, self._positions, self._skips):
+            f.close()
+
+
+class SegmentBuilder:
+    """内存中累积一批文档的倒排表，提交时交给SegmentWriter写出"""
+
+    def __init__(self):
+        self.postings = defaultdict(list)  # term -> [(doc_id, [位置])]，doc_id递增
+        self.doc_count = 0
+
+    def add(self, doc_id, tokens):
+        """加入一篇文档（doc_id必须大于之前加入的所有文档）"""
+        positions = defaultdict(list)
+        for position, token in enumerate(tokens):
+            positions[token].append(position)
+        for term, term_positions in positions.items():
+            self.postings[term].append((doc_id, term_positions))
+        self.doc_count += 1
+
+    def write(self, seg_dir):
+        """写出段文件"""
+        writer = SegmentWriter(seg_dir)
+        try:
+            for term in sorted(self.postings):
+                writer.add_term(term, self.postings[term])
+        finally:
+            writer.close()
+
+
+class Segment:
+    """只读段：所有文件通过mmap访问，打开时不加载任何数据到Python对象"""
+
+    def __init__(self, seg_dir):
+        self.seg_dir = seg_dir
+        self._terms = map_file(seg_dir / 'terms.bin')
+        self._strings = map_file(seg_dir / 'terms.str')
+        self._postings = map_file(seg_dir / 'postings.bin')
+        self._positions = map_file(seg_dir / 'positions.bin')
+        self._skips = map_file(seg_dir / 'skips.bin')
+        self.term_count = len(self._terms) // TERM_ENTRY.size
+
+    def _entry(self, i):
+        return TERM_ENTRY.unpack_from(self._terms, i * TERM_ENTRY.size)
+
+    def _term_bytes(self, entry):
+        return self._strings[entry[0]:entry[0] + entry[1]]
+
+    def lookup(self, term):
+        """二分查找词表，返回词表项，词不存在时返回None"""
+        key = term.encode('utf-8')
+        lo, hi = 0, self.term_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            entry = self._entry(mid)
+            current = self._term_bytes(entry)
+            if current < key:
+                lo = mid + 1
+            elif current > key:
+                hi = mid
+            else:
+                return entry
+        return None
+
+    def terms(self, tag=None):
+        """按词典序遍历(词, tag, 词表项)，tag用于多路归并时区分来源段"""
+        for i in range(self.term_count):
+            entry = self._entry(i)
+            yield self._term_bytes(entry).decode('utf-8'), tag, entry
+
+    def doc_postings(self, entry):
+        """解码倒排块，返回(doc_id数组, tf数组)"""
+        doc_ids = array('I')
+        tfs = array('I')
+        values = decode_varints(self._postings, entry[5], entry[5] + entry[6])
+        doc_id = 0
+        for delta in values:
+            doc_id += delta
+            doc_ids.append(doc_id)
+            tfs.append(next(values))
+        return doc_ids, tfs
+
+    def skips(self, entry):
+        """返回倒排块的小块划分([各小块最后的doc_id], [各小块在倒排块内的结束偏移])
+
+        没有跳表的短倒排表视为一个小块，最后的doc_id记为inf（seek时总会进入该块）。
+        """
+        if not entry[10]:
+            return [PostingCursor.END], [entry[6]]
+        lasts, ends = [], []
+        for last, end in SKIP_ENTRY.iter_unpack(self._skips[entry[9]:entry[9] + entry[10]]):
+            lasts.append(last)
+            ends.append(end)
+        return lasts, ends
+
+    def decode_block(self, entry, start, end, base):
+        """解码倒排块中[start, end)字节范围的一个小块，base为上一小块最后的doc_id"""
+        doc_ids = []
+        tfs = []
+        values = decode_varints(self._postings, entry[5] + start, entry[5] + end)
+        doc_id = base
+        for delta in values:
+            doc_id += delta
+            doc_ids.append(doc_id)
+            tfs.append(next(values))
+        return doc_ids, tfs
+
+    def positions(self, entry, tfs):
+        """解码位置块，返回与倒排块对齐的位置列表"""
+        values = decode_varints(self._positions, entry[7], entry[7] + entry[8])
+        result = []
+        for tf in tfs:
+            position = 0
+            positions = []
+            for _ in range(tf):
+                position += next(values)
+                positions.append(position)
+            result.append(positions)
+        return result
+
+    def positions_of(self, entry, doc_ids):
+        """只解码指定文档（doc_ids有序）的位置，返回{doc_id: [位置]}
+
+        其余文档的位置只跳过不构造列表，候选文档远少于倒排表长度时明显更快。
+        """
+        seg_docs, tfs = self.doc_postings(entry)
+        values = decode_varints(self._positions, entry[7], entry[7] + entry[8])
+        wanted = iter(doc_ids)
+        target = next(wanted, None)
+        result = {}
+        for doc_id, tf in zip(seg_docs, tfs):
+            while target is not None and target < doc_id:
+                target = next(wanted, None)
+            if target is None:
+                break
+            if doc_id != target:
+                next(islice(values, tf, tf), None)  # 跳过该文档的位置
+                continue
+            position = 0
+            positions = []
+            for _ in range(tf):
+                position += next(values)
+                positions.append(position)
+            result[doc_id] = positions
+        return result
+
+    def close(self):
+        for buf in (self._terms, self._strings, self._postings, self._positions, self._skips):
+            unmap(buf)
+
+
+class PostingCursor:
+    """词的倒排游标：按小块懒解码，seek时借助跳表整块跳过（被跳过的小块不解码）
+
+    各段按顺序衔接（后提交的段文档ID更大），已删除文档自动跳过。
+    doc为当前文档ID，耗尽后为END。
+    """
+
+    END = float('inf')
+
+    def __init__(self, parts, deleted=()):
+        """
+        Args:
+            parts (list): [(Segment, 词表项)]，按段顺序排列
+            deleted (set): 已删除的文档ID
+        """
+        self._parts = parts
+        self._deleted = deleted
+        self._part = -1
+        self._lasts = self._ends = ()
+        self._block = 0
+        self._docs = self._tfs = ()
+        self._index = 0
+        self.doc = self.END
+        if self._open_part(0):
+            self._settle()
+
+    def _open_part(self, part):
+        """切换到第part段并加载其第一个小块，没有更多段时返回False"""
+        if part >= len(self._parts):
+            return False
+        self._part = part
+        self._lasts, self._ends = self._parts[part][0].skips(self._parts[part][1])
+        self._load_block(0)
+        return True
+
+    def _load_block(self, block):
+        segment, entry = self._parts[self._part]
+        start = self._ends[block - 1] if block else 0
+        base = self._lasts[block - 1] if block else 0
+        self._block = block
+        self._docs, self._tfs = segment.decode_block(entry, start, self._ends[block], base)
+        self._index = 0
+
+    def _settle(self):
+        """从当前位置起找到第一篇存活文档（小块或段用尽时依次加载下一块、下一段）"""
+        while True:
+            if self._index >= len(self._docs):
+                if self._block + 1 < len(self._ends):
+                    self._load_block(self._block + 1)
+                elif not self._open_part(self._part + 1):
+                    self.doc = self.END
+                    return
+                continue
+            doc = self._docs[self._index]
+            if doc in self._deleted:
+                self._index += 1
+                continue
+            self.doc = doc
+            return
+
+    def advance(self):
+        """移动到下一篇文档"""
+        if self.doc != self.END:
+            self._index += 1
+            self._settle()
+
+    def seek(self, target):
+        """移动到第一个doc_id >= target的文档"""
+        if self.doc >= target:
+            return
+        while True:
+            # 跳表中第一个最后doc_id >= target的小块，之前的小块不解码
+            block = bisect_left(self._lasts, target, self._block)
+            if block < len(self._lasts):
+                if block != self._block:
+                    self._load_block(block)
+                self._index = bisect_left(self._docs, target, self._index)
+                break
+            if not self._open_part(self._part + 1):
+                self.doc = self.END
+                return
+        self._settle()
+
+    @property
+    def tf(self):
+        return self._tfs[self._index]
+
+
+class InvertedIndex:
+    """章节倒排索引（消费dealer/输出目录或dealer的清洗结果）
+
+    核心功能：
+    - 排序词表 + 文档ID映射 + 带词频和位置的倒排表，varint差值压缩存储
+    - 查询端全部通过mmap读取：打开索引只读取清单，常驻内存基本只有操作系统页缓存
+    - 增量更新：按文件mtime/大小识别新增、修改、删除的章节，新文档写入新段
+    - 段合并：merge()将所有段流式合并为一个并清除已删除文档
+
+    目录结构：
+    - manifest.json: 段列表、已删除文档ID、文档数与长度统计
+    - files.json: 已索引的源文件（仅update时读取）
+    - docs.idx: 按doc_id定长存放的文档项（DOC_ENTRY）
+    - docs.jsonl: 文档ID -> 路径/书名/章节名/词数
+    - seg_XXXXXX/: 各段文件（见SegmentWriter）
+
+    单写多读：同一时刻只应有一个进程执行update/merge。
+    """
+
+    VERSION = 3
+    MAX_SEGMENTS = 8  # 段数超过该值时自动合并
+
+    def __init__(self, index_dir='index'):
+        """打开（或创建）索引
+
+        Args:
+            index_dir (str/Path): 索引目录
+        """
+        self.index_dir = Path(index_dir)
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self.manifest = self._load_manifest()
+        self.segments = [Segment(self.index_dir / name) for name in self.manifest['segments']]
+        self._deleted = set(self.manifest['deleted'])
+        self._docs_idx = b''
+        self._docs_file = None
+        self._open_docs()
+        self._builder = None  # 尚未提交的文档
+        self._pending_docs = []
+
+    def _load_manifest(self):
+        try:
+            with (self.index_dir / 'manifest.json').open('r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return {'version': self.VERSION, 'next_doc_id': 0, 'next_segment': 0,
+                    'segments': [], 'deleted': [],
+                    'doc_count': 0, 'total_length': 0, 'min_length': 0}
+        if manifest.get('version') != self.VERSION:
+            raise ValueError(f"索引版本不兼容: {manifest.get('version')}，请删除 {self.index_dir} 后重建")
+        return manifest
+
+    def _write_manifest(self):
+        self.manifest['deleted'] = sorted(self._deleted)
+        self._write_json('manifest.json', self.manifest)
+
+    def _write_json(self, name, data):
+        """先写临时文件再替换"""
+        path = self.index_dir / name
+        tmp_path = path.with_name(path.name + '.tmp')
+        with tmp_path.open('w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        tmp_path.replace(path)
+
+    def _open_docs(self):
+        """映射文档表（文件不存在时视为空表）"""
+        self._close_docs()
+        idx_path = self.index_dir / 'docs.idx'
+        if idx_path.exists():
+            self._docs_idx = map_file(idx_path)
+            self._docs_file = (self.index_dir / 'docs.jsonl').open('rb')
+
+    def _close_docs(self):
+        unmap(self._docs_idx)
+        self._docs_idx = b''
+        if self._docs_file is not None:
+            self._docs_file.close()
+            self._docs_file = None
+
+    # ---------------------------------------------------------------- 写入
+
+    def add_text(self, text, path=None, book_name=None, chapter_name=None):
+        """加入一篇已分词的文本（dealer.clean_text的输出，词之间以空格分隔）
+
+        Returns:
+            int: 分配的文档ID（调用commit()后才对查询可见）
+        """
+        tokens = text.split()
+        doc_id = self.manifest['next_doc_id'] + len(self._pending_docs)
+        if self._builder is None:
+            self._builder = SegmentBuilder()
+        self._builder.add(doc_id, tokens)
+        self._pending_docs.append({
+            'doc_id': doc_id,
+            'path': path,
+            'book': book_name,
+            'chapter': chapter_name,
+            'length': len(tokens),
+        })
+        return doc_id
+
+    def delete(self, doc_id):
+        """标记已提交的文档为已删除（合并时真正清除）"""
+        if doc_id in self._deleted or doc_id >= self.manifest['next_doc_id']:
+            return
+        length = self.doc_length(doc_id)
+        if length is None:
+            return
+        self._deleted.add(doc_id)
+        self.manifest['doc_count'] -= 1
+        self.manifest['total_length'] -= length
+
+    def commit(self):
+        """将未提交的文档写成新段并更新清单"""
+        if self._builder is not None:
+            name = f"seg_{self.manifest['next_segment']:06d}"
+            self.manifest['next_segment'] += 1
+            self._builder.write(self.index_dir / name)
+            self._append_docs(self._pending_docs)
+
+            lengths = [doc['length'] for doc in self._pending_docs]
+            if not self.manifest['doc_count']:
+                self.manifest['min_length'] = min(lengths)
+            else:
+                # 删除文档不回调最小长度，保持为下界即可（用于得分上界估计）
+                self.manifest['min_length'] = min(self.manifest['min_length'], *lengths)
+            self.manifest['doc_count'] += len(lengths)
+            self.manifest['total_length'] += sum(lengths)
+            self.manifest['next_doc_id'] += len(lengths)
+            self.manifest['segments'].append(name)
+            self.segments.append(Segment(self.index_dir / name))
+            logger.info(f"📚 新增索引段 {name}，{self._builder.doc_count} 篇文档")
+            self._builder = None
+            self._pending_docs = []
+        self._write_manifest()
+        if len(self.segments) > self.MAX_SEGMENTS:
+            self.merge()
+
+    def _append_docs(self, docs):
+        """追加文档信息与定长文档项（截掉中断提交可能遗留的尾部）"""
+        self._close_docs()
+        committed = self.manifest['next_doc_id']
+        entries = bytearray()
+        with (self.index_dir / 'docs.jsonl').open('ab') as f:
+            for doc in docs:
+                entries += DOC_ENTRY.pack(doc['length'], f.tell())
+                f.write(json.dumps(doc, ensure_ascii=False).encode('utf-8') + b'\n')
+        idx_path = self.index_dir / 'docs.idx'
+        with idx_path.open('r+b' if idx_path.exists() else 'wb') as f:
+            f.seek(committed * DOC_ENTRY.size)
+            f.write(entries)
+            f.truncate()
+        self._open_docs()
+
+    def _load_files(self):
+        try:
+            with (self.index_dir / 'files.json').open('r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def update(self, source_dir='dealer', batch_size=5000, dry_run=False):
+        """增量索引dealer输出目录（dealer/<书名>/<书名>-<章节名>.txt）
+
+        修改时间和大小未变的文件直接跳过；变化的文件再比较内容哈希，
+        内容相同（如重处理后输出未变）只更新记录，不重新索引。
+
+        Args:
+            source_dir (str/Path): dealer输出目录
+            batch_size (int): 每个新段最多包含的文档数
+            dry_run (bool): 只统计需要新增/更新和删除的文档数，不修改索引
+
+        Returns:
+            tuple: (新增或更新的文档数, 删除的文档数)
+        """
+        source_dir = Path(source_dir)
+        files = self._load_files()
+        current = set()
+        added = removed = 0
+        for file_path in sorted(source_dir.glob('*/*.txt')):
+            key = file_path.as_posix()
+            current.add(key)
+            stat = file_path.stat()
+            record = files.get(key)
+            if record and record['mtime'] == stat.st_mtime and record['size'] == stat.st_size:
+                continue
+            raw = file_path.read_bytes()
+            digest = hashlib.sha1(raw).hexdigest()
+            if record and record.get('digest') == digest:
+                if not dry_run:
+                    record.update(mtime=stat.st_mtime, size=stat.st_size)
+                continue
+            added += 1
+            if dry_run:
+                continue
+            if record:
+                self.delete(record['doc_id'])  # 章节被重新生成：旧文档作废
+            book_name = file_path.parent.name
+            chapter_name = file_path.stem
+            if chapter_name.startswith(f"{book_name}-"):
+                chapter_name = chapter_name[len(book_name) + 1:]
+            text = raw.decode('utf-8-sig')
+            doc_id = self.add_text(text, key, book_name, chapter_name)
+            files[key] = {'mtime': stat.st_mtime, 'size': stat.st_size, 'digest': digest, 'doc_id': doc_id}
+            if added % batch_size == 0:
+                self.commit()
+                self._write_json('files.json', files)
+
+        for key in set(files) - current:
+            removed += 1
+            if not dry_run:
+                self.delete(files.pop(key)['doc_id'])
+
+        if dry_run:
+            logger.info(f"🔍 索引预览：需新增/更新 {added} 篇，删除 {removed} 篇，现有 {self.num_docs} 篇")
+            return added, removed
+        self.commit()
+        self._write_json('files.json', files)
+        logger.info(f"📚 索引更新完成：新增/更新 {added} 篇，删除 {removed} 篇，共 {self.num_docs} 篇")
+        return added, removed
+
+    def merge(self):
+        """按词典序流式合并所有段为一个新段，并清除已删除文档"""
+        if len(self.segments) <= 1 and not self._deleted:
+            return
+        name = f"seg_{self.manifest['next_segment']:06d}"
+        self.manifest['next_segment'] += 1
+        writer = SegmentWriter(self.index_dir / name)
+        try:
+            # 各段的词表已排序，多路归并后相同的词相邻
+            streams = [segment.terms(seg_no) for seg_no, segment in enumerate(self.segments)]
+            group_term, group = None, []
+            for term, seg_no, entry in heapq.merge(*streams):
+                if term != group_term and group:
+                    self._merge_term(writer, group_term, group)
+                    group = []
+                group_term = term
+                group.append((seg_no, entry))
+            if group:
+                self._merge_term(writer, group_term, group)
+        finally:
+            writer.close()
+
+        # 重写文档表，只保留存活文档（docs.idx仍按doc_id定长，已清除的文档记为NO_DOC）
+        self._close_docs()
+        old_idx = map_file(self.index_dir / 'docs.idx') if self.manifest['next_doc_id'] else b''
+        old_docs = (self.index_dir / 'docs.jsonl').open('rb') if old_idx else None
+        entries = bytearray()
+        docs_tmp = self.index_dir / 'docs.jsonl.tmp'
+        with docs_tmp.open('wb') as f:
+            for doc_id in range(len(old_idx) // DOC_ENTRY.size):
+                length, offset = DOC_ENTRY.unpack_from(old_idx, doc_id * DOC_ENTRY.size)
+                if doc_id in self._deleted or offset == NO_DOC:
+                    entries += DOC_ENTRY.pack(0, NO_DOC)
+                    continue
+                old_docs.seek(offset)
+                entries += DOC_ENTRY.pack(length, f.tell())
+                f.write(old_docs.readline())
+        unmap(old_idx)
+        if old_docs is not None:
+            old_docs.close()
+        idx_tmp = self.index_dir / 'docs.idx.tmp'
+        idx_tmp.write_bytes(entries)
+        docs_tmp.replace(self.index_dir / 'docs.jsonl')
+        idx_tmp.replace(self.index_dir / 'docs.idx')
+        self._open_docs()
+
+        old_segments = self.segments
+        self.segments = [Segment(self.index_dir / name)]
+        self.manifest['segments'] = [name]
+        self._deleted = set()
+        self._write_manifest()
+
+        for segment in old_segments:
+            segment.close()
+            for file in segment.seg_dir.iterdir():
+                file.unlink()
+            segment.seg_dir.rmdir()
+        logger.info(f"📚 索引段合并完成：{len(old_segments)} 段 -> {name}，{self.num_docs} 篇文档")
+
+    def _merge_term(self, writer, term, group):
+        """合并同一个词在各段中的倒排表（段按文档ID递增排列，顺序拼接即可）"""
+        postings = []
+        for seg_no, entry in group:
+            segment = self.segments[seg_no]
+            doc_ids, tfs = segment.doc_postings(entry)
+            for doc_id, positions in zip(doc_ids, segment.positions(entry, tfs)):
+                if doc_id not in self._deleted:
+                    postings.append((doc_id, positions))
+        if postings:
+            writer.add_term(term, postings)
+
+    # ---------------------------------------------------------------- 读取
+
+    @property
+    def num_docs(self):
+        """存活文档数"""
+        return self.manifest['doc_count']
+
+    @property
+    def avg_length(self):
+        """存活文档的平均词数"""
+        count = self.manifest['doc_count']
+        return self.manifest['total_length'] / count if count else 0.0
+
+    @property
+    def min_length(self):
+        """文档词数的下界"""
+        return self.manifest['min_length']
+
+    def term_stats(self, term):
+        """返回(df, cf, max_tf)；未合并前df/cf包含已删除文档，可作为近似值"""
+        df = cf = max_tf = 0
+        for segment in self.segments:
+            entry = segment.lookup(term)
+            if entry:
+                df += entry[2]
+                cf += entry[3]
+                max_tf = max(max_tf, entry[4])
+        return df, cf, max_tf
+
+    def postings(self, term):
+        """返回词的倒排表(doc_id数组, tf数组)，按doc_id递增，已删除文档被跳过"""
+        doc_ids = array('I')
+        tfs = array('I')
+        for segment in self.segments:
+            entry = segment.lookup(term)
+            if entry is None:
+                continue
+            seg_docs, seg_tfs = segment.doc_postings(entry)
+            if self._deleted:
+                for doc_id, tf in zip(seg_docs, seg_tfs):
+                    if doc_id not in self._deleted:
+                        doc_ids.append(doc_id)
+                        tfs.append(tf)
+            else:
+                doc_ids.extend(seg_docs)
+                tfs.extend(seg_tfs)
+        return doc_ids, tfs
+
+    def cursor(self, term):
+        """返回词的倒排游标（PostingCursor），只在访问到时才解码对应的小块"""
+        parts = []
+        for segment in self.segments:
+            entry = segment.lookup(term)
+            if entry is not None:
+                parts.append((segment, entry))
+        return PostingCursor(parts, self._deleted)
+
+    def positional_postings(self, term):
+        """返回词的倒排表[(doc_id, [位置])]，按doc_id递增，已删除文档被跳过"""
+        result = []
+        for segment in self.segments:
+            entry = segment.lookup(term)
+            if entry is None:
+                continue
+            doc_ids, tfs = segment.doc_postings(entry)
+            for doc_id, positions in zip(doc_ids, segment.positions(entry, tfs)):
+                if doc_id not in self._deleted:
+                    result.append((doc_id, positions))
+        return result
+
+    def positions(self, term, doc_ids):
+        """只解码指定文档（doc_ids有序）中词的位置，返回{doc_id: [位置]}"""
+        result = {}
+        for segment in self.segments:
+            entry = segment.lookup(term)
+            if entry is not None:
+                result.update(segment.positions_of(entry, doc_ids))
+        return result
+
+    def doc_length(self, doc_id):
+        """返回文档词数（文档不存在返回None）"""
+        if doc_id * DOC_ENTRY.size >= len(self._docs_idx):
+            return None
+        length, offset = DOC_ENTRY.unpack_from(self._docs_idx, doc_id * DOC_ENTRY.size)
+        return None if offset == NO_DOC else length
+
+    def doc(self, doc_id):
+        """返回文档信息（doc_id/path/book/chapter/length），文档不存在返回None"""
+        if doc_id in self._deleted or doc_id * DOC_ENTRY.size >= len(self._docs_idx):
+            return None
+        _, offset = DOC_ENTRY.unpack_from(self._docs_idx, doc_id * DOC_ENTRY.size)
+        if offset == NO_DOC:
+            return None
+        self._docs_file.seek(offset)
+        return json.loads(self._docs_file.readline())
+
+    def close(self):
+        for segment in self.segments:
+            segment.close()
+        self._close_docs()
@@ -0,0 +1,300 @@
+# PageArchive.py
+import gzip
+import hashlib
+import io
+import sqlite3
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path, PurePath
+from threading import RLock
+
+from utils.TqdmLogHandler import logger
+
+try:
+    import zstandard  # 可选依赖：安装后支持zstd压缩
+except ImportError:
+    zstandard = None
+
+
+class PageArchive:
+    """原始网页归档（WARC风格的分段文件，替代origin/下每页一个.html文件）
+
+    核心功能：
+    - 所有页面追加写入少量段文件，每条记录单独压缩（gzip或zstd），可按偏移随机读取
+    - SQLite索引：存档路径/URL -> (段文件, 偏移, 长度)，同时保存ETag/Last-Modified
+    - 内容寻址去重：正文SHA1相同的页面只写一条revisit记录，指向首次保存的记录
+    - 顺序流式读取全部记录（供dealer_*_fromfile批量重处理）
+
+    记录格式（与WARC 1.0相同的头部+正文结构）：
+        WARC/1.0
+        WARC-Type: response | revisit
+        WARC-Target-URI: <url>
+        WARC-Date: <ISO时间>
+        WARC-Payload-Digest: sha1:<hex>
+        X-Origin-Path: origin/<目录>/<文件名>
+        Content-Length: <正文字节数>
+
+        <正文>
+
+    线程安全：写入与索引更新持有同一把锁；同一目录在进程内应通过shared()共用一个实例，
+    且同一时刻只应有一个进程写入。
+    """
+
+    COMPRESSIONS = ('gzip', 'zstd')
+    _shared = {}  # 归档目录 -> 实例（同一进程内共用，避免多个实例同时追加同一段文件）
+    _shared_lock = RLock()
+
+    @classmethod
+    def shared(cls, root='origin/archive', compression='gzip'):
+        """返回该目录在本进程内共用的归档实例（多个爬虫写同一归档时使用）"""
+        key = Path(root).resolve()
+        with cls._shared_lock:
+            if key not in cls._shared:
+                cls._shared[key] = cls(root, compression=compression)
+            return cls._shared[key]
+
+    def __init__(self, root='origin/archive', compression='gzip', segment_size=256 * 1024 * 1024):
+        """打开（或创建）归档
+
+        Args:
+            root (str/Path): 归档目录
+            compression (str): 'gzip'或'zstd'（需安装zstandard）
+            segment_size (int): 单个段文件的大小上限（字节），超过后写入新段
+        """
+        if compression not in self.COMPRESSIONS:
+            raise ValueError(f"不支持的压缩格式: {compression}")
+        if compression == 'zstd' and zstandard is None:
+            raise ImportError("使用zstd压缩需要安装zstandard")
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.compression = compression
+        self.segment_size = segment_size
+        self._lock = RLock()
+        self._conn = sqlite3.connect(str(self.root / 'index.db'), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS records ("
+            " key TEXT PRIMARY KEY,"
+            " url TEXT,"
+            " segment TEXT NOT NULL,"
+            " offset INTEGER NOT NULL,"
+            " length INTEGER NOT NULL,"
+            " digest TEXT NOT NULL,"
+            " date TEXT,"
+            " etag TEXT,"
+            " last_modified TEXT"
+            ")"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS records_url ON records (url)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS digests ("
+            " digest TEXT PRIMARY KEY,"
+            " segment TEXT NOT NULL,"
+            " offset INTEGER NOT NULL,"
+            " length INTEGER NOT NULL"
+            ")"
+        )
+        self._conn.commit()
+        self._segment = None  # 当前写入的段文件名
+        self._file = None
+
+    # ---------------------------------------------------------------- 编码
+
+    @staticmethod
+    def _key(path):
+        """存档路径统一为posix字符串（与Fetcher._origin_path一致）"""
+        return PurePath(path).as_posix()
+
+    def _compress(self, data):
+        if self.compression == 'zstd':
+            return zstandard.ZstdCompressor().compress(data)
+        return gzip.compress(data)
+
+    @staticmethod
+    def _decompress(segment, data):
+        if segment.endswith('.zst'):
+            return zstandard.ZstdDecompressor().decompress(data)
+        return gzip.decompress(data)
+
+    @staticmethod
+    def _encode_record(record_type, key, url, digest, date, body):
+        headers = [
+            'WARC/1.0',
+            f'WARC-Type: {record_type}',
+            f'WARC-Target-URI: {url or ""}',
+            f'WARC-Date: {date}',
+            f'WARC-Payload-Digest: sha1:{digest}',
+            f'X-Origin-Path: {key}',
+            'Content-Type: text/html; charset=utf-8',
+            f'Content-Length: {len(body)}',
+        ]
+        return ('\r\n'.join(headers) + '\r\n\r\n').encode('utf-8') + body + b'\r\n\r\n'
+
+    @staticmethod
+    def _read_record(stream):
+        """从解压后的流中读取一条记录，流结束返回None"""
+        line = stream.readline()
+        while line in (b'\r\n', b'\n'):  # 容忍记录之间多余的空行
+            line = stream.readline()
+        if not line:
+            return None
+        headers = {}
+        while (line := stream.readline()) not in (b'\r\n', b'\n', b''):
+            name, _, value = line.decode('utf-8').partition(':')
+            headers[name.strip()] = value.strip()
+        body = stream.read(int(headers.get('Content-Length', 0)))
+        stream.read(4)  # 记录结尾的\r\n\r\n
+        return headers, body
+
+    # ---------------------------------------------------------------- 写入
+
+    def _open_segment(self):
+        """返回当前段文件，超过大小上限时切换到新段"""
+        if self._file is not None and self._file.tell() < self.segment_size:
+            return self._file
+        if self._file is not None:
+            self._file.close()
+        suffix = '.warc.zst' if self.compression == 'zstd' else '.warc.gz'
+        existing = sorted(self.root.glob('pages-*.warc.*'))
+        number = int(existing[-1].name.split('-')[1].split('.')[0]) if existing else 0
+        if existing and (existing[-1].suffix != Path(suffix).suffix
+                         or existing[-1].stat().st_size >= self.segment_size):
+            number += 1
+        self._segment = f"pages-{number:05d}{suffix}"
+        self._file = (self.root / self._segment).open('ab')
+        return self._file
+
+    def put(self, path, url, content, etag=None, last_modified=None):
+        """保存页面
+
+        Args:
+            path (str/Path): 存档路径（origin/<目录>/<文件名>）
+            url (str): 页面URL
+            content (str): 解码后的网页内容
+            etag (str): 响应的ETag
+            last_modified (str): 响应的Last-Modified
+
+        Returns:
+            bool: 写入了新正文返回True，与已有页面内容相同（只写revisit记录）返回False
+        """
+        key = self._key(path)
+        body = content.encode('utf-8')
+        digest = hashlib.sha1(body).hexdigest()
+        date = datetime.now(timezone.utc).isoformat()
+        with self._lock:
+            original = self._conn.execute(
+                "SELECT segment, offset, length FROM digests WHERE digest = ?", (digest,)
+            ).fetchone()
+            f = self._open_segment()
+            offset = f.tell()
+            if original:
+                # 相同内容：只记录引用，索引指向首次保存的记录
+                f.write(self._compress(self._encode_record('revisit', key, url, digest, date, b'')))
+                location = original
+            else:
+                data = self._compress(self._encode_record('response', key, url, digest, date, body))
+                f.write(data)
+                location = (self._segment, offset, len(data))
+            f.flush()
+            with self._conn:
+                if not original:
+                    self._conn.execute(
+                        "INSERT INTO digests (digest, segment, offset, length) VALUES (?, ?, ?, ?)",
+                        (digest, *location)
+                    )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO records "
+                    "(key, url, segment, offset, length, digest, date, etag, last_modified) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, url, *location, digest, date, etag, last_modified)
+                )
+        if original:
+            logger.info(f"♻️ 内容与已归档页面相同，仅记录引用: {key}")
+        else:
+            logger.info(f"✅ 原始网页归档至: {location[0]}@{location[1]} ({key})")
+        return not original
+
+    # ---------------------------------------------------------------- 读取
+
+    def _lookup(self, column, value):
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT segment, offset, length, etag, last_modified, url FROM records WHERE {column} = ? "
+                f"ORDER BY date DESC LIMIT 1",
+                (value,)
+            ).fetchone()
+
+    def get(self, path):
+        """按存档路径读取页面内容（不存在返回None）"""
+        row = self._lookup('key', self._key(path))
+        return self._read_at(*row[:3]) if row else None
+
+    def get_by_url(self, url):
+        """按URL读取最近一次保存的页面内容（不存在返回None）"""
+        row = self._lookup('url', url)
+        return self._read_at(*row[:3]) if row else None
+
+    def meta(self, path):
+        """返回存档的URL及校验信息{'url', 'etag', 'last_modified'}（不存在返回None）"""
+        row = self._lookup('key', self._key(path))
+        return {'url': row[5], 'etag': row[3], 'last_modified': row[4]} if row else None
+
+    def _read_at(self, segment, offset, length):
+        """随机读取单条记录的正文"""
+        with (self.root / segment).open('rb') as f:
+            f.seek(offset)
+            data = f.read(length)
+        _, body = self._read_record(io.BytesIO(self._decompress(segment, data)))
+        return body.decode('utf-8')
+
+    def _open_stream(self, segment_path):
+        """顺序解压整个段文件（连续的gzip成员/zstd帧）"""
+        raw = segment_path.open('rb')
+        if segment_path.name.endswith('.zst'):
+            reader = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=True)
+            return io.BufferedReader(reader)
+        return gzip.GzipFile(fileobj=raw, mode='rb')
+
+    def iter_records(self, prefix=None):
+        """顺序流式读取全部页面（每个存档路径只返回当前版本一次）
+
+        内容相同的多个路径共用一条response记录，读到该记录时依次为每个路径返回一次；
+        revisit记录和已被新版本覆盖的旧记录直接跳过。
+
+        Args:
+            prefix (str): 只返回存档路径以此开头的页面（如'origin/22biqu/'）
+
+        Yields:
+            dict: path/url/date/digest/content（digest为正文SHA1）
+        """
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+            rows = self._conn.execute("SELECT key, url, date, digest FROM records ORDER BY date").fetchall()
+        keys_by_digest = defaultdict(list)
+        for key, url, date, digest in rows:
+            if not prefix or key.startswith(prefix):
+                keys_by_digest[digest].append((key, url, date))
+
+        for segment_path in sorted(self.root.glob('pages-*.warc.*')):
+            with self._open_stream(segment_path) as stream:
+                while (record := self._read_record(stream)) is not None:
+                    headers, body = record
+                    if headers.get('WARC-Type') != 'response':
+                        continue
+                    digest = headers.get('WARC-Payload-Digest', '').partition(':')[2]
+                    keys = keys_by_digest.pop(digest, None)
+                    if not keys:
+                        continue
+                    content = body.decode('utf-8')
+                    for key, url, date in keys:
+                        yield {'path': key, 'url': url, 'date': date, 'digest': digest, 'content': content}
+
+    def close(self):
+        """关闭段文件与索引"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._conn.close()
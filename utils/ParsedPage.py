@@ -0,0 +1,72 @@
+# ParsedPage.py
+from lxml import etree, html
+
+
+def has_class(*names):
+    """生成匹配全部class的XPath谓词（等价于CSS的.a.b）
+
+    Example:
+        >>> compile_xpath(f"//h2[{has_class('text-sm', 'inline')}]")  # 对应 h2.text-sm.inline
+    """
+    return " and ".join(
+        f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')" for name in names
+    )
+
+
+def compile_xpath(expression):
+    """预编译XPath表达式（模块加载时执行一次，供各页面复用）"""
+    return etree.XPath(expression)
+
+
+# 可见文本：跳过script/style内的文本（itertext()会包含它们，get_text()不会）
+VISIBLE_TEXT = compile_xpath('.//text()[not(ancestor::script or ancestor::style)]')
+
+
+class ParsedPage:
+    """单次解析的页面对象（lxml.html文档树）
+
+    每个响应只解析一次，所有提取方法共用同一棵树：
+    - 使用lxml.html直接建树，比BeautifulSoup轻量
+    - 选择器在模块级预编译（compile_xpath），避免每页重复编译
+    - text()与BeautifulSoup的get_text(strip=True)行为一致（不含script/style和注释）
+
+    用法：
+        page = ParsedPage(content, url)
+        href = page.select_one(NEXT_LINK)
+    """
+
+    def __init__(self, content, url=None):
+        """解析页面
+
+        Args:
+            content (str): 解码后的HTML文本
+            url (str): 页面URL（用于相对路径补全和日志）
+        """
+        self.url = url
+        self.content = content
+        try:
+            self.tree = html.fromstring(content)
+        except ValueError:
+            # 含XML编码声明的字符串无法直接解析，转为字节后交给lxml处理
+            self.tree = html.fromstring(content.encode('utf-8'))
+
+    def select(self, xpath):
+        """执行预编译的XPath，返回节点（或属性字符串）列表"""
+        return xpath(self.tree)
+
+    def select_one(self, xpath):
+        """返回第一个匹配结果，没有匹配返回None"""
+        results = xpath(self.tree)
+        return results[0] if results else None
+
+    @staticmethod
+    def text(node):
+        """节点的可见文本（各段去除首尾空白后直接拼接）"""
+        if isinstance(node, str):
+            return node.strip()
+        return "".join(part.strip() for part in VISIBLE_TEXT(node))
+
+    def first_text(self, xpath, default=None):
+        """第一个匹配节点的文本，没有匹配时返回default"""
+        node = self.select_one(xpath)
+        return self.text(node) if node is not None else default
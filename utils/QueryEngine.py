@@ -0,0 +1,302 @@
+# QueryEngine.py
+import heapq
+import math
+import re
+from bisect import bisect_left
+from collections import Counter
+
+from utils.InvertedIndex import InvertedIndex, PostingCursor
+
+_CJK = re.compile(r'[一-鿿]')  # 含中文字符的查询走dealer_cn分词
+_PHRASE = re.compile(r'"([^"]+)"(?:~(\d+))?')  # "短语" 或 "短语"~N（邻近查询，允许多出N个词）
+
+
+def gallop(seq, target, lo=0):
+    """返回seq[lo:]中第一个>=target的下标
+
+    先以1、2、4...的步长向后试探，再在最后一段内二分，
+    目标离当前位置越近代价越小，适合有序列表的逐步求交。
+    """
+    n = len(seq)
+    hi = lo
+    step = 1
+    while hi < n and seq[hi] < target:
+        lo = hi + 1
+        hi += step
+        step *= 2
+    return bisect_left(seq, target, lo, min(hi, n))
+
+
+def intersect(lists):
+    """多个有序列表求交（以最短列表为驱动，其余列表逐步galloping）"""
+    if not lists:
+        return []
+    lists = sorted(lists, key=len)
+    cursors = [0] * len(lists)
+    result = []
+    for value in lists[0]:
+        for i in range(1, len(lists)):
+            cursors[i] = gallop(lists[i], value, cursors[i])
+            if cursors[i] == len(lists[i]):
+                return result
+            if lists[i][cursors[i]] != value:
+                break
+        else:
+            result.append(value)
+    return result
+
+
+def count_phrase(position_lists):
+    """统计短语出现次数：第i个词的位置减去i后，所有词共有的位置即为短语起点"""
+    return len(intersect([[p - i for p in positions] for i, positions in enumerate(position_lists)]))
+
+
+def count_proximity(position_lists, span):
+    """统计所有词（不计顺序）出现在span个连续词以内的次数（按最小覆盖窗口计数）"""
+    merged = sorted((p, i) for i, positions in enumerate(position_lists) for p in positions)
+    need = len(position_lists)
+    counts = [0] * need
+    covered = left = matches = 0
+    for position, i in merged:
+        counts[i] += 1
+        if counts[i] == 1:
+            covered += 1
+        while covered == need:
+            start, j = merged[left]
+            if counts[j] == 1:
+                # 再右移就不能覆盖全部词，[start, position]是以start开头的最小窗口
+                if position - start < span:
+                    matches += 1
+                covered -= 1
+            counts[j] -= 1
+            left += 1
+    return matches
+
+
+class _TermCursor:
+    """单个查询词的倒排游标（WAND中按当前文档ID排序）
+
+    包装索引的PostingCursor：倒排表按小块懒解码，seek越过的小块不会被解码。
+    """
+
+    END = PostingCursor.END  # 游标耗尽后的文档ID
+
+    def __init__(self, postings, idf, upper_bound):
+        self.postings = postings
+        self.idf = idf
+        self.upper_bound = upper_bound
+
+    @property
+    def doc(self):
+        return self.postings.doc
+
+    def advance(self):
+        """移动到下一篇文档"""
+        self.postings.advance()
+
+    def seek(self, target):
+        """移动到第一个doc_id >= target的文档"""
+        self.postings.seek(target)
+
+    @property
+    def tf(self):
+        return self.postings.tf
+
+
+class QueryEngine:
+    """基于BM25的章节检索（WAND剪枝 + 小顶堆取top-k）
+
+    核心功能：
+    - 查询与文档使用相同的预处理：中文走dealer_cn分词和停用词过滤，英文走dealer_en词干提取
+    - 每个词预先计算得分上界，WAND只完整打分有可能进入top-k的文档，其余文档整段跳过
+    - 短语与邻近查询："诡秘之主" 要求分词后的词在文中相邻，"a b"~5 要求全部词出现在2+5个词以内（不计顺序），
+      先按文档ID、再按位置用galloping求交，只解码候选文档的位置
+    - Python接口search()，命令行入口见search.py
+
+    用法：
+        engine = QueryEngine(InvertedIndex('index'))
+        for hit in engine.search("诡秘之主", k=10):
+            print(hit['score'], hit['book'], hit['chapter'])
+    """
+
+    def __init__(self, index, k1=1.2, b=0.75):
+        """初始化查询引擎
+
+        Args:
+            index (InvertedIndex/str): 已打开的索引或索引目录
+            k1 (float): BM25词频饱和参数
+            b (float): BM25文档长度归一化参数
+        """
+        self.index = index if isinstance(index, InvertedIndex) else InvertedIndex(index)
+        self.k1 = k1
+        self.b = b
+        self.avg_length = self.index.avg_length
+        self.min_length = self.index.min_length
+        self._dealer_cn = None
+        self._dealer_en = None
+
+    def tokenize(self, query):
+        """按文档相同的流程切分查询"""
+        if _CJK.search(query):
+            if self._dealer_cn is None:
+                from utils.dealer_cn import dealer_cn
+                self._dealer_cn = dealer_cn()
+            return self._dealer_cn.clean_text(query).split()
+        if self._dealer_en is None:
+            from utils.dealer_en import dealer_en
+            self._dealer_en = dealer_en()
+        return self._dealer_en.clean_text(query).split()
+
+    def idf(self, df):
+        """BM25的逆文档频率（始终为正）"""
+        n = self.index.num_docs
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def term_score(self, idf, tf, length):
+        """单个词对一篇文档的BM25得分"""
+        norm = self.k1 * (1 - self.b + self.b * length / self.avg_length) if self.avg_length else self.k1
+        return idf * tf * (self.k1 + 1) / (tf + norm)
+
+    def search(self, query, k=10):
+        """检索query，返回得分最高的k个章节
+
+        引号内的部分作为短语（"..."）或邻近（"..."~N）条件，只有满足全部条件的章节才会返回，
+        得分仍按查询中的全部词计算BM25。
+
+        Returns:
+            list[dict]: 按得分降序的结果，每项包含doc_id/score/book/chapter/path
+        """
+        phrases = []
+        for match in _PHRASE.finditer(query):
+            terms = self.tokenize(match.group(1))
+            if terms:
+                phrases.append((terms, int(match.group(2)) if match.group(2) else None))
+        terms = self.tokenize(_PHRASE.sub(' ', query))
+        if not phrases:
+            return self.search_terms(terms, k)
+
+        candidates = None
+        for phrase_terms, slop in phrases:
+            matched = [doc_id for doc_id, _ in self.match_phrase(phrase_terms, slop, candidates)]
+            candidates = matched
+            if not candidates:
+                return []
+        return self.score_docs(candidates, terms + [t for phrase_terms, _ in phrases for t in phrase_terms], k)
+
+    def match_phrase(self, terms, slop=None, candidates=None):
+        """查找包含短语的文档
+
+        Args:
+            terms (list): 已切分的短语
+            slop (int): None表示词必须按顺序相邻；整数N表示全部词（不计顺序）出现在len(terms)+N个词以内
+            candidates (list): 只在这些文档中查找（有序doc_id列表）
+
+        Returns:
+            list: [(doc_id, 出现次数)]，按doc_id递增
+        """
+        postings = [self.index.postings(term)[0] for term in dict.fromkeys(terms)]
+        if candidates is not None:
+            postings.append(candidates)
+        doc_ids = intersect(postings)
+        if not doc_ids:
+            return []
+        if len(terms) == 1:
+            # 单个词的出现次数即词频，无需解码位置
+            term_docs, tfs = self.index.postings(terms[0])
+            tf = dict(zip(term_docs, tfs))
+            return [(doc_id, tf[doc_id]) for doc_id in doc_ids]
+
+        positions = {term: self.index.positions(term, doc_ids) for term in dict.fromkeys(terms)}
+        result = []
+        for doc_id in doc_ids:
+            if slop is None:
+                count = count_phrase([positions[term][doc_id] for term in terms])
+            else:
+                count = count_proximity([positions[term][doc_id] for term in dict.fromkeys(terms)],
+                                        len(terms) + slop)
+            if count:
+                result.append((doc_id, count))
+        return result
+
+    def score_docs(self, doc_ids, terms, k=10):
+        """只对给定文档（有序doc_id列表）计算BM25，返回top-k"""
+        scores = dict.fromkeys(doc_ids, 0.0)
+        for term, weight in Counter(terms).items():
+            df, _, _ = self.index.term_stats(term)
+            if not df:
+                continue
+            idf = self.idf(df) * weight
+            cursor = self.index.cursor(term)
+            for doc_id in doc_ids:
+                cursor.seek(doc_id)
+                if cursor.doc == PostingCursor.END:
+                    break
+                if cursor.doc == doc_id:
+                    scores[doc_id] += self.term_score(idf, cursor.tf, self.index.doc_length(doc_id))
+        top = heapq.nlargest(k, scores.items(), key=lambda item: (item[1], -item[0]))
+        return [self._hit(doc_id, score) for doc_id, score in top]
+
+    def _hit(self, doc_id, score):
+        doc = self.index.doc(doc_id)
+        return {
+            'doc_id': doc_id,
+            'score': score,
+            'book': doc['book'],
+            'chapter': doc['chapter'],
+            'path': doc['path'],
+        }
+
+    def search_terms(self, terms, k=10):
+        """对已切分的词执行检索（重复出现的词按出现次数加权）"""
+        cursors = []
+        for term, weight in Counter(terms).items():
+            df, _, max_tf = self.index.term_stats(term)
+            if not df:
+                continue
+            idf = self.idf(df) * weight
+            # 上界：最大词频出现在最短文档中时的得分
+            cursor = _TermCursor(self.index.cursor(term), idf,
+                                 self.term_score(idf, max_tf, self.min_length))
+            if cursor.doc != cursor.END:
+                cursors.append(cursor)
+
+        heap = []  # (score, -doc_id)，堆顶为当前第k名
+        threshold = 0.0
+        while cursors:
+            cursors.sort(key=lambda c: c.doc)
+            # 找枢轴：前缀上界之和首次超过阈值的游标
+            bound = 0.0
+            pivot = None
+            for i, cursor in enumerate(cursors):
+                bound += cursor.upper_bound
+                if bound > threshold:
+                    pivot = i
+                    break
+            if pivot is None:
+                break  # 剩余文档的得分都不可能超过第k名
+            pivot_doc = cursors[pivot].doc
+            if pivot_doc == _TermCursor.END:
+                break
+
+            if cursors[0].doc == pivot_doc:
+                # 枢轴之前的游标都已对齐，完整打分
+                length = self.index.doc_length(pivot_doc)
+                score = 0.0
+                for cursor in cursors:
+                    if cursor.doc != pivot_doc:
+                        break
+                    score += self.term_score(cursor.idf, cursor.tf, length)
+                    cursor.advance()
+                if len(heap) < k:
+                    heapq.heappush(heap, (score, -pivot_doc))
+                elif score > heap[0][0]:
+                    heapq.heapreplace(heap, (score, -pivot_doc))
+                if len(heap) == k:
+                    threshold = heap[0][0]
+            else:
+                # 跳过不可能进入top-k的文档
+                for cursor in cursors[:pivot]:
+                    cursor.seek(pivot_doc)
+            cursors = [cursor for cursor in cursors if cursor.doc != _TermCursor.END]
+
+        return [self._hit(-neg_doc, score) for score, neg_doc in sorted(heap, reverse=True)]
@@ -0,0 +1,131 @@
+# ReprocessManifest.py
+import hashlib
+import sqlite3
+from pathlib import Path, PurePath
+from threading import RLock
+
+
+class ReprocessManifest:
+    """离线重处理清单（SQLite，记录每个原始页面上次处理时的输入与配置）
+
+    核心功能：
+    - 记录原始页面（origin/下的文件或归档记录）-> (内容哈希, dealer配置哈希, 输出文件, 修改时间, 大小)
+    - 只有内容或配置变化、或输出文件丢失的页面才需要重新处理
+    - 修改时间和大小未变时直接沿用记录的内容哈希，无需读取文件
+    - 批量提交，避免逐条fsync拖慢大批量处理
+
+    线程安全：所有读写持有同一把锁。
+    """
+
+    COMMIT_EVERY = 500  # 累积多少条记录提交一次
+    COLUMNS = ('content_hash', 'config_hash', 'output', 'mtime', 'size')
+    # 需要处理的原因
+    NEW, CONTENT, CONFIG, OUTPUT = 'new', 'content', 'config', 'output'
+
+    def __init__(self, db_file):
+        """打开（或创建）清单
+
+        Args:
+            db_file (str/Path): SQLite数据库路径
+        """
+        self.db_file = Path(db_file)
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = RLock()
+        self._conn = sqlite3.connect(str(self.db_file), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sources ("
+            " source TEXT PRIMARY KEY,"
+            " content_hash TEXT,"
+            " config_hash TEXT,"
+            " output TEXT,"
+            " mtime REAL,"
+            " size INTEGER"
+            ")"
+        )
+        # 旧版清单缺少的字段直接补列（缺少哈希的记录会被重新处理一次）
+        existing = {row[1] for row in self._conn.execute("PRAGMA table_info(sources)")}
+        for column in self.COLUMNS:
+            if column not in existing:
+                self._conn.execute(f"ALTER TABLE sources ADD COLUMN {column}")
+        self._conn.commit()
+        self._uncommitted = 0
+
+    @staticmethod
+    def _key(source):
+        return PurePath(source).as_posix()
+
+    @staticmethod
+    def content_hash(data):
+        """原始页面内容的哈希（str按UTF-8编码，与PageArchive的摘要一致）"""
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        return hashlib.sha1(data).hexdigest()
+
+    def check(self, source, config_hash, mtime, size, digest=None, load=None):
+        """判断原始页面是否需要重新处理
+
+        Args:
+            source (str/Path): 原始页面路径（或存档路径）
+            config_hash (str): 当前dealer配置哈希
+            mtime (float): 修改时间
+            size (int): 大小
+            digest (str): 已知的内容哈希（归档记录自带）
+            load (callable): 无参函数，返回页面内容（修改时间或大小变化、需要计算哈希时才调用）
+
+        Returns:
+            tuple: (原因, 内容哈希)；原因为None表示无需处理，
+                   否则为NEW/CONTENT/CONFIG/OUTPUT之一。新页面未提供digest时内容哈希为None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_hash, config_hash, output, mtime, size FROM sources WHERE source = ?",
+                (self._key(source),)
+            ).fetchone()
+        if row is None or row[0] is None:
+            return self.NEW, digest
+        stored_hash, stored_config, output, stored_mtime, stored_size = row
+        if digest is None:
+            if stored_mtime == mtime and stored_size == size:
+                digest = stored_hash  # 快速路径：文件未被修改
+            elif load is not None:
+                digest = self.content_hash(load())
+        if digest != stored_hash:
+            return self.CONTENT, digest
+        if stored_config != config_hash:
+            return self.CONFIG, digest
+        if output and not Path(output).exists():
+            return self.OUTPUT, digest
+        return None, digest
+
+    def record(self, source, content_hash, config_hash, output, mtime, size):
+        """记录一次处理结果（output为None表示页面没有可保存的正文）"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sources (source, content_hash, config_hash, output, mtime, size) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (self._key(source), content_hash, config_hash, str(output) if output else None, mtime, size)
+            )
+            self._tick()
+
+    def touch(self, source, mtime, size):
+        """内容未变但修改时间/大小变化时更新记录，下次直接走快速路径"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE sources SET mtime = ?, size = ? WHERE source = ?",
+                (mtime, size, self._key(source))
+            )
+            self._tick()
+
+    def _tick(self):
+        self._uncommitted += 1
+        if self._uncommitted >= self.COMMIT_EVERY:
+            self._conn.commit()
+            self._uncommitted = 0
+
+    def close(self):
+        """提交剩余记录并关闭"""
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
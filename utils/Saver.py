@@ -1,27 +1,178 @@
 # Saver.py
 import csv
-from pathlib import Path
+from datetime import datetime
+from pathlib import Path, PurePath
+from threading import Lock
 
 import pandas as pd
 
 from utils.TqdmLogHandler import logger
 
+try:
+    import pyarrow as pa  # 可选依赖：安装后支持流式Parquet保存
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
 
 class Saver:
     """数据持久化处理器
 
     功能特性：
-    - 多格式支持：CSV、Excel、文本文件
+    - 流式Parquet保存（推荐）：记录边产生边追加，每满row_group_size条写出一个行组，内存占用与结果总数无关
+    - 书名/章节名等重复度高的列使用字典编码，正文等长文本列只做zstd压缩
+    - 多格式支持：CSV、Excel、Parquet、文本文件
     - 结构化与非结构化数据分离存储
     - 自动处理字段排除和编码问题
     - 智能目录创建和文件命名
 
     典型使用场景：
+    - 爬虫逐条保存章节/文章记录（BaseSpider.save_record，config["parquet"]开启）
     - 保存爬虫解析后的结构化数据
     - 存档完整文本内容
     - 生成可读性强的结果文件
+
+    用法：
+        with Saver("parsed/cnn/results.parquet") as sink:
+            for article in articles:
+                sink.append(article)
+
+    线程安全：append/extend/flush/close持有同一把锁，可被多个抓取线程共用。
+    注意：Parquet文件尾在close()时写入，未关闭的文件无法读取。
     """
 
+    DICTIONARY_COLUMNS = ('book_name', 'chapter_name', 'chapter_page', 'author', 'publish_time')
+
+    def __init__(self, path, row_group_size=1000, compression='zstd',
+                 dictionary_columns=DICTIONARY_COLUMNS, exclude_columns=None):
+        """创建流式Parquet写入器（文件在第一个行组写出时创建）
+
+        Args:
+            path (str/Path): 输出文件
+            row_group_size (int): 每个行组的记录数（累积到该数量时写出）
+            compression (str): 列压缩算法（默认zstd）
+            dictionary_columns (iterable): 使用字典编码的列（不存在的列忽略）
+            exclude_columns (list): 不保存的字段（如原始HTML等大字段）
+        """
+        if pq is None:
+            raise ImportError("流式Parquet保存需要安装pyarrow")
+        self.path = Path(path)
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.dictionary_columns = set(dictionary_columns)
+        self.exclude_columns = set(exclude_columns or ())
+        self.rows_written = 0
+        self.rows_failed = 0  # 写出失败而丢弃的记录数
+        self._rows = []
+        self._schema = None
+        self._writer = None
+        self._dropped = set()  # 已提示过的、不在表结构中的字段
+        self._closed = False
+        self._warned_closed = False
+        self._lock = Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _normalize(self, record):
+        """排除指定字段，路径等非基本类型转为字符串"""
+        return {
+            key: str(value) if isinstance(value, PurePath) else value
+            for key, value in record.items() if key not in self.exclude_columns
+        }
+
+    def append(self, record):
+        """追加一条记录（dict）；文件关闭后追加的记录丢弃，不会重新打开覆盖已写完的文件"""
+        with self._lock:
+            if self._closed:
+                if not self._warned_closed:
+                    self._warned_closed = True
+                    logger.warning(f"⚠️ Parquet文件已关闭，之后的记录不再保存: {self.path}")
+                return
+            self._rows.append(self._normalize(record))
+            if len(self._rows) >= self.row_group_size:
+                self._write_row_group()
+
+    def extend(self, records):
+        """追加多条记录"""
+        for record in records:
+            self.append(record)
+
+    @staticmethod
+    def _infer_schema(rows):
+        """由第一个行组推断表结构：逐列推断类型，全部为空或类型混杂的列按字符串处理"""
+        names = list(dict.fromkeys(key for row in rows for key in row))
+        fields = []
+        for name in names:
+            try:
+                dtype = pa.array([row.get(name) for row in rows]).type
+            except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError):
+                dtype = pa.null()
+            fields.append(pa.field(name, pa.string() if pa.types.is_null(dtype) else dtype))
+        return pa.schema(fields)
+
+    def _coerce(self, row):
+        """按表结构整理一条记录：字符串列中的非字符串值转为字符串（如int/str混用的章节序号）"""
+        return {
+            name: str(row[name]) if pa.types.is_string(dtype) and row.get(name) is not None
+            and not isinstance(row[name], str) else row.get(name)
+            for name, dtype in zip(self._schema.names, self._schema.types)
+        }
+
+    def _write_row_group(self):
+        if not self._rows:
+            return
+        rows, self._rows = self._rows, []  # 无论写出成功与否都清空，失败的批次不会拖累之后的记录
+        try:
+            if self._schema is None:
+                self._schema = self._infer_schema(rows)
+            else:
+                # 后续记录按已有表结构写入：缺少的字段为空，多出的字段丢弃
+                extra = {key for row in rows for key in row} - set(self._schema.names) - self._dropped
+                if extra:
+                    self._dropped |= extra
+                    logger.warning(f"⚠️ 字段不在Parquet表结构中，已忽略: {', '.join(sorted(extra))}")
+            table = pa.Table.from_pylist([self._coerce(row) for row in rows], schema=self._schema)
+            if self._writer is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._writer = pq.ParquetWriter(
+                    str(self.path), self._schema,
+                    compression=self.compression,
+                    use_dictionary=[name for name in self._schema.names if name in self.dictionary_columns],
+                )
+            self._writer.write_table(table)
+        except Exception as e:
+            self.rows_failed += len(rows)
+            logger.error(f"🛑 Parquet行组写出失败，丢弃 {len(rows)} 条记录: {str(e)}")
+            return
+        self.rows_written += len(rows)
+
+    def flush(self):
+        """立即写出已累积的记录（不足一个行组也写出）"""
+        with self._lock:
+            self._write_row_group()
+
+    def close(self):
+        """写出剩余记录与文件尾（可重复调用；关闭后不再接受记录）"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._write_row_group()
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+                failed = f"，丢弃 {self.rows_failed} 条" if self.rows_failed else ""
+                logger.info(f"✅ Parquet文件保存至: {self.path}（{self.rows_written} 条{failed}）")
+
+    @staticmethod
+    def run_path(save_dir):
+        """本次运行的Parquet文件路径（save_dir/results/part-时间戳.parquet，多次运行组成一个数据集目录）"""
+        return Path(save_dir) / "results" / f"part-{datetime.now():%Y%m%d-%H%M%S}.parquet"
+
     @staticmethod
     def save_data(data, save_dir="parsed", exclude_columns=None, format_type='both'):
         """通用数据保存入口方法
@@ -30,7 +181,7 @@ class Saver:
             data (list[dict]): 要保存的数据集合，每个元素为字典格式
             save_dir (str): 保存目录路径（默认'parsed'）
             exclude_columns (list): 需要排除的字段列表（如原始HTML等大字段）
-            format_type (str): 保存格式，可选 'csv'/'excel'/'both'（默认）
+            format_type (str): 保存格式，可选 'csv'/'excel'/'both'（默认）/'parquet'（需安装pyarrow）
 
         设计要点：
         - 自动创建多级目录结构
@@ -51,6 +202,10 @@ class Saver:
                 excel_path = base_dir / "results.xlsx"
                 Saver._save_excel(data, excel_path, exclude_columns)
 
+            if format_type == 'parquet' and data:
+                with Saver(base_dir / "results.parquet", exclude_columns=exclude_columns) as sink:
+                    sink.extend(data)
+
             # 非结构化数据存储（文本文件）
             # Saver._save_txt_files(data, base_dir)
 
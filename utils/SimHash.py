@@ -0,0 +1,101 @@
+# SimHash.py
+import hashlib
+import re
+from threading import Lock
+
+_SPACES = re.compile(r'\s+')
+
+
+def simhash(text, shingle=3, bits=64):
+    """计算文本的SimHash指纹
+
+    以去除空白后的字符n-gram为特征（中英文通用），每个特征哈希为bits位，
+    每一位上多数特征为1则指纹该位为1。内容相近的文本指纹的海明距离很小。
+
+    Args:
+        text (str): 正文
+        shingle (int): 字符n-gram长度
+        bits (int): 指纹位数
+
+    Returns:
+        int: 指纹（文本过短无法取特征时为0）
+    """
+    text = _SPACES.sub('', text)
+    features = {text[i:i + shingle] for i in range(max(len(text) - shingle + 1, 0))}
+    if not features:
+        return 0
+    # 哈希需跨进程稳定（持久化后下次运行仍可比较），不能使用内置hash()
+    hashes = [
+        int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=bits // 8).digest(), 'little')
+        for feature in features
+    ]
+    half = len(hashes) / 2
+    fingerprint = 0
+    for bit in range(bits):
+        if sum((h >> bit) & 1 for h in hashes) > half:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+class SimHashIndex:
+    """SimHash近重复索引（分段倒排，内存常驻）
+
+    64位指纹切成bands段，海明距离不超过max_distance（< bands）时，
+    至少有一段完全相同，因此只需与同段相同的候选比较，无需遍历全部指纹。
+
+    线程安全：find_or_add在锁内完成“查找 + 插入”，并发处理相同内容时只有一个会被视为原文。
+    """
+
+    def __init__(self, bits=64, bands=4, max_distance=3):
+        """初始化索引
+
+        Args:
+            bits (int): 指纹位数
+            bands (int): 分段数
+            max_distance (int): 视为近重复的最大海明距离（必须小于bands）
+        """
+        if max_distance >= bands:
+            raise ValueError("max_distance必须小于bands，否则分段索引会漏判")
+        self.bands = bands
+        self.band_bits = bits // bands
+        self.max_distance = max_distance
+        self._tables = [{} for _ in range(bands)]  # 段值 -> [(指纹, 键)]
+        self._lock = Lock()
+
+    def _band_values(self, fingerprint):
+        mask = (1 << self.band_bits) - 1
+        return [(fingerprint >> (i * self.band_bits)) & mask for i in range(self.bands)]
+
+    def _find(self, fingerprint, band_values):
+        for table, value in zip(self._tables, band_values):
+            for candidate, key in table.get(value, ()):
+                if bin(candidate ^ fingerprint).count('1') <= self.max_distance:
+                    return key
+        return None
+
+    def find(self, fingerprint):
+        """返回近重复文档的键，没有则返回None"""
+        with self._lock:
+            return self._find(fingerprint, self._band_values(fingerprint))
+
+    def add(self, fingerprint, key):
+        """加入指纹"""
+        with self._lock:
+            self._add(fingerprint, key, self._band_values(fingerprint))
+
+    def _add(self, fingerprint, key, band_values):
+        for table, value in zip(self._tables, band_values):
+            table.setdefault(value, []).append((fingerprint, key))
+
+    def find_or_add(self, fingerprint, key):
+        """原子地查找近重复文档，没有时加入索引
+
+        Returns:
+            近重复文档的键；未找到（已加入索引）时返回None
+        """
+        band_values = self._band_values(fingerprint)
+        with self._lock:
+            original = self._find(fingerprint, band_values)
+            if original is None:
+                self._add(fingerprint, key, band_values)
+            return original
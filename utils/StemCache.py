@@ -0,0 +1,101 @@
+# StemCache.py
+import atexit
+import json
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock
+
+from utils.TqdmLogHandler import logger
+
+
+class StemCache:
+    """进程内共享的词干提取缓存（有界LRU）
+
+    核心功能：
+    - 英文词频呈Zipf分布，绝大多数调用命中少量高频词，缓存后无需重复提取
+    - 容量上限内按最近使用淘汰
+    - 命中/未命中计数，便于评估缓存效果
+    - 可选持久化到磁盘，下次运行直接预热
+
+    线程安全：缓存读写持有锁，词干计算本身在锁外执行。
+    """
+
+    def __init__(self, stem_func, maxsize=100000):
+        """初始化缓存
+
+        Args:
+            stem_func (callable): 实际的词干提取函数（如PorterStemmer().stem）
+            maxsize (int): 最多缓存的词数
+        """
+        self.stem_func = stem_func
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()  # word -> stem，末尾为最近使用
+        self._lock = Lock()
+        self._save_on_exit = set()  # 已注册退出时保存的文件
+
+    def stem(self, word):
+        """返回词干（命中缓存时直接返回）"""
+        with self._lock:
+            stem = self._cache.get(word)
+            if stem is not None:
+                self._cache.move_to_end(word)
+                self.hits += 1
+                return stem
+            self.misses += 1
+
+        stem = self.stem_func(word)
+        with self._lock:
+            self._cache[word] = stem
+            if len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)  # 淘汰最久未使用的词
+        return stem
+
+    def stats(self):
+        """返回缓存统计：hits/misses/size/maxsize/hit_rate"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._cache),
+                'maxsize': self.maxsize,
+                'hit_rate': self.hits / total if total else 0.0,
+            }
+
+    def load(self, path):
+        """从磁盘加载缓存（文件不存在时忽略）"""
+        try:
+            with Path(path).open('r', encoding='utf-8') as f:
+                items = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.error(f"词干缓存加载失败: {str(e)}")
+            return
+        with self._lock:
+            # 文件按最近使用顺序保存，超出容量时只保留最近的部分
+            for word, stem in list(items.items())[-self.maxsize:]:
+                self._cache[word] = stem
+        logger.info(f"成功加载词干缓存，共{len(items)}个词")
+
+    def save_at_exit(self, path):
+        """进程退出时将缓存保存到path（同一文件只注册一次，多个实例共用缓存时不会重复保存）"""
+        key = Path(path).resolve()
+        with self._lock:
+            if key in self._save_on_exit:
+                return
+            self._save_on_exit.add(key)
+        atexit.register(self.save, path)
+
+    def save(self, path):
+        """将缓存写入磁盘（先写临时文件再替换，避免中途中断损坏文件）"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            items = dict(self._cache)
+        tmp_path = path.with_name(path.name + '.tmp')
+        with tmp_path.open('w', encoding='utf-8') as f:
+            json.dump(items, f, ensure_ascii=False)
+        tmp_path.replace(path)
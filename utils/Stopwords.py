@@ -0,0 +1,105 @@
+# Stopwords.py
+import hashlib
+import json
+from pathlib import Path
+from threading import Lock
+
+from utils.TqdmLogHandler import logger
+
+
+class Stopwords(frozenset):
+    """不可变停用词表（frozenset子类，可在线程间安全共享）
+
+    核心功能：
+    - 查询直接走frozenset的C实现，与普通集合一样快
+    - 同一文件（按内容哈希识别）在进程内只解析一次，并缓存到磁盘
+    - 修改操作（union/with_words）返回新对象，调用方整体替换引用即可原子生效
+
+    用法：
+        dealer_cn.stopwords = Stopwords.from_file('sources/cn_stopwords.txt')
+    """
+
+    __slots__ = ('digest',)
+
+    CACHE_DIR = Path('sources/.stopwords_cache')  # 编译结果缓存目录（按文件哈希命名）
+    _loaded = {}  # 文件哈希 -> Stopwords（进程内复用）
+    _lock = Lock()
+
+    def __new__(cls, words=(), digest=None):
+        """Args:
+            words (iterable): 停用词（空字符串会被忽略）
+            digest (str): 来源文件的哈希（不传时按词表内容计算）
+        """
+        self = super().__new__(cls, (word for word in words if word))
+        self.digest = digest or cls._hash_words(self)
+        return self
+
+    @staticmethod
+    def _hash_words(words):
+        """按排序后的词表内容计算哈希"""
+        return hashlib.sha1('\n'.join(sorted(words)).encode('utf-8')).hexdigest()
+
+    @classmethod
+    def from_file(cls, filename):
+        """加载停用词文件（每行一个词）
+
+        同一内容的文件只解析一次：先查进程内缓存，再查磁盘缓存，最后才逐行解析。
+
+        Raises:
+            FileNotFoundError: 文件不存在
+        """
+        raw = Path(filename).read_bytes()
+        digest = hashlib.sha1(raw).hexdigest()
+        with cls._lock:
+            table = cls._loaded.get(digest)
+            if table is None:
+                table = cls._load_cache(digest)
+                if table is None:
+                    table = cls(
+                        (line.strip() for line in raw.decode('utf-8').splitlines()),
+                        digest=digest
+                    )
+                    cls._save_cache(table)
+                cls._loaded[digest] = table
+        return table
+
+    @classmethod
+    def _cache_path(cls, digest):
+        return cls.CACHE_DIR / f"{digest}.json"
+
+    @classmethod
+    def _load_cache(cls, digest):
+        """读取磁盘缓存（不存在或损坏时返回None）"""
+        try:
+            with cls._cache_path(digest).open('r', encoding='utf-8') as f:
+                return cls(json.load(f), digest=digest)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.error(f"停用词缓存读取失败: {str(e)}")
+            return None
+
+    @classmethod
+    def _save_cache(cls, table):
+        """写入磁盘缓存（先写临时文件再替换）"""
+        path = cls._cache_path(table.digest)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(path.name + '.tmp')
+            with tmp_path.open('w', encoding='utf-8') as f:
+                json.dump(sorted(table), f, ensure_ascii=False)
+            tmp_path.replace(path)
+        except OSError as e:
+            logger.error(f"停用词缓存写入失败: {str(e)}")
+
+    def union(self, other):
+        """合并两张词表，返回新对象（一方已包含另一方时直接返回该方）"""
+        if other <= self:
+            return self
+        if self <= other and isinstance(other, Stopwords):
+            return other
+        return Stopwords(frozenset.union(self, other))
+
+    def with_words(self, *words):
+        """添加停用词，返回新对象（写时复制）"""
+        return self.union(Stopwords(words))
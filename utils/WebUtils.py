@@ -1,6 +1,18 @@
 # WebUtils.py
+import codecs
 import re
-from bs4 import BeautifulSoup
+
+# 字节级编码嗅探（无需解析整个文档）
+_META_TAG = re.compile(rb'<meta\b[^>]*>', re.I)
+_TAG_ATTR = re.compile(rb'([\w-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s"\'>]+))')
+_CONTENT_CHARSET = re.compile(rb'charset=([\w-]+)', re.I)
+_BOMS = (
+    (codecs.BOM_UTF8, 'utf-8'),
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
 
 
 class WebUtils:
@@ -8,7 +20,7 @@ class WebUtils:
 
     功能模块：
     - 安全文件名生成
-    - 智能编码检测与解码
+    - 智能编码检测与解码（字节级嗅探）
     - HTML解析辅助
 
     典型应用场景：
@@ -17,6 +29,8 @@ class WebUtils:
     - 规范化网络资源存储路径
     """
 
+    SNIFF_BYTES = 4096  # 编码嗅探只扫描文档开头的字节数
+
     @staticmethod
     def generate_filename(url):
         """将URL转换为安全可用的文件名
@@ -50,18 +64,70 @@ class WebUtils:
         return f"{filename or 'default'}.html"
 
     @staticmethod
-    def decode_content(content, response):
+    def get_response_charset(response):
+        """读取响应头声明的charset（兼容http.client与aiohttp响应）
+
+        Args:
+            response: 响应对象
+
+        Returns:
+            str/None: 声明的编码，未声明返回None
+        """
+        headers = getattr(response, 'headers', None)
+        if hasattr(headers, 'get_content_charset'):
+            return headers.get_content_charset()
+        # aiohttp.ClientResponse直接提供charset属性
+        return getattr(response, 'charset', None)
+
+    @staticmethod
+    def sniff_charset(content, limit=None):
+        """在原始字节中检测编码声明（BOM > meta charset > http-equiv）
+
+        规则与BeautifulSoup查找meta标签一致，但只做正则扫描，不构建文档树。
+
+        Args:
+            content (bytes): 原始二进制内容
+            limit (int): 只扫描前limit个字节（None表示扫描全文）
+
+        Returns:
+            str/None: 检测到的编码，未声明返回None
+        """
+        for bom, encoding in _BOMS:
+            if content.startswith(bom):
+                return encoding
+
+        window = content[:limit] if limit else content
+        equiv_charset = None
+        for tag in _META_TAG.finditer(window):
+            attrs = {
+                match.group(1).lower(): next(v for v in match.groups()[1:] if v is not None)
+                for match in _TAG_ATTR.finditer(tag.group(0))
+            }
+            # 标准meta charset标签优先
+            if attrs.get(b'charset'):
+                return attrs[b'charset'].strip().decode('ascii', 'ignore') or None
+            # 记录第一个HTTP-EQUIV content-type声明
+            if equiv_charset is None and b'content-type' in attrs.get(b'http-equiv', b'').lower():
+                if match := _CONTENT_CHARSET.search(attrs.get(b'content', b'')):
+                    equiv_charset = match.group(1).decode('ascii')
+        return equiv_charset
+
+    @staticmethod
+    def decode_content(content, response, url=None):
         """智能解码网页内容（支持多级编码检测）
 
         解码策略（按优先级排序）：
         1. 响应头声明的charset
-        2. HTML meta标签显式声明的charset
+        2. 文档自身的BOM/meta charset声明（先扫描前SNIFF_BYTES字节，未找到再扫描全文）
         3. 常见编码类型自动检测（utf-8 > gbk > latin-1）
         4. 强制utf-8解码（替换非法字符）
 
+        每个页面只按自身的声明解码，结果与抓取顺序无关。
+
         Args:
             content (bytes): 原始二进制内容
-            response (requests.Response): 响应对象
+            response: 响应对象（http.client或aiohttp响应均可）
+            url (str): 页面URL（保留参数，用于兼容调用方）
 
         Returns:
             str: 解码后的文本内容
@@ -70,20 +136,11 @@ class WebUtils:
             UnicodeDecodeError: 所有编码尝试失败时抛出（最终会强制解码）
         """
         # 第一优先级：HTTP响应头中的编码声明
-        charset = response.headers.get_content_charset()
-
-        if not charset:  # 第二优先级：HTML元数据检测
-            soup = BeautifulSoup(content, 'html.parser')  # 快速解析模式
-
-            # 检测标准meta charset标签
-            if meta := soup.find('meta', {'charset': True}):
-                charset = meta['charset']
-            # 检测HTTP-EQUIV content-type声明
-            elif (meta := soup.find('meta',
-                                    attrs={'http-equiv': re.compile(r'content-type', re.I)})) \
-                    and (match := re.search(r'charset=([\w-]+)',
-                                            meta.get('content', ''), re.I)):
-                charset = match.group(1)
+        charset = WebUtils.get_response_charset(response)
+
+        if not charset:  # 第二优先级：文档自身的编码声明（先嗅探开头，未找到再扫描全文）
+            charset = (WebUtils.sniff_charset(content, WebUtils.SNIFF_BYTES)
+                       or WebUtils.sniff_charset(content))
 
         # 构建编码检测顺序列表
         encodings = [charset] if charset else []  # 前序检测结果
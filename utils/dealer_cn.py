@@ -1,34 +1,70 @@
+import hashlib
+import json
+import os
 import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from pathlib import Path
+from threading import Lock
 
 from bs4 import BeautifulSoup
 import jieba
+from utils.Stopwords import Stopwords
 from utils.TqdmLogHandler import logger
 
+
+def _init_worker(stopwords, log_level=None):
+    """分词进程初始化：使用主进程当前的停用词表，每个进程只加载一次jieba词典"""
+    if log_level:
+        logger.setLevel(log_level)
+    dealer_cn.stopwords = stopwords
+    jieba.initialize()
+
+
+def _clean_worker(text):
+    """分词进程中执行的清洗任务（模块级函数，便于pickle）"""
+    return dealer_cn.clean_text(text)
+
+
 class dealer_cn:
-    stopwords = set()  # 类变量，存储停用词
-    def __init__(self, dealer = None):
+    DEALER_VERSION = 1  # 清洗/分词逻辑变化时递增，已处理的文档会被判定为需要重新处理
+    stopwords = Stopwords()  # 类变量，不可变停用词表（修改时整体替换）
+    _stopwords_lock = Lock()  # 串行化替换操作
+
+    def __init__(self, dealer = None, processes = 0, writer = None):
+        """
+        Args:
+            dealer: 保留参数
+            processes (int): 分词进程数，大于0时clean()交给进程池执行，避免与抓取线程争抢GIL
+            writer (BufferedWriter): 后台写入器，提供时保存章节只排队不阻塞（爬虫会自动设置）
+        """
         self.dealer = dealer
+        self.processes = processes
+        self.writer = writer
+        self._pool = None
+        self._pool_stopwords = None  # 进程池创建时使用的停用词表
+        self._pool_lock = Lock()
         # 初始化时加载停用词
         self.load_stopwords()
 
     @staticmethod
     def load_stopwords(filename='sources/cn_stopwords.txt'):
-        """加载停用词表"""
+        """加载停用词表（与已有词表合并后整体替换，读线程不会看到中间状态）"""
         try:
-            with open(filename, 'r', encoding='utf-8') as f:
-                for word in f:
-                    dealer_cn.stopwords.add(word.strip())
-            logger.info(f"成功加载停用词表，共{len(dealer_cn.stopwords)}个停用词")
+            table = Stopwords.from_file(filename)
         except FileNotFoundError:
             logger.error(f"停用词文件 {filename} 未找到！")
-            dealer_cn.stopwords = set()  # 防止后续报错
+            return
+        with dealer_cn._stopwords_lock:
+            dealer_cn.stopwords = dealer_cn.stopwords.union(table)
+        logger.info(f"成功加载停用词表，共{len(dealer_cn.stopwords)}个停用词")
 
     @staticmethod
     def add_stopword(word):
-        """添加单个停用词"""
-        dealer_cn.stopwords.add(word.strip())
+        """添加单个停用词（写时复制）"""
+        with dealer_cn._stopwords_lock:
+            dealer_cn.stopwords = dealer_cn.stopwords.with_words(word.strip())
 
     @staticmethod
     def delete_stop_words(words):
@@ -37,9 +73,27 @@ class dealer_cn:
 
     @staticmethod
     def reload_stopwords(filename='sources/cn_stopwords.txt'):
-        """重新加载停用词表"""
-        dealer_cn.stopwords.clear()
-        dealer_cn.load_stopwords(filename)
+        """重新加载停用词表（加载完成后一次性替换，不会出现空表）"""
+        try:
+            table = Stopwords.from_file(filename)
+        except FileNotFoundError:
+            logger.error(f"停用词文件 {filename} 未找到！")
+            return
+        with dealer_cn._stopwords_lock:
+            dealer_cn.stopwords = table
+        logger.info(f"成功加载停用词表，共{len(table)}个停用词")
+
+    @staticmethod
+    def config_hash(uppercase=False):
+        """当前处理配置的哈希（停用词表、词干提取、大小写、DEALER_VERSION），任一变化输出都可能不同"""
+        config = {
+            'dealer': 'cn',
+            'version': dealer_cn.DEALER_VERSION,
+            'stopwords': dealer_cn.stopwords.digest,
+            'stem': False,
+            'uppercase': uppercase,
+        }
+        return hashlib.sha1(json.dumps(config, sort_keys=True).encode('utf-8')).hexdigest()
 
     @staticmethod
     def clean_text(content):
@@ -69,6 +123,78 @@ class dealer_cn:
         text = ' '.join(words)
         return text
 
+    @staticmethod
+    def create_pool(processes=None, stopwords=None, log_level=None):
+        """创建分词进程池（每个进程初始化时加载词典，并使用给定的停用词表）
+
+        Args:
+            processes (int): 进程数（默认CPU核数）
+            stopwords (Stopwords): 停用词表（默认为创建时的dealer_cn.stopwords，
+                                   包括运行中add_stopword/reload_stopwords的修改）
+            log_level (str): 工作进程的日志级别（如'WARNING'，批量处理时避免逐篇输出分词结果）
+        """
+        return ProcessPoolExecutor(
+            max_workers=processes or os.cpu_count(),
+            initializer=_init_worker,
+            initargs=(stopwords if stopwords is not None else dealer_cn.stopwords, log_level)
+        )
+
+    @staticmethod
+    def clean_texts(texts, processes=None, max_pending=None, executor=None, stopwords=None):
+        """批量清洗分词（多进程流式处理，结果顺序与输入一致）
+
+        Args:
+            texts (iterable): 待处理文本（可为惰性生成器）
+            processes (int): 进程数（默认CPU核数）
+            max_pending (int): 最多同时提交的文档数（有界队列，默认进程数的4倍）
+            executor: 复用已有的进程池（不传则内部创建并在结束时关闭）
+            stopwords (Stopwords): 停用词表（默认当前的dealer_cn.stopwords）
+
+        Yields:
+            str: 与clean_text相同格式的分词结果
+        """
+        own_executor = executor is None
+        if own_executor:
+            executor = dealer_cn.create_pool(processes, stopwords)
+        max_pending = max_pending or (processes or os.cpu_count()) * 4
+        pending = deque()
+        try:
+            for text in texts:
+                pending.append(executor.submit(_clean_worker, text))
+                # 队列已满时先产出最早的结果，限制内存占用
+                if len(pending) >= max_pending:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            if own_executor:
+                executor.shutdown(cancel_futures=True)
+
+    def clean(self, content):
+        """清洗单篇文本（配置了processes时在进程池中执行）
+
+        停用词表被替换后（add_stopword/reload_stopwords）重建进程池，结果与单进程一致。
+        """
+        if not self.processes:
+            return self.clean_text(content)
+        with self._pool_lock:
+            stopwords = dealer_cn.stopwords
+            if self._pool is not None and self._pool_stopwords is not stopwords:
+                self._pool.shutdown(wait=False)  # 已提交的任务仍会完成
+                self._pool = None
+            if self._pool is None:
+                self._pool = self.create_pool(self.processes, stopwords)
+                self._pool_stopwords = stopwords
+            future = self._pool.submit(_clean_worker, content)
+        return future.result()
+
+    def close(self):
+        """关闭分词进程池"""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
     @staticmethod
     def text_cut(text):
         """使用jieba进行中文分词"""
@@ -76,22 +202,26 @@ class dealer_cn:
         return seg_list
 
     def _save_chapter_data(self, book_name: str, chapter_name: str,
-                           content: str) -> None:
-        """统一的章节保存方法"""
+                           content: str, key=None):
+        """统一的章节保存方法（返回保存路径，失败返回None；key为后台写入时所属页面的URL）"""
         try:
             # 生成安全文件名
             safe_book_name = re.sub(r'[\\/*?:"<>|]', '', book_name)[:50]
             safe_chapter_name = re.sub(r'[\\/*?:"<>|]', '', chapter_name)[:50]
 
-            # 创建存储路径
-            save_dir = Path("dealer") / safe_book_name
-            save_dir.mkdir(parents=True, exist_ok=True)
+            file_path = Path("dealer") / safe_book_name / f"{safe_book_name}-{safe_chapter_name}.txt"
+            if self.writer is not None:
+                # 交给后台写入器（目录批量创建），返回的路径在写入完成前即可记录
+                self.writer.write(file_path, content, key=key)
+                return file_path
 
-            # 写入文件内容
-            file_path = save_dir / f"{safe_book_name}-{safe_chapter_name}.txt"
+            # 创建存储路径并写入文件内容
+            file_path.parent.mkdir(parents=True, exist_ok=True)
             with file_path.open("w", encoding="utf-8-sig") as f:
                 f.write(content)
 
             logger.info(f"✅ 成功保存处理后的中文文档: {file_path}")
+            return file_path
         except Exception as e:
-            logger.error(f"🛑 文件保存失败: {str(e)}", exc_info=True)
\ No newline at end of file
+            logger.error(f"🛑 文件保存失败: {str(e)}", exc_info=True)
+            return None
\ No newline at end of file
@@ -1,28 +1,50 @@
+import hashlib
+import json
 import re
 from pathlib import Path
+from threading import Lock
+from utils.StemCache import StemCache
+from utils.Stopwords import Stopwords
 from utils.TqdmLogHandler import logger
 from nltk.stem import PorterStemmer
 
+# 单次扫描的分词模式：字母数字串作为词的组成部分，空白（换行除外）作为分隔符，其余字符忽略
+_TOKEN_PATTERN = re.compile(r'(\w+)|[^\S\n]+')
+
+
 class dealer_en:
     """英文文本处理类"""
-    stopwords = set()  # 停用词集合
-
-    def __init__(self, dealer=None):
+    DEALER_VERSION = 1  # 清洗/分词逻辑变化时递增，已处理的文档会被判定为需要重新处理
+    stopwords = Stopwords()  # 不可变停用词表（修改时整体替换）
+    _stopwords_lock = Lock()  # 串行化替换操作
+    stem_cache = StemCache(PorterStemmer().stem)  # 进程内共享的词干缓存
+
+    def __init__(self, dealer=None, stem_cache_file=None, writer=None):
+        """
+        Args:
+            dealer: 保留参数
+            stem_cache_file (str): 词干缓存文件，提供时启动加载、退出时保存
+            writer (BufferedWriter): 后台写入器，提供时保存章节只排队不阻塞（爬虫会自动设置）
+        """
         self.dealer = dealer
+        self.writer = writer
         # 初始化时加载停用词
         self.load_stopwords()
+        if stem_cache_file:
+            self.stem_cache.load(stem_cache_file)
+            self.stem_cache.save_at_exit(stem_cache_file)
 
     @staticmethod
     def load_stopwords(filename='sources/en_stopwords.txt'):
-        """加载停用词表"""
+        """加载停用词表（与已有词表合并后整体替换，读线程不会看到中间状态）"""
         try:
-            with open(filename, 'r', encoding='utf-8') as f:
-                for word in f:
-                    dealer_en.stopwords.add(word.strip())
-            logger.info(f"成功加载停用词表，共{len(dealer_en.stopwords)}个停用词")
+            table = Stopwords.from_file(filename)
         except FileNotFoundError:
             logger.error(f"停用词文件 {filename} 未找到！")
-            dealer_en.stopwords = set()  # 防止后续报错
+            return
+        with dealer_en._stopwords_lock:
+            dealer_en.stopwords = dealer_en.stopwords.union(table)
+        logger.info(f"成功加载停用词表，共{len(dealer_en.stopwords)}个停用词")
 
     @staticmethod
     def delete_stop_words(words):
@@ -36,56 +58,75 @@ class dealer_en:
         return text.split()
 
     def stem_words(self, words):
-        """词干提取函数"""
-        stemmer = PorterStemmer()
-        return [stemmer.stem(word) for word in words]
-
-    def clean_text(self, text, uppercase=False):
-        """清理文本"""
-        # 删除特殊字符（保留字母、数字和空格）
-        text = re.sub(r'[^\w\s]', '', text)
-        text = re.sub(r'\n', '', text)
-
-        # 分词
-        words = self.text_cut(text)
+        """词干提取函数（经共享缓存，重复词无需再次提取）"""
+        stem = self.stem_cache.stem
+        return [stem(word) for word in words]
+
+    def iter_tokens(self, text, uppercase=False):
+        """逐词产出清理后的词（单次扫描：规范化、过滤停用词、词干提取）
+
+        与clean_text结果一致，但不构造中间列表，适合整本书等长文本流式处理。
+        """
+        stopwords = dealer_en.stopwords
+        stem = self.stem_cache.stem
+        for word in self._iter_words(text):
+            word = word.lower()
+            if word in stopwords:
+                continue
+            word = stem(word)
+            yield word.upper() if uppercase else word
 
-        # 保留原始大小写
-        origin_words = [word for word in words if word.isalpha()]  # 保留字母
-
-        # 转换为小写
-        words = [word.lower() for word in words]
-
-        # 过滤停用词
-        words = self.delete_stop_words(words)
-
-        # 词干提取
-        words = self.stem_words(words)
+    @staticmethod
+    def _iter_words(text):
+        """切分原始词：删除特殊字符和换行后按空白分词"""
+        parts = []
+        for match in _TOKEN_PATTERN.finditer(text):
+            if match.lastindex:
+                parts.append(match.group(1))
+            elif parts:
+                # 遇到空白（换行除外）才结束当前词，标点和换行两侧的字符会拼接在一起
+                yield ''.join(parts)
+                parts = []
+        if parts:
+            yield ''.join(parts)
 
-        # 处理大小写（如果需要）
-        if uppercase:
-        # words = [word.lower() for word in words]  # 转换为小写
-            words = [word.upper() for word in words]  # 转换为大写
+    @staticmethod
+    def config_hash(uppercase=False):
+        """当前处理配置的哈希（停用词表、词干提取、大小写、DEALER_VERSION），任一变化输出都可能不同"""
+        config = {
+            'dealer': 'en',
+            'version': dealer_en.DEALER_VERSION,
+            'stopwords': dealer_en.stopwords.digest,
+            'stem': True,
+            'uppercase': uppercase,
+        }
+        return hashlib.sha1(json.dumps(config, sort_keys=True).encode('utf-8')).hexdigest()
 
-        text = ' '.join(words)
-        return text
+    def clean_text(self, text, uppercase=False):
+        """清理文本"""
+        return ' '.join(self.iter_tokens(text, uppercase))
 
     def _save_chapter_data(self, book_name: str, chapter_name: str,
-                           text: str) -> None:
-        """统一的章节保存方法"""
+                           text: str, key=None):
+        """统一的章节保存方法（返回保存路径，失败返回None；key为后台写入时所属页面的URL）"""
         try:
             # 生成安全文件名
             safe_book_name = re.sub(r'[\\/*?:"<>|]', '_', book_name).strip()
             safe_chapter_name = re.sub(r'[\\/*?:"<>|]', '_', chapter_name).strip()
 
-            # 创建存储路径
-            save_dir = Path("dealer") / safe_book_name
-            save_dir.mkdir(parents=True, exist_ok=True)
+            file_path = Path("dealer") / safe_book_name / f"{safe_book_name}-{safe_chapter_name}.txt"
+            if self.writer is not None:
+                # 交给后台写入器（目录批量创建），返回的路径在写入完成前即可记录
+                self.writer.write(file_path, text, key=key)
+                return file_path
 
-            # 写入文件内容
-            file_path = save_dir / f"{safe_book_name}-{safe_chapter_name}.txt"
+            # 创建存储路径并写入文件内容
+            file_path.parent.mkdir(parents=True, exist_ok=True)
             with file_path.open("w", encoding="utf-8-sig") as f:
                 f.write(text)
 
             logger.info(f"✅ 成功保存预处理的文档: {file_path}")
+            return file_path
         except Exception as e:
-            logger.error(f"🛑 文件保存失败: {str(e)}", exc_info=True)
\ No newline at end of file
+            logger.error(f"🛑 文件保存失败: {str(e)}", exc_info=True)
+            return None
\ No newline at end of file
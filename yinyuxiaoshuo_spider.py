@@ -1,84 +1,62 @@
 # yinyu_Spider.py
-import csv
 import re
 from datetime import datetime
+from functools import partial
 from pathlib import Path
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Tuple
 from urllib.parse import urljoin
 
-from bs4 import BeautifulSoup
-
 from utils.BaseSpider import BaseSpider
+from utils.CrawlState import CrawlState
+from utils.ParsedPage import ParsedPage, compile_xpath, has_class
 from utils.TqdmLogHandler import logger
 from utils.WebUtils import WebUtils
 from utils.dealer_en import dealer_en
 
+# 预编译选择器（所有页面共用）
+PAGE_TITLE = compile_xpath('//title')
+# h2.inline.italic.text-xs.text-gray1.hover:text-hover1.max-sm:hidden.ml-2 a
+BOOK_LINKS = compile_xpath(
+    f'//h2[{has_class("inline", "italic", "text-xs", "text-gray1", "hover:text-hover1", "max-sm:hidden", "ml-2")}]//a'
+)
+# h2.text-sm.inline.ml-2.max-sm:hidden
+BOOK_NAME = compile_xpath(f'//h2[{has_class("text-sm", "inline", "ml-2", "max-sm:hidden")}]')
+# a.text-danger.hover:text-hover1[href]
+CHAPTER_LINKS = compile_xpath(f'//a[{has_class("text-danger", "hover:text-hover1")}][@href]')
+# h2.text-danger.text-center.text-lg.font-bold.mt-2
+CHAPTER_TITLE = compile_xpath(
+    f'//h2[{has_class("text-danger", "text-center", "text-lg", "font-bold", "mt-2")}]'
+)
+# div.c-en
+CHAPTER_PARAGRAPHS = compile_xpath(f'//div[{has_class("c-en")}]')
 
 class yinyuSpider(BaseSpider):
-    """英语小说章节爬虫"""
+    """英语小说章节爬虫
+
+    章节URL在书籍页即可全部获得，因此书籍页与章节页都通过parallel_execute
+    按主机调度并发抓取；断点状态由线程安全的CrawlState维护。
+    """
 
     def __init__(self, config=None):
         self.base_dir = "yinyu"
         super().__init__(f"{self.base_dir}", config or {})
         # self.processed_urls = None
         self.base_url = "https://www.yingyuxiaoshuo.com/"
-        self.visited_urls = set()
         self.timeout = self.config.get("timeout", 10)
         self.current_url = self.base_url
 
-        # 断点续传
-        self.csv_file = Path(f"parsed/yingyu_crawl_records.csv")
-        self._init_csv()
-        self.load_processed_urls()
-        self.sourcefile = None
-
-    def _init_csv(self):
-        """初始化CSV文件并写入表头"""
-        # 创建父目录（自动递归创建）
-        self.csv_file.parent.mkdir(parents=True, exist_ok=True)
-        if not self.csv_file.exists():
-            with open(self.csv_file, 'w', newline='', encoding='utf-8-sig') as f:
-                writer = csv.DictWriter(f, fieldnames=[
-                    'timestamp',
-                    'url',
-                    'source_file',
-                    'parsed_file',
-                    'book_name',
-                    'chapter_name',
-                    'status'
-                    'dealer_file'
-                ])
-                writer.writeheader()
-
-    def load_processed_urls(self):
-        """加载已处理的URL"""
-        # self.processed_urls = set()
-        self.visited_urls = set()
-        try:
-            with open(self.csv_file, 'r', encoding='utf-8-sig') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    if row['url'] and row['status'] == 'success':
-                        # self.processed_urls.add(row['url'])
-                        self.visited_urls.add(row['url'])
-        except FileNotFoundError:
-            pass
-
-    def _update_csv(self, record: dict):
-        """更新CSV记录"""
-        try:
-            with open(self.csv_file, 'a', newline='', encoding='utf-8-sig') as f:
-                writer = csv.DictWriter(f, fieldnames=record.keys())
-                writer.writerow(record)
-        except Exception as e:
-            logger.error(f"CSV记录更新失败: {str(e)}")
+        # 断点续传（SQLite状态库，首次运行时导入旧版CSV记录）
+        self.state = CrawlState(
+            Path("parsed/yingyu_crawl_state.db"),
+            legacy_csv=Path("parsed/yingyu_crawl_records.csv")
+        )
 
-    def _get_source_file(self, url: str, direction: str, file_name=None):
-        """记录原始文件信息"""
+    def _get_source_file(self, url: str, direction: str, file_name=None) -> Path:
+        """计算原始文件路径（返回值由调用方持有，避免多线程共享）"""
         if not file_name:
             file_name = WebUtils.generate_filename(url)
             file_name = self.sanitize_filename(file_name)
-        self.sourcefile = Path("origin") / direction / file_name
+        return Path("origin") / direction / file_name
 
     def sanitize_filename(self, name: str) -> str:
         """替换非法字符为下划线"""
@@ -86,39 +64,37 @@ class yinyuSpider(BaseSpider):
 
     def fetch_content(self, url: str, direction: str, file_name: str = None) -> Optional[str]:
         """统一封装的内容获取方法"""
-        if url in self.visited_urls:
+        # 原子领取，防止多个线程重复抓取同一URL
+        if not self.state.claim(url):
             logger.warning(f"⏩ 跳过已保存URL: {url}")
             return None
 
-        self.visited_urls.add(url)
-        self.random_delay()
-        logger.info(f"📖 访问URL: {url}")
-        content = self.fetcher.fetch_and_save(
-            url=url,
-            direction=direction,
-            file_name=file_name,
-            save_origin=True
-        )
+        # 按主机限流（仅在该站点需要等待时才等待）
+        with self.throttle(url):
+            logger.info(f"📖 访问URL: {url}")
+            content = self.fetcher.fetch_and_save(
+                url=url,
+                direction=direction,
+                file_name=file_name,
+                save_origin=True
+            )
         if content:
-            self._get_source_file(url, direction, file_name)
-        if not content:
+            self.state.transition(url, 'fetched')
+        else:
             logger.error(f"🛑 获取内容失败: {url}")
         return content
 
-    def _extract_books(self, content: str) -> Optional[Dict]:
+    def _extract_books(self, page: ParsedPage) -> Optional[Dict]:
         """书籍列表解析"""
         try:
-            soup = BeautifulSoup(content, 'lxml')
-            title = soup.find('title').get_text(strip=True) if soup.title else "No Title"
+            title = page.first_text(PAGE_TITLE, "No Title")
 
-            # 使用精确的CSS选择器
-            book_links = soup.select(
-                'h2.inline.italic.text-xs.text-gray1.hover\\:text-hover1.max-sm\\:hidden.ml-2 a'
-            )
+            # 使用预编译的精确选择器
+            book_links = page.select(BOOK_LINKS)
 
             books = []
             for link in book_links:
-                if not (name := link.get_text(strip=True)):
+                if not (name := page.text(link)):
                     continue
                 if not (url := urljoin(self.base_url, link.get('href'))):
                     continue
@@ -129,18 +105,16 @@ class yinyuSpider(BaseSpider):
             logger.error(f"书籍列表解析失败: {str(e)}", exc_info=True)
             return None
 
-    def _extract_chapters(self, content: str) -> Optional[Dict]:
+    def _extract_chapters(self, page: ParsedPage) -> Optional[Dict]:
         """章节列表解析"""
         try:
-            soup = BeautifulSoup(content, 'lxml')
-            book_name_elem = soup.select_one('h2.text-sm.inline.ml-2.max-sm\\:hidden')
-            book_name = book_name_elem.get_text(strip=True) if book_name_elem else "Unknown Book"
+            book_name = page.first_text(BOOK_NAME, "Unknown Book")
 
-            chapter_links = soup.select('a.text-danger.hover\\:text-hover1[href]')
+            chapter_links = page.select(CHAPTER_LINKS)
 
             chapters = []
             for link in chapter_links:
-                if not (name := link.get_text(strip=True)):
+                if not (name := page.text(link)):
                     continue
                 if not (url := urljoin(self.base_url, link.get('href'))):
                     continue
@@ -151,34 +125,45 @@ class yinyuSpider(BaseSpider):
             logger.error(f"章节列表解析失败: {str(e)}", exc_info=True)
             return None
 
-    def _extract_chapter_content(self, content: str) -> Optional[Dict]:
+    def _extract_chapter_content(self, page: ParsedPage) -> Optional[Dict]:
         """章节内容解析"""
         try:
-            soup = BeautifulSoup(content, 'lxml')
-            title_elem = soup.select_one('h2.text-danger.text-center.text-lg.font-bold.mt-2')
-            chapter_name = title_elem.get_text(strip=True) if title_elem else "Unknown Chapter"
+            chapter_name = page.first_text(CHAPTER_TITLE, "Unknown Chapter")
 
-            content_elems = soup.select('div.c-en')
-            content_text = "\n".join([elem.get_text(strip=True) for elem in content_elems])
+            content_elems = page.select(CHAPTER_PARAGRAPHS)
+            content_text = "\n".join([page.text(elem) for elem in content_elems])
 
             return {"chapter_name": chapter_name, "content": content_text}
         except Exception as e:
             logger.error(f"章节内容解析失败: {str(e)}", exc_info=True)
             return None
 
-    def process_book(self, book_url: str, book_name: str) -> None:
-        """处理单个书籍的完整流程"""
-        content = self.fetch_content(book_url, f"{self.base_dir}/{book_name}")
+    def _collect_chapters(self, book: Dict) -> List[Tuple[Dict, str]]:
+        """抓取书籍页并返回(章节, 书名)任务列表"""
+        book_name = book["name"]
+        logger.info(f"📖 开始处理书籍: {book_name}")
+        content = self.fetch_content(book["url"], f"{self.base_dir}/{book_name}")
         if not content:
-            return
+            return []
 
-        chapters_data = self._extract_chapters(content)
+        chapters_data = self._extract_chapters(ParsedPage(content, book["url"]))
         if not chapters_data:
             logger.error(f"书籍章节解析失败: {book_name}")
-            return
+            return []
+
+        return [(chapter, book_name) for chapter in chapters_data.get("chapters", [])]
+
+    def _process_chapters(self, chapter_tasks: List[Tuple[Dict, str]]) -> None:
+        """并发处理(章节, 书名)任务（按主机限流）"""
+        self.parallel_execute(
+            chapter_tasks,
+            lambda task: self.process_chapter(*task),
+            key=lambda task: task[0]["url"]
+        )
 
-        for chapter in chapters_data.get("chapters", []):
-            self.process_chapter(chapter, book_name)
+    def process_book(self, book_url: str, book_name: str) -> None:
+        """处理单个书籍的完整流程（章节并发下载）"""
+        self._process_chapters(self._collect_chapters({"name": book_name, "url": book_url}))
 
     def process_chapter(self, chapter: Dict, book_name: str) -> None:
         """处理单个章节的完整流程"""
@@ -187,97 +172,104 @@ class yinyuSpider(BaseSpider):
         sanitized_book_name = self.sanitize_filename(book_name)
         sanitized_chapter_name = self.sanitize_filename(chapter['chapter_name'])
         file_name = f"{sanitized_book_name}-{sanitized_chapter_name}.html"
+        direction = f"{self.base_dir}/{sanitized_book_name}"
 
-        content = self.fetch_content(
-            chapter_url,
-            f"{self.base_dir}/{sanitized_book_name}",
-            file_name=file_name
-        )
+        content = self.fetch_content(chapter_url, direction, file_name=file_name)
         if not content:
             return
 
-        chapter_data = self._extract_chapter_content(content)
+        chapter_data = self._extract_chapter_content(ParsedPage(content, chapter_url))
         if not chapter_data:
             logger.error(f"章节内容解析失败: {chapter_url}")
             return
 
+        # 近重复章节（镜像、转载）不再保存和分词
+        if duplicate_of := self.find_duplicate(chapter_url, chapter_data["content"]):
+            self.commit_page(chapter_url, 'duplicate', duplicate_of=duplicate_of)
+            return
+
         self._save_chapter_data(
             book_name=book_name,
             chapter_name=chapter_data["chapter_name"],
             chapter_url=chapter_url,
-            content=chapter_data["content"]
+            content=chapter_data["content"],
+            source_file=self._get_source_file(chapter_url, direction, file_name)
         )
 
         # 处理章节内容
         text = self.dealer.clean_text(chapter_data["content"], uppercase=False)
-        self.dealer._save_chapter_data(
+        dealer_file = self.dealer._save_chapter_data(
             book_name=book_name,
             chapter_name=chapter_data["chapter_name"],
-            text=text)
+            text=text,
+            key=chapter_url)
+        self.save_record({
+            "book_name": book_name,
+            "chapter_name": chapter_data["chapter_name"],
+            "chapter_url": chapter_url,
+            "content": chapter_data["content"],
+            "dealer_file": dealer_file,
+        })
+        # 章节文件全部写入后才标记为processed（任一文件写入失败或dealer保存失败时标记为failed）
+        self.commit_page(chapter_url, 'processed' if dealer_file is not None else 'failed', dealer_file=dealer_file)
 
     def _save_chapter_data(self, book_name: str, chapter_name: str,
-                           chapter_url: str, content: str) -> None:
-        """统一的章节保存方法"""
+                           chapter_url: str, content: str, source_file: Path = None) -> None:
+        """统一的章节保存方法（文件写入完成后将页面标记为parsed）"""
         try:
             # 生成安全文件名
             safe_book_name = self.sanitize_filename(book_name)[:50]
             safe_chapter_name = self.sanitize_filename(chapter_name)[:50]
 
-            # 创建存储路径
-            save_dir = Path("parsed") / safe_book_name
-            save_dir.mkdir(parents=True, exist_ok=True)
-
-            # 预处理后的章节目录
-            dealer_dir = save_dir / chapter_name
-            dealer_dir.mkdir(parents=True, exist_ok=True)
-            dealer_path = dealer_dir / f"{safe_book_name}-{safe_chapter_name}.txt"
-
-            # 写入文件内容
-            file_path = save_dir / f"{safe_chapter_name}.txt"
-            with file_path.open("w", encoding="utf-8-sig") as f:
-                f.write(f"Book: {book_name}\n")
-                f.write(f"Chapter: {chapter_name}\n")
-                f.write(f"URL: {chapter_url}\n\n")
-                f.write(content)
-
-            # 记录解析文件信息
-            self._update_csv({
-                'timestamp': datetime.now().isoformat(),
-                'url': chapter_url,
-                'source_file': str(self.sourcefile),
-                'parsed_file': str(file_path),
-                'book_name': book_name,
-                'chapter_name': chapter_name,
-                'status': "success",
-                'dealer_file': str(dealer_path)
-            })
-
-            logger.info(f"✅ 成功保存章节: {file_path}")
+            # 写入文件内容（后台写入器负责创建目录）
+            file_path = Path("parsed") / safe_book_name / f"{safe_chapter_name}.txt"
+            self.write_file(
+                file_path,
+                f"Book: {book_name}\nChapter: {chapter_name}\nURL: {chapter_url}\n\n{content}",
+                # 记录解析文件信息
+                key=chapter_url,
+                callback=partial(
+                    self.state.transition, chapter_url, 'parsed',
+                    timestamp=datetime.now().isoformat(),
+                    source_file=source_file,
+                    parsed_file=file_path,
+                    book_name=book_name,
+                    chapter_name=chapter_name
+                )
+            )
+
+            logger.info(f"✅ 章节已提交保存: {file_path}")
         except Exception as e:
             logger.error(f"🛑 文件保存失败: {str(e)}", exc_info=True)
 
     def crawl(self, max_books: int = 3) -> None:
-        """优化的爬取主流程"""
+        """优化的爬取主流程
+
+        执行步骤：
+        1. 抓取首页书籍列表
+        2. 并发抓取各书籍页，汇总全部章节任务
+        3. 所有章节统一进入线程池，由调度器按主机限流
+        """
         processed_count = 0
         try:
             # 处理初始页面
             if not (index_content := self.fetch_content(self.base_url, f"{self.base_dir}")):
                 return
 
-            if not (books_data := self._extract_books(index_content)):
+            if not (books_data := self._extract_books(ParsedPage(index_content, self.base_url))):
                 return
 
-            for book in books_data.get("books", []):
-                if processed_count >= max_books:
-                    break
+            books = books_data.get("books", [])[:max_books]
+            chapter_tasks = self.parallel_execute(books, self._collect_chapters, key=lambda book: book["url"])
+            processed_count = len(books)
 
-                logger.info(f"📖 开始处理书籍: {book['name']}")
-                self.process_book(book["url"], book["name"])
-                processed_count += 1
+            self._process_chapters(chapter_tasks)
 
         except KeyboardInterrupt:
             logger.warning("⽤户中断操作")
         except Exception as e:
             logger.error(f"爬取流程异常: {str(e)}", exc_info=True)
         finally:
+            self.flush_writes()
+            self.close_sink()
             logger.info(f"🎉 完成处理 {processed_count}/{max_books} 本书籍")